@@ -1,11 +1,140 @@
 #!/usr/bin/env python
+import os
+import asyncio
+import hashlib
+import threading
+import contextlib
 import uvicorn
-from fastapi import FastAPI
-from fastapi import UploadFile
+from fastapi import FastAPI, Request
+from fastapi import HTTPException, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
-from model import summarize_and_translate, transcribe_audio
+import jobs
+import uploads
+import inference
+import streaming
+import batching
+import coalescing
+import metrics
+import serving
+import payloads
+from model import model_pool, summarize_and_translate, transcribe_audio
+from model import load_audio, transcribe_windows, language_roles
 
-app = FastAPI()
+# With INFERENCE_SERVER, the models live in one process shared by every worker
+INFERENCE_SERVER = os.getenv("INFERENCE_SERVER")
+if INFERENCE_SERVER:
+    inference_client = serving.InferenceClient(INFERENCE_SERVER)
+    model_pool = serving.RemoteModelPool(inference_client)
+    transcribe_audio = inference_client.transcribe_audio
+    transcribe_windows = inference_client.transcribe_windows
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load and warm up the models in the background, /readyz tells when done
+    threading.Thread(
+        target=model_pool.load, args=(MAX_CONCURRENT_INFERENCES,), daemon=True
+    ).start()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Uploads are saved in chunks to unique temporary files, up to a size limit
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", uploads.DEFAULT_MAX_UPLOAD_BYTES))
+MULTIPART_OVERHEAD_BYTES = uploads.DEFAULT_MULTIPART_OVERHEAD_BYTES
+
+# Blocking inference runs on its own threads, so the event loop stays free
+MAX_CONCURRENT_INFERENCES = int(
+    os.getenv("MAX_CONCURRENT_INFERENCES", inference.DEFAULT_MAX_CONCURRENT)
+)
+MAX_WAITING_INFERENCES = int(
+    os.getenv("MAX_WAITING_INFERENCES", inference.DEFAULT_MAX_WAITING)
+)
+INFERENCE_WAIT_TIMEOUT = float(
+    os.getenv("INFERENCE_WAIT_TIMEOUT", inference.DEFAULT_WAIT_TIMEOUT)
+)
+MODEL_LOADING_RETRY_SECONDS = 10
+
+# The windows of concurrent uploads and streams are transcribed together, in
+# micro-batches, so each model serves as many uploads as fit in a batch
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", batching.DEFAULT_MAX_BATCH_SIZE))
+MAX_BATCH_WAIT = float(os.getenv("MAX_BATCH_WAIT", batching.DEFAULT_MAX_WAIT))
+window_batcher = batching.MicroBatcher(
+    transcribe_windows,
+    workers=MAX_CONCURRENT_INFERENCES,
+    max_batch_size=MAX_BATCH_SIZE,
+    max_wait=MAX_BATCH_WAIT,
+)
+inference_executor = inference.InferenceExecutor(
+    max_concurrent=MAX_CONCURRENT_INFERENCES * MAX_BATCH_SIZE,
+    max_waiting=MAX_WAITING_INFERENCES,
+    wait_timeout=INFERENCE_WAIT_TIMEOUT,
+)
+
+# Background jobs, run by a pool of worker threads
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", jobs.DEFAULT_WORKERS))
+MAX_QUEUED_JOBS = int(os.getenv("MAX_QUEUED_JOBS", jobs.DEFAULT_MAX_QUEUED_JOBS))
+RETRY_AFTER_SECONDS = 30
+job_queue = jobs.JobQueue(workers=JOB_WORKERS, max_queued=MAX_QUEUED_JOBS)
+
+# Identical concurrent requests, by audio content and parameters, share one result
+in_flight = coalescing.SingleFlight()
+
+# Queue depths and in-flight work, read when /metrics is scraped
+metrics.INFERENCES_RUNNING.set_function(lambda: inference_executor.stats()["running"])
+metrics.INFERENCES_WAITING.set_function(lambda: inference_executor.stats()["waiting"])
+metrics.JOBS_QUEUED.set_function(lambda: job_queue.queue.qsize())
+metrics.WINDOWS_QUEUED.set_function(lambda: window_batcher.items.qsize())
+metrics.COALESCED_IN_FLIGHT.set_function(lambda: len(in_flight.calls))
+
+# Stages timed by the meeting_assistant library, when it is installed
+with contextlib.suppress(ImportError):
+    from meeting_assistant import instruments
+
+    instruments.add_observer(metrics.observe)
+
+
+@app.exception_handler(inference.OverloadedError)
+async def overloaded(request: Request, error: inference.OverloadedError):
+    return JSONResponse(
+        status_code=error.status_code,
+        content={"detail": str(error)},
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
+@app.exception_handler(uploads.UploadTooLargeError)
+async def upload_too_large(request: Request, error: uploads.UploadTooLargeError):
+    return JSONResponse(status_code=413, content={"detail": str(error)})
+
+
+# Rejects uploads too large while their body is received, not once spooled
+app.add_middleware(
+    uploads.UploadSizeLimit,
+    max_bytes=lambda: MAX_UPLOAD_BYTES,
+    overhead_bytes=lambda: MULTIPART_OVERHEAD_BYTES,
+)
+
+
+@app.middleware("http")
+async def count_requests(request: Request, call_next):
+    """Counts the requests by route and status, and the ones being served."""
+    metrics.REQUESTS_IN_FLIGHT.inc()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.REQUESTS_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        metrics.REQUESTS.labels(
+            request.method, route.path if route else "unmatched", status
+        ).inc()
 
 
 @app.get("/")
@@ -15,6 +144,42 @@ def read_root():
     }
 
 
+@app.get("/healthz")
+def health() -> dict:
+    """Tells the server is alive."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readiness() -> JSONResponse:
+    """Tells whether the server can take inference requests right now."""
+    stats = inference_executor.stats()
+    if model_pool.error is not None:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "failed", "error": str(model_pool.error), **stats},
+        )
+    if not model_pool.ready.is_set():
+        return JSONResponse(
+            status_code=503,
+            content={"status": "loading", **stats},
+            headers={"Retry-After": str(MODEL_LOADING_RETRY_SECONDS)},
+        )
+    if inference_executor.is_saturated():
+        return JSONResponse(
+            status_code=503,
+            content={"status": "saturated", **stats},
+            headers={"Retry-After": str(inference_executor.retry_after())},
+        )
+    return JSONResponse(content={"status": "ready", **stats})
+
+
+@app.get("/metrics")
+def prometheus_metrics() -> Response:
+    """Exposes the metrics of the server in the Prometheus text format."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.post("/transcribe/")
 async def transcribe(file: UploadFile) -> dict:
     """
@@ -26,15 +191,30 @@ async def transcribe(file: UploadFile) -> dict:
     Returns:
         A tuple containing the transcription and the language.
     """
-    # Save the file to disk
-    with open(file.filename, "wb") as f:
-        f.write(await file.read())
+    # Save the file to disk, and remove it once transcribed
+    with metrics.timed("pipeline", endpoint="transcribe"):
+        async with uploads.temporary_upload(file, MAX_UPLOAD_BYTES) as upload:
+            return await _transcribe_upload(upload)
 
-    # Transcribe the audio
-    transcript, language = transcribe_audio(file.filename)
 
-    # Return the results as a tuple
-    return {"text": transcript, "language": language}
+async def _transcribe_upload(upload: uploads.Upload) -> dict:
+    """Transcribes an upload, along with the concurrent uploads of the same audio."""
+    return await in_flight.run(
+        ("transcribe", upload.sha256),
+        upload.holding(inference_executor.run),
+        transcribe_windowed,
+        upload.path,
+    )
+
+
+def transcribe_windowed(filename: str) -> dict:
+    """Transcribes an audio file in 30 s windows, batched with the other requests.
+
+    Returns the text, the language and the segments, timed from the start of
+    the audio.
+    """
+    samples = load_audio(filename)
+    return batching.transcribe_samples(window_batcher, samples, INFERENCE_WAIT_TIMEOUT)
 
 
 @app.get("/translate_summarize_text/")
@@ -43,6 +223,52 @@ def summarize_text(text: str, language: str = "en") -> dict:
     return {"text": text}
 
 
+# Transcripts posted as JSON, gzipped or not, up to a decompressed size
+MAX_TRANSCRIPT_BYTES = int(
+    os.getenv("MAX_TRANSCRIPT_BYTES", payloads.DEFAULT_MAX_BODY_BYTES)
+)
+
+
+@app.post("/translate_summarize_text/")
+async def summarize_transcript(request: Request) -> Response:
+    """
+    Summarizes a posted transcript in one or more languages.
+
+    The body is a JSON payload, optionally sent with Content-Encoding: gzip,
+    such as {"segments": [{"start": 0.0, "end": 2.4, "text": "..."}],
+    "languages": ["en", "es"]}. A flat "text" may be sent instead of segments.
+
+    Returns:
+        The summary in each language, gzipped if the client accepts it.
+    """
+    with metrics.timed("pipeline", endpoint="summarize_text"):
+        body = await payloads.read_json(
+            request, payloads.SummaryRequest, MAX_TRANSCRIPT_BYTES
+        )
+        unknown = sorted(set(body.languages) - set(language_roles))
+        if unknown:
+            raise HTTPException(422, f"Unsupported languages: {', '.join(unknown)}.")
+
+        transcript = body.transcript()
+        sha256 = hashlib.sha256(transcript.encode()).hexdigest()
+        languages = list(dict.fromkeys(body.languages))
+        summaries = await asyncio.gather(
+            *(
+                in_flight.run(
+                    ("summarize_text", sha256, language),
+                    run_in_threadpool,
+                    summarize_and_translate,
+                    transcript,
+                    language,
+                )
+                for language in languages
+            )
+        )
+        return payloads.json_response(
+            request, {"summaries": dict(zip(languages, summaries))}
+        )
+
+
 @app.post("/translate_summarize_audio/")
 async def summarize_audio(file: UploadFile, language: str = "en") -> dict:
     """
@@ -55,11 +281,22 @@ async def summarize_audio(file: UploadFile, language: str = "en") -> dict:
     Returns:
         A summary of the transcribed text.
     """
+    with metrics.timed("pipeline", endpoint="summarize_audio"):
+        async with uploads.temporary_upload(file, MAX_UPLOAD_BYTES) as upload:
+            return await in_flight.run(
+                ("summarize", upload.sha256, language),
+                upload.holding(_summarize_upload),
+                upload,
+                language,
+            )
+
+
+async def _summarize_upload(upload: uploads.Upload, language: str) -> dict:
     # Transcribe the audio
-    transcription = await transcribe(file)
+    transcription = await _transcribe_upload(upload)
 
     # Generate a summary of the text
-    summary = summarize_text(transcription["text"], language)
+    summary = await run_in_threadpool(summarize_text, transcription["text"], language)
 
     # Return the summary
     return {
@@ -69,6 +306,170 @@ async def summarize_audio(file: UploadFile, language: str = "en") -> dict:
     }
 
 
+def summarize_audio_job(job: jobs.Job, filename: str, language: str) -> dict:
+    """Transcribe and summarize an audio file, reporting the progress of the job."""
+    try:
+        with metrics.timed("pipeline", endpoint="jobs"):
+            job.update(stage="transcribing")
+            transcript, audio_language = inference_executor.run_sync(
+                transcribe_audio, filename
+            )
+            job.update(
+                stage="summarizing",
+                progress=0.5,
+                transcription=transcript,
+                audio_language=audio_language,
+                summary_chunks=[],
+            )
+
+            def on_chunk(index: int, count: int, summary: str) -> None:
+                job.update(
+                    progress=0.5 + 0.5 * (index + 1) / count,
+                    summary_chunks=job.result["summary_chunks"] + [summary],
+                )
+
+            return {"summary": summarize_and_translate(transcript, language, on_chunk)}
+    finally:
+        os.remove(filename)
+
+
+def _queue_full() -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Too many jobs queued, try again later.",
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+    )
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(file: UploadFile, language: str = "en") -> dict:
+    """
+    Queues the transcription and summary of an audio file.
+
+    Args:
+        file (UploadFile): The audio file to transcribe and summarize.
+        language (str): The language of the summary.
+
+    Returns:
+        The id of the job, to follow its progress.
+    """
+    # Reject the job before reading the upload when the queue is full
+    if job_queue.queue.full():
+        raise _queue_full()
+
+    # Each job gets its own file, removed once the job is over
+    upload = await uploads.save_upload(file, MAX_UPLOAD_BYTES)
+    try:
+        job = job_queue.submit(summarize_audio_job, upload.path, language)
+    except jobs.QueueFullError:
+        upload.remove()
+        raise _queue_full()
+
+    return {"id": job.id, "status": job.status}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str) -> dict:
+    """Returns the status, progress and partial results of a job."""
+    try:
+        return job_queue.get(job_id).to_dict()
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+
+
+@app.websocket("/jobs/{job_id}/events")
+async def job_events(websocket: WebSocket, job_id: str) -> None:
+    """Streams the progress events of a job until it is over."""
+    await websocket.accept()
+    try:
+        job = job_queue.get(job_id)
+    except KeyError:
+        await websocket.close(code=1008, reason=f"Job {job_id} not found.")
+        return
+
+    events = job.subscribe()
+    try:
+        while True:
+            event = await events.get()
+            await websocket.send_json(event)
+            if event["status"] in jobs.FINISHED_STATUSES:
+                break
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        job.unsubscribe(events)
+
+
+# Real-time transcription, of windows retranscribed as the audio arrives
+STREAM_WINDOW_SECONDS = streaming.DEFAULT_WINDOW_SECONDS
+STREAM_STEP_SECONDS = streaming.DEFAULT_STEP_SECONDS
+STREAM_DECODERS = {"pcm": streaming.PcmDecoder, "opus": streaming.FfmpegDecoder}
+
+
+@app.websocket("/ws/transcribe")
+async def transcribe_stream(
+    websocket: WebSocket, audio_format: str = "pcm", language: str = None
+) -> None:
+    """
+    Transcribes audio streamed over a WebSocket while it is being recorded.
+
+    The client sends binary messages with the audio, either 16 kHz mono 16-bit
+    PCM or an Ogg/WebM Opus stream, and a "end" text message once done. The
+    server sends JSON segments with their start and end times in seconds,
+    which are "partial" until their text will not change anymore and "final"
+    afterwards.
+
+    Args:
+        audio_format (str): The format of the audio, "pcm" or "opus".
+        language (str): The language of the audio, detected when not given.
+    """
+    await websocket.accept()
+    if audio_format not in STREAM_DECODERS:
+        await websocket.close(code=1003, reason=f"Unknown format {audio_format}.")
+        return
+
+    decoder = await run_in_threadpool(STREAM_DECODERS[audio_format])
+    stream = streaming.TranscriptionStream(
+        STREAM_WINDOW_SECONDS, STREAM_STEP_SECONDS, language
+    )
+
+    async def send_segments(final: bool = False) -> None:
+        window = (stream.pending(), stream.language)
+        result = await asyncio.wrap_future(window_batcher.submit(window))
+        for message in stream.update(result, final):
+            await websocket.send_json(message)
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes"):
+                samples = await run_in_threadpool(decoder.decode, message["bytes"])
+                if stream.feed(samples):
+                    await send_segments()
+            elif message.get("text") == "end":
+                break
+
+        # Transcribe what is left, a window at a time
+        stream.feed(await run_in_threadpool(decoder.close))
+        while stream.full():
+            await send_segments()
+        if len(stream.samples):
+            await send_segments(final=True)
+        await websocket.send_json({"type": "end"})
+        await websocket.close()
+
+    except inference.OverloadedError as error:
+        await websocket.send_json({"type": "error", "detail": str(error)})
+        await websocket.close(code=1013, reason="Try again later.")
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await run_in_threadpool(decoder.close)
+
+
 IP = "0.0.0.0"
 PORT = 8000
 BASE_URL = f"http://{IP}:{PORT}"
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""Module defining the micro-batching of the windows transcribed by the API.
+
+Uploaded audio is cut into 30 s windows, and the windows of concurrent
+uploads and streams are transcribed together.
+"""
+
+__author__ = "Mauricio Vanzulli"
+__email__ = "mcvanzulli@gmail.com"
+
+# Built-in modules
+import time
+import queue
+import threading
+import typing
+import dataclasses
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+# Local modules
+import inference
+import metrics
+
+# Global variables
+DEFAULT_MAX_BATCH_SIZE = 8
+DEFAULT_MAX_WAIT = 0.02  # Seconds a window waits for others to fill its batch
+DEFAULT_MAX_QUEUED = 64
+DEFAULT_DECODE_TIMEOUT = 120.0  # Seconds a batch may take once its turn comes
+SAMPLE_RATE = 16000
+WINDOW_SECONDS = 30.0  # Whisper's context
+TIME_PRECISION = 0.02  # Seconds per whisper timestamp token
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD = -1.0
+COMPRESSION_RATIO_THRESHOLD = 2.4  # Above it, the text likely repeats itself
+FALLBACK_TEMPERATURES = (0.2, 0.4, 0.6, 0.8, 1.0)
+
+
+class MicroBatcher:
+    """Groups the items submitted by concurrent requests into batches.
+
+    Worker threads take the first waiting item, wait up to max_wait for more
+    to arrive, and process up to max_batch_size of them with a single call of
+    process_batch, which returns one result per item.
+    """
+
+    def __init__(
+        self,
+        process_batch: typing.Callable[[list], list],
+        workers: int = 1,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait: float = DEFAULT_MAX_WAIT,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+    ):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.items = queue.Queue(maxsize=max_queued)
+
+        self.workers = [
+            threading.Thread(target=self._work, daemon=True) for _ in range(workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, item: typing.Any, timeout: float = None) -> Future:
+        """Queue an item, raising OverloadedError when the queue is full.
+
+        With a timeout, wait up to that many seconds for room in the queue.
+        """
+        future = Future()
+        try:
+            if timeout is None:
+                self.items.put_nowait((item, future))
+            else:
+                self.items.put((item, future), timeout=timeout)
+        except queue.Full:
+            raise inference.OverloadedError(
+                "Too many windows waiting, try again later.",
+                429 if timeout is None else 503,
+                1,
+            )
+        return future
+
+    def _next_batch(self) -> list:
+        """Wait for an item, then gather the ones arriving shortly after."""
+        batch = [self.items.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                batch.append(
+                    self.items.get(timeout=timeout)
+                    if timeout > 0
+                    else self.items.get_nowait()
+                )
+            except queue.Empty:
+                break
+        return batch
+
+    def _work(self) -> None:
+        while True:
+            batch = self._next_batch()
+            # Skip the items whose waiter gave up, e.g. a closed WebSocket
+            batch = [
+                (item, future)
+                for item, future in batch
+                if future.set_running_or_notify_cancel()
+            ]
+            if not batch:
+                continue
+            metrics.BATCH_SIZE.observe(len(batch))
+            # Nothing may end the worker, or every later submit would hang
+            try:
+                results = list(self.process_batch([item for item, _ in batch]))
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"Got {len(results)} results for {len(batch)} items."
+                    )
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+
+def split_windows(samples, window_seconds: float = WINDOW_SECONDS) -> list:
+    """Cut 16 kHz samples into consecutive windows, at least one."""
+    size = int(window_seconds * SAMPLE_RATE)
+    return [
+        samples[start : start + size] for start in range(0, max(len(samples), 1), size)
+    ]
+
+
+def merge_windows(results: list, window_seconds: float = WINDOW_SECONDS) -> dict:
+    """Merge the results of consecutive windows into the result of the audio.
+
+    The segments of each window are shifted by the start of the window, and
+    the language is the one of the first window.
+    """
+    segments = []
+    for index, result in enumerate(results):
+        offset = index * window_seconds
+        for segment in result["segments"]:
+            segments.append(
+                dict(
+                    segment,
+                    start=segment["start"] + offset,
+                    end=segment["end"] + offset,
+                )
+            )
+    return {
+        "text": " ".join(result["text"] for result in results if result["text"]),
+        "language": results[0]["language"],
+        "segments": segments,
+    }
+
+
+def _result(future: Future, timeout: float = None) -> typing.Any:
+    """Wait for the result of a window, raising OverloadedError after timeout."""
+    try:
+        return future.result(timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise inference.OverloadedError(
+            "Transcription timed out, try again later.", 503, 1
+        )
+
+
+def transcribe_samples(
+    batcher: MicroBatcher,
+    samples,
+    timeout: float = None,
+    window_seconds: float = WINDOW_SECONDS,
+    decode_timeout: float = DEFAULT_DECODE_TIMEOUT,
+) -> dict:
+    """Transcribe audio of any length through a batcher of windows.
+
+    The language is detected on the first window, as whisper does, and the
+    other windows are then queued in order, at most a batch of them at once
+    so that a long audio does not hold the queue. Waits up to timeout seconds
+    for room in the queue, and up to timeout plus decode_timeout for each
+    window, then raises OverloadedError. Returns a whisper-like result.
+    """
+    result_timeout = None if timeout is None else timeout + decode_timeout
+    windows = split_windows(samples, window_seconds)
+    results = [_result(batcher.submit((windows[0], None), timeout), result_timeout)]
+    language = results[0]["language"]
+
+    futures = []
+    try:
+        for window in windows[1:]:
+            if len(futures) == batcher.max_batch_size:
+                results.append(_result(futures.pop(0), result_timeout))
+            futures.append(batcher.submit((window, language), timeout))
+        while futures:
+            results.append(_result(futures.pop(0), result_timeout))
+    finally:
+        # Don't transcribe the rest of an audio given up on
+        for future in futures:
+            future.cancel()
+
+    return merge_windows(results, window_seconds)
+
+
+def _parse_segments(tokens: typing.List[int], tokenizer, duration: float) -> list:
+    """Split the tokens of a window into segments at their timestamp tokens."""
+    segments, start, text_tokens = [], None, []
+    for token in tokens:
+        if token < tokenizer.timestamp_begin:
+            text_tokens.append(token)
+            continue
+
+        seconds = (token - tokenizer.timestamp_begin) * TIME_PRECISION
+        if start is not None and text_tokens:
+            segments.append(
+                {"start": start, "end": seconds, "text": tokenizer.decode(text_tokens)}
+            )
+            start, text_tokens = None, []
+        else:
+            start = seconds
+
+    # Text after the last timestamp lasts until the end of the window
+    if text_tokens and tokenizer.decode(text_tokens).strip():
+        if start is None:
+            start = segments[-1]["end"] if segments else 0.0
+        segments.append(
+            {"start": start, "end": duration, "text": tokenizer.decode(text_tokens)}
+        )
+    return segments
+
+
+def _needs_fallback(decoded) -> bool:
+    """Tell whether a decoding looks repeated or unlikely, as whisper does."""
+    if decoded.no_speech_prob > NO_SPEECH_THRESHOLD:
+        return False
+    return (
+        decoded.compression_ratio > COMPRESSION_RATIO_THRESHOLD
+        or decoded.avg_logprob < LOGPROB_THRESHOLD
+    )
+
+
+def _decode_with_fallback(decode: typing.Callable, mels, options) -> list:
+    """Decode a batch of mel spectrograms with greedy decoding.
+
+    The windows needing a fallback are decoded again at the next temperatures,
+    as whisper.transcribe does, and keep their last decoding.
+    """
+    results = list(decode(mels, options))
+    pending = [i for i, decoded in enumerate(results) if _needs_fallback(decoded)]
+    for temperature in FALLBACK_TEMPERATURES:
+        if not pending:
+            break
+        retries = decode(
+            mels[pending], dataclasses.replace(options, temperature=temperature)
+        )
+        for i, decoded in zip(pending, retries):
+            results[i] = decoded
+        pending = [i for i in pending if _needs_fallback(results[i])]
+    return results
+
+
+def decode_windows(model, windows: typing.List[tuple]) -> typing.List[dict]:
+    """Transcribe (samples, language) windows of up to 30 s in batches.
+
+    Windows with the same language, or None to detect it, share one batched
+    decoding, in half precision on a GPU. Returns a whisper-like result per
+    window, with its segments and its language.
+    """
+    import torch
+    import whisper
+    from whisper.tokenizer import get_tokenizer
+
+    extra = {}
+    if hasattr(model, "num_languages"):
+        extra["num_languages"] = model.num_languages
+
+    results = [None] * len(windows)
+    languages = {language for _, language in windows}
+    for language in languages:
+        indexes = [i for i, window in enumerate(windows) if window[1] == language]
+        mels = torch.stack(
+            [
+                whisper.log_mel_spectrogram(
+                    whisper.pad_or_trim(windows[i][0]), n_mels=model.dims.n_mels
+                )
+                for i in indexes
+            ]
+        ).to(model.device)
+        options = whisper.DecodingOptions(
+            task="transcribe", language=language, fp16=model.device.type == "cuda"
+        )
+        decoded_windows = _decode_with_fallback(
+            lambda mels, options: whisper.decode(model, mels, options), mels, options
+        )
+
+        for i, decoded in zip(indexes, decoded_windows):
+            tokenizer = get_tokenizer(
+                model.is_multilingual, language=decoded.language, **extra
+            )
+            duration = len(windows[i][0]) / whisper.audio.SAMPLE_RATE
+            silent = (
+                decoded.no_speech_prob > NO_SPEECH_THRESHOLD
+                and decoded.avg_logprob < LOGPROB_THRESHOLD
+            )
+            results[i] = {
+                "text": "" if silent else decoded.text,
+                "language": decoded.language,
+                "segments": (
+                    []
+                    if silent
+                    else _parse_segments(decoded.tokens, tokenizer, duration)
+                ),
+            }
+
+    return results
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""Benchmark of /transcribe/ with and without micro-batching.
+
+The API is started with batches of a single window, then of --max-batch-size
+windows, and loaded with concurrent clients posting distinct copies of the
+audio to /transcribe/:
+
+    python benchmark_batching.py ../audios/foo.mp3 --whisper-model tiny
+"""
+
+__author__ = "Mauricio Vanzulli"
+__email__ = "mcvanzulli@gmail.com"
+
+# Built-in modules
+import os
+import sys
+import math
+import time
+import argparse
+import statistics
+import subprocess
+import threading
+
+# Third-party libraries
+import httpx
+
+# Local modules
+import batching
+from benchmark_serving import PORT, _decode, _wait_until_ready, _wav
+
+# Global variables
+DEFAULT_CLIENTS = [1, 4, 16]
+DEFAULT_REQUESTS_PER_CLIENT = 2
+
+
+def _start(args, max_batch_size: int, clients: int) -> subprocess.Popen:
+    """Start the API, letting every client wait for a transcription."""
+    env = dict(
+        os.environ,
+        WHISPER_MODEL=args.whisper_model,
+        MAX_BATCH_SIZE=str(max_batch_size),
+        MAX_WAITING_INFERENCES=str(clients),
+        INFERENCE_WAIT_TIMEOUT="3600",
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--port", str(PORT)]
+        + ["--log-level", "warning"],
+        env=env,
+    )
+
+
+def _load(url: str, samples, clients: int, requests: int) -> dict:
+    """Run concurrent clients posting distinct audio, measuring the latencies."""
+    latencies, errors, lock = [], [], threading.Lock()
+
+    def client(index: int) -> None:
+        with httpx.Client(timeout=None) as session:
+            for request in range(requests):
+                audio = _wav(samples, index * requests + request + 1)
+                start = time.perf_counter()
+                response = session.post(
+                    f"{url}/transcribe/", files={"file": ("audio.wav", audio)}
+                )
+                with lock:
+                    if response.status_code == 200:
+                        latencies.append(time.perf_counter() - start)
+                    else:
+                        errors.append(response.status_code)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests/s": len(latencies) / elapsed,
+        "p50 (s)": statistics.median(latencies) if latencies else float("nan"),
+        "p95 (s)": (
+            latencies[math.ceil(0.95 * len(latencies)) - 1]
+            if latencies
+            else float("nan")
+        ),
+        "errors": len(errors),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("audio_filename", help="Audio to transcribe.")
+    parser.add_argument("--clients", type=int, nargs="+", default=DEFAULT_CLIENTS)
+    parser.add_argument(
+        "--requests-per-client", type=int, default=DEFAULT_REQUESTS_PER_CLIENT
+    )
+    parser.add_argument(
+        "--max-batch-size", type=int, default=batching.DEFAULT_MAX_BATCH_SIZE
+    )
+    parser.add_argument("--whisper-model", default="base")
+    args = parser.parse_args()
+
+    samples = _decode(args.audio_filename)
+    # The API reads its configuration files from the working directory
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    url = f"http://127.0.0.1:{PORT}"
+
+    print(
+        f"{'clients':>7} {'batch':>5} {'requests/s':>10} {'p50 (s)':>8}"
+        f" {'p95 (s)':>8} {'errors':>6}"
+    )
+    for clients in args.clients:
+        for max_batch_size in (1, args.max_batch_size):
+            process = _start(args, max_batch_size, clients)
+            try:
+                _wait_until_ready(url)
+                stats = _load(url, samples, clients, args.requests_per_client)
+            finally:
+                process.terminate()
+                process.wait()
+
+            print(
+                f"{clients:>7} {max_batch_size:>5} {stats['requests/s']:>10.2f}"
+                f" {stats['p50 (s)']:>8.2f} {stats['p95 (s)']:>8.2f}"
+                f" {stats['errors']:>6}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""Benchmark of the memory and throughput of the API with and without the
+inference server.
+
+Each configuration is started, warmed up, and loaded with concurrent clients
+posting distinct copies of the audio to /transcribe/:
+
+- single: one uvicorn worker holding the models, as in docker-compose.yml;
+- workers: several uvicorn workers, each one holding its own models;
+- server: several uvicorn workers forwarding to one inference server.
+
+    python benchmark_serving.py ../audios/foo.mp3 --whisper-model base --workers 4
+"""
+
+__author__ = "Mauricio Vanzulli"
+__email__ = "mcvanzulli@gmail.com"
+
+# Built-in modules
+import io
+import os
+import sys
+import time
+import wave
+import argparse
+import tempfile
+import statistics
+import subprocess
+import threading
+
+# Third-party libraries
+import httpx
+import numpy as np
+
+# Global variables
+CONFIGURATIONS = ["single", "workers", "server"]
+DEFAULT_WORKERS = 4
+DEFAULT_CLIENTS = 8
+DEFAULT_REQUESTS_PER_CLIENT = 4
+SAMPLE_RATE = 16000
+READY_TIMEOUT = 600.0
+READY_CHECKS = 10
+PORT = 8123
+
+
+def _decode(audio_filename: str) -> np.ndarray:
+    """Decode an audio file to 16 kHz mono 16-bit samples."""
+    pcm = subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", audio_filename]
+        + ["-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-"],
+        capture_output=True,
+        check=True,
+    ).stdout
+    return np.frombuffer(pcm, dtype="<i2")
+
+
+def _wav(samples: np.ndarray, index: int) -> bytes:
+    """Encode a copy of the samples that differs by one sample per index.
+
+    The API shares the result of identical uploads, which would hide the load.
+    """
+    samples = samples.copy()
+    samples[0] = index
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def _tree_rss(pid: int) -> int:
+    """Get the resident memory of a process and its descendants, in bytes."""
+    rss = 0
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                rss += int(line.split()[1]) * 1024
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            rss += sum(_tree_rss(int(child)) for child in f.read().split())
+    return rss
+
+
+def _start(configuration: str, args, socket: str) -> list:
+    """Start the processes of a configuration, the API last."""
+    env = dict(
+        os.environ,
+        WHISPER_MODEL=args.whisper_model,
+        MAX_CONCURRENT_INFERENCES=str(args.models),
+    )
+    workers = 1 if configuration == "single" else args.workers
+
+    processes = []
+    if configuration == "server":
+        env["INFERENCE_SERVER"] = socket
+        processes.append(
+            subprocess.Popen(
+                [sys.executable, "serving.py", "--socket", socket]
+                + ["--models", str(args.models)],
+                env=env,
+            )
+        )
+    processes.append(
+        subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "api:app", "--port", str(PORT)]
+            + ["--workers", str(workers), "--log-level", "warning"],
+            env=env,
+        )
+    )
+    return processes
+
+
+def _wait_until_ready(url: str) -> None:
+    """Wait for /readyz, answered by any of the workers, to succeed repeatedly."""
+    start, successes = time.perf_counter(), 0
+    while time.perf_counter() - start < READY_TIMEOUT:
+        try:
+            response = httpx.get(f"{url}/readyz")
+            successes = successes + 1 if response.status_code == 200 else 0
+            if successes == READY_CHECKS:
+                return
+            if response.json().get("status") == "failed":
+                raise RuntimeError(response.json()["error"])
+        except httpx.TransportError:
+            successes = 0  # Not listening yet
+        time.sleep(0.5 if successes else 1)
+    raise TimeoutError(f"{url} was not ready after {READY_TIMEOUT} s")
+
+
+def _load(url: str, samples: np.ndarray, clients: int, requests: int) -> dict:
+    """Run concurrent clients posting distinct audio, measuring the latencies."""
+    latencies, errors, lock = [], [], threading.Lock()
+
+    def client(index: int) -> None:
+        with httpx.Client(timeout=None) as session:
+            for request in range(requests):
+                audio = _wav(samples, index * requests + request + 1)
+                start = time.perf_counter()
+                response = session.post(
+                    f"{url}/transcribe/", files={"file": ("audio.wav", audio)}
+                )
+                with lock:
+                    if response.status_code == 200:
+                        latencies.append(time.perf_counter() - start)
+                    else:
+                        errors.append(response.status_code)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests/s": len(latencies) / elapsed,
+        "p50 (s)": statistics.median(latencies) if latencies else float("nan"),
+        "errors": len(errors),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("audio_filename", help="Audio to transcribe.")
+    parser.add_argument(
+        "--configurations", nargs="+", default=CONFIGURATIONS, choices=CONFIGURATIONS
+    )
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--models", type=int, default=1, help="Models per process.")
+    parser.add_argument("--clients", type=int, default=DEFAULT_CLIENTS)
+    parser.add_argument(
+        "--requests-per-client", type=int, default=DEFAULT_REQUESTS_PER_CLIENT
+    )
+    parser.add_argument("--whisper-model", default="base")
+    args = parser.parse_args()
+
+    samples = _decode(args.audio_filename)
+    # The API reads its configuration files from the working directory
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    url = f"http://127.0.0.1:{PORT}"
+    socket = os.path.join(tempfile.mkdtemp(), "inference.sock")
+
+    print(f"{'configuration':>13} {'memory (MiB)':>12} {'requests/s':>10} ", end="")
+    print(f"{'p50 (s)':>8} {'errors':>6}")
+    for configuration in args.configurations:
+        processes = _start(configuration, args, socket)
+        try:
+            _wait_until_ready(url)
+            stats = _load(url, samples, args.clients, args.requests_per_client)
+            memory = sum(_tree_rss(process.pid) for process in processes)
+        finally:
+            for process in reversed(processes):
+                process.terminate()
+                process.wait()
+
+        print(
+            f"{configuration:>13} {memory / 2**20:>12.0f}"
+            f" {stats['requests/s']:>10.2f} {stats['p50 (s)']:>8.2f}"
+            f" {stats['errors']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
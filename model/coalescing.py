@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""Module defining the coalescing of identical concurrent requests."""
+
+__author__ = "Mauricio Vanzulli"
+__email__ = "mcvanzulli@gmail.com"
+
+# Built-in modules
+import asyncio
+import typing
+
+
+class SingleFlight:
+    """Class sharing one in-flight call between the identical concurrent calls.
+
+    The first call with a key runs the function in a task, and later calls
+    with the same key wait for that task instead of running their own, all of
+    them getting its result or its error. The key is forgotten once the task
+    is over, so the calls that follow run again.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.coalesced = 0  # Calls that waited for another one
+
+    async def run(
+        self, key: typing.Hashable, func: typing.Callable, *args
+    ) -> typing.Any:
+        """Await func(*args), or the in-flight call with the same key.
+
+        A caller being cancelled does not cancel the call the others wait for.
+        """
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args))
+            self.calls[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: typing.Hashable, task: asyncio.Future) -> None:
+        if self.calls.get(key) is task:
+            del self.calls[key]
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+import time
+import threading
+import numpy as np
+import pytest
+from whisper.audio import SAMPLE_RATE
+
+import api
+import model
+import batching
+import coalescing
+
+
+class FakeWhisperModel:
+    """Whisper model answering right away, so that no test loads a real one."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def transcribe(self, audio, **options):
+        self.calls += 1
+        duration = len(audio) / SAMPLE_RATE
+        return {
+            "text": "Hola",
+            "language": "es",
+            "segments": [{"start": 0.0, "end": duration, "text": " Hola"}],
+        }
+
+
+def silence(seconds: float = 1.0) -> np.ndarray:
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+# Transcription of a second of audio by FakeWhisperModel
+HOLA = {
+    "text": "Hola",
+    "language": "es",
+    "segments": [{"start": 0.0, "end": 1.0, "text": " Hola"}],
+}
+
+
+def fake_decode_windows(model, windows):
+    return [
+        model.transcribe(samples, language=language) for samples, language in windows
+    ]
+
+
+@pytest.fixture(autouse=True)
+def model_pool(monkeypatch):
+    monkeypatch.setattr(batching, "decode_windows", fake_decode_windows)
+    pool = model.ModelPool(loader=FakeWhisperModel)
+    monkeypatch.setattr(model, "model_pool", pool)
+    monkeypatch.setattr(api, "model_pool", pool)
+    return pool
+
+
+@pytest.fixture()
+def release(monkeypatch, tmp_path):
+    """Make the transcriptions block until the returned event is set.
+
+    The event lists the content of the transcribed files in transcribed.
+    """
+    event = threading.Event()
+    event.transcribed = []
+
+    def fake_load_audio(filename):
+        with open(filename, "rb") as f:
+            event.transcribed.append(f.read())
+        event.wait()
+        return silence()
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(api, "load_audio", fake_load_audio)
+    monkeypatch.setattr(api, "in_flight", coalescing.SingleFlight())
+    yield event
+    event.set()
+
+
+def wait_for(condition, timeout: float = 5.0) -> None:
+    start = time.perf_counter()
+    while not condition():
+        assert time.perf_counter() - start < timeout, "Condition never met"
+        time.sleep(0.01)
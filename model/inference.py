@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""Module defining the executor running the blocking inference of the API."""
+
+__author__ = "Mauricio Vanzulli"
+__email__ = "mcvanzulli@gmail.com"
+
+# Built-in modules
+import math
+import time
+import asyncio
+import threading
+import typing
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Global variables
+DEFAULT_MAX_CONCURRENT = 1
+DEFAULT_MAX_WAITING = 8
+DEFAULT_WAIT_TIMEOUT = 60.0
+DEFAULT_DURATION = 30.0  # Guess of an inference duration until one is measured
+DURATION_SMOOTHING = 0.2
+
+
+class OverloadedError(Exception):
+    """Raised when an inference cannot be run now, with the seconds to retry after."""
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """Executor running blocking inference off the event loop.
+
+    At most max_concurrent inferences run at once. Up to max_waiting more wait
+    for a free slot, and further requests are rejected with a 429. A request
+    still waiting after wait_timeout is given up with a 503.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+        max_waiting: int = DEFAULT_MAX_WAITING,
+        wait_timeout: float = DEFAULT_WAIT_TIMEOUT,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_concurrent, thread_name_prefix="inference"
+        )
+
+        self.running = 0
+        self.pending = 0
+        self.duration = DEFAULT_DURATION
+        self.lock = threading.Lock()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "running": self.running,
+                "waiting": self.pending - self.running,
+                "max_concurrent": self.max_concurrent,
+                "max_waiting": self.max_waiting,
+            }
+
+    def is_saturated(self) -> bool:
+        """Tell whether a new request would be rejected."""
+        return self.pending >= self.max_concurrent + self.max_waiting
+
+    def retry_after(self) -> int:
+        """Estimate the seconds until a slot is free, from the recent durations."""
+        rounds = self.pending / self.max_concurrent
+        return max(1, math.ceil(self.duration * rounds))
+
+    def _call(self, func: typing.Callable, *args) -> typing.Any:
+        """Run an inference, measuring its duration."""
+        with self.lock:
+            self.running += 1
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            duration = time.perf_counter() - start
+            with self.lock:
+                self.running -= 1
+                self.duration += DURATION_SMOOTHING * (duration - self.duration)
+
+    def _done(self, future: Future) -> None:
+        with self.lock:
+            self.pending -= 1
+
+    def submit(self, func: typing.Callable, *args) -> Future:
+        """Queue an inference without any admission control."""
+        with self.lock:
+            self.pending += 1
+        future = self.executor.submit(self._call, func, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def run_sync(self, func: typing.Callable, *args) -> typing.Any:
+        """Run an inference from a worker thread, waiting as long as needed."""
+        return self.submit(func, *args).result()
+
+    async def run(self, func: typing.Callable, *args) -> typing.Any:
+        """Run an inference from the event loop, raising OverloadedError when
+        there is no room to wait or the wait times out."""
+        if self.is_saturated():
+            raise OverloadedError(
+                "Too many requests waiting, try again later.", 429, self.retry_after()
+            )
+
+        future = self.submit(func, *args)
+        result = asyncio.wrap_future(future)
+        try:
+            return await asyncio.wait_for(asyncio.shield(result), self.wait_timeout)
+        except asyncio.TimeoutError:
+            # Only give up requests that did not start, and let the others end
+            if future.cancel():
+                raise OverloadedError(
+                    "Timed out waiting for the model, try again later.",
+                    503,
+                    self.retry_after(),
+                )
+            return await result
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""Module defining the background job queue of the API."""
+
+__author__ = "Mauricio Vanzulli"
+__email__ = "mcvanzulli@gmail.com"
+
+# Built-in modules
+import time
+import uuid
+import queue
+import asyncio
+import threading
+import typing
+
+# Global variables
+DEFAULT_WORKERS = 1
+DEFAULT_MAX_QUEUED_JOBS = 16
+DEFAULT_JOB_TTL = 3600.0  # Finished jobs are forgotten after an hour
+FINISHED_STATUSES = ("done", "failed")
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted to a full queue."""
+
+
+class Job:
+    """Class representing a job, its progress and its partial results.
+
+    The job function reports its progress with update(), and every update is
+    recorded as an event that subscribers receive in their event loop.
+    """
+
+    def __init__(self, func: typing.Callable, *args):
+        self.id = uuid.uuid4().hex
+        self.func = func
+        self.args = args
+
+        self.status = "queued"
+        self.stage = None
+        self.progress = 0.0
+        self.result = {}
+        self.error = None
+        self.finished = None
+
+        self.events = []
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "result": dict(self.result),
+            "error": self.error,
+        }
+
+    def update(
+        self,
+        status: str = None,
+        stage: str = None,
+        progress: float = None,
+        error: str = None,
+        **results,
+    ) -> None:
+        """Update the state of the job, merging the given partial results."""
+        with self.lock:
+            self.status = status or self.status
+            self.stage = stage or self.stage
+            self.progress = self.progress if progress is None else progress
+            self.error = error or self.error
+            self.result.update(results)
+            if self.status in FINISHED_STATUSES:
+                self.finished = time.time()
+
+            event = self.to_dict()
+            self.events.append(event)
+            for loop, events in self.subscribers:
+                loop.call_soon_threadsafe(events.put_nowait, event)
+
+    def subscribe(self) -> asyncio.Queue:
+        """Get a queue with the past and future events of the job.
+
+        Must be called from the event loop that reads the queue.
+        """
+        events = asyncio.Queue()
+        with self.lock:
+            for event in self.events:
+                events.put_nowait(event)
+            self.subscribers.append((asyncio.get_running_loop(), events))
+        return events
+
+    def unsubscribe(self, events: asyncio.Queue) -> None:
+        """Stop sending events to a queue from subscribe()."""
+        with self.lock:
+            self.subscribers = [s for s in self.subscribers if s[1] is not events]
+
+
+class JobQueue:
+    """Bounded queue of jobs run by a pool of worker threads.
+
+    Each job function is called with the job, to report its progress, followed
+    by its arguments. Its return value is merged into the job results.
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        max_queued: int = DEFAULT_MAX_QUEUED_JOBS,
+        job_ttl: float = DEFAULT_JOB_TTL,
+    ):
+        self.queue = queue.Queue(maxsize=max_queued)
+        self.job_ttl = job_ttl
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+        self.workers = [
+            threading.Thread(target=self._work, daemon=True) for _ in range(workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, func: typing.Callable, *args) -> Job:
+        """Queue a job, raising QueueFullError when the queue is full."""
+        job = Job(func, *args)
+        with self.lock:
+            self._forget_finished()
+            try:
+                self.queue.put_nowait(job)
+            except queue.Full:
+                raise QueueFullError(f"{self.queue.maxsize} jobs are already queued.")
+            self.jobs[job.id] = job
+        job.update()
+
+        return job
+
+    def get(self, job_id: str) -> Job:
+        """Get a job by id, raising KeyError when it is unknown or forgotten."""
+        return self.jobs[job_id]
+
+    def _forget_finished(self) -> None:
+        """Drop the jobs finished longer than the time to live ago."""
+        now = time.time()
+        for job_id, job in list(self.jobs.items()):
+            if job.finished is not None and now - job.finished > self.job_ttl:
+                del self.jobs[job_id]
+
+    def _work(self) -> None:
+        """Run the queued jobs, one at a time."""
+        while True:
+            job = self.queue.get()
+            job.update(status="running")
+            try:
+                results = job.func(job, *job.args) or {}
+                job.update(status="done", progress=1.0, **results)
+            except Exception as e:
+                job.update(status="failed", error=str(e))
+            finally:
+                self.queue.task_done()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""Load test of the API, served with fake Whisper and OpenAI backends.
+
+The real app runs in this process with models that sleep for the time Whisper
+and GPT would take, so the upload, decoding, queueing and summarization code
+paths are exercised without a GPU or an API key:
+
+    python loadtest.py --duration 60 --concurrency 16 --rate 4 \\
+        --endpoints transcribe=6,summarize_text=1,summarize_audio=3 \\
+        --audio-mix 60=7,600=2,3600=1
+
+Without --rate, every client sends a request as soon as the previous one is
+answered. The settings of the API, e.g. MAX_CONCURRENT_INFERENCES, are read
+from the environment as usual.
+"""
+
+__author__ = "Mauricio Vanzulli"
+__email__ = "mcvanzulli@gmail.com"
+
+# Built-in modules
+import io
+import os
+import time
+import random
+import asyncio
+import argparse
+import threading
+import types
+import contextlib
+import subprocess
+import collections
+
+# Third-party libraries
+import httpx
+import uvicorn
+
+# Global variables
+SAMPLE_RATE = 16000
+DEFAULT_DURATION = 30.0
+DEFAULT_CONCURRENCY = 8
+DEFAULT_ENDPOINTS = "transcribe=6,summarize_text=1,summarize_audio=3"
+DEFAULT_AUDIO_MIX = "60=7,600=2,3600=1"
+DEFAULT_WHISPER_RTF = 0.05  # Seconds of transcription per second of audio
+DEFAULT_GPT_SECONDS = 2.0  # Seconds per GPT call
+DEFAULT_TEXT_WORDS = 1000  # The text is sent in the query string
+PORT = 8124
+WORDS_PER_SECOND = 2.5  # Speech rate of the fake transcriptions
+
+
+class FakeWhisperModel:
+    """Whisper model sleeping for the time a real one would take."""
+
+    def __init__(self, real_time_factor: float = DEFAULT_WHISPER_RTF):
+        self.real_time_factor = real_time_factor
+
+    def transcribe(self, audio, **options) -> dict:
+        duration = len(audio) / SAMPLE_RATE
+        time.sleep(duration * self.real_time_factor)
+        text = " palabra" * int(duration * WORDS_PER_SECOND)
+        return {
+            "text": text,
+            "language": "es",
+            "segments": [{"start": 0.0, "end": duration, "text": text}],
+        }
+
+    def decode_windows(self, windows: list) -> list:
+        """Transcribe a batch of (samples, language) windows, one after the other."""
+        return [self.transcribe(samples) for samples, _ in windows]
+
+
+class FakeEncoding:
+    """Tokenizer counting a token per word, which needs no download."""
+
+    def encode(self, text: str) -> list:
+        return text.split()
+
+    def decode(self, tokens: list) -> str:
+        return " ".join(tokens)
+
+
+class FakeChatCompletion:
+    """OpenAI chat completion sleeping for the time of a GPT call."""
+
+    def __init__(self, seconds: float = DEFAULT_GPT_SECONDS):
+        self.seconds = seconds
+
+    def create(self, model: str, messages: list, temperature: float):
+        time.sleep(self.seconds)
+        choice = types.SimpleNamespace(message={"content": "Resumen de la reunión."})
+        return types.SimpleNamespace(choices=[choice])
+
+
+def _parse_mix(text: str) -> dict:
+    """Parse "name=weight,..." into a dict of weights."""
+    mix = {}
+    for item in text.split(","):
+        name, weight = item.split("=")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def _make_audio(seconds: float) -> bytes:
+    """Encode a tone of the given length to 16 kHz mono MP3."""
+    return subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-f", "lavfi"]
+        + ["-i", f"sine=frequency=300:sample_rate={SAMPLE_RATE}:duration={seconds}"]
+        + ["-ac", "1", "-b:a", "32k", "-f", "mp3", "-"],
+        capture_output=True,
+        check=True,
+    ).stdout
+
+
+def _tag(audio: bytes, request: int) -> bytes:
+    """Append an ID3v1 tag with the request number.
+
+    The API shares the result of identical uploads, which would hide the load.
+    """
+    title = f"request {request}".encode().ljust(30, b"\0")
+    return audio + b"TAG" + title + b"\0" * 94 + b"\xff"
+
+
+def _percentile(values: list, q: float) -> float:
+    """Get the q percentile of sorted values, by the nearest rank."""
+    if not values:
+        return float("nan")
+    return values[max(0, min(len(values) - 1, round(q / 100 * len(values)) - 1))]
+
+
+def _start_app(whisper_rtf: float, gpt_seconds: float) -> uvicorn.Server:
+    """Serve the app with fake backends on a thread, once it is listening."""
+    # The app reads its configuration files from the working directory
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    import model
+
+    model.model_pool = model.ModelPool(loader=lambda: FakeWhisperModel(whisper_rtf))
+    model.batching.decode_windows = lambda fake, windows: fake.decode_windows(windows)
+    model.openai.ChatCompletion = FakeChatCompletion(gpt_seconds)
+    model.tiktoken.get_encoding = lambda name: FakeEncoding()
+    import api
+
+    config = uvicorn.Config(api.app, host="127.0.0.1", port=PORT, log_level="error")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def _request(
+    client: httpx.AsyncClient, endpoint: str, audio: bytes, text: str
+) -> httpx.Response:
+    if endpoint == "transcribe":
+        return await client.post("/transcribe/", files={"file": ("a.mp3", audio)})
+    if endpoint == "summarize_audio":
+        return await client.post(
+            "/translate_summarize_audio/?language=en",
+            files={"file": ("a.mp3", audio)},
+        )
+    return await client.get(
+        "/translate_summarize_text/", params={"text": text, "language": "en"}
+    )
+
+
+async def _run(args, audios: dict) -> tuple:
+    """Send requests for the duration of the test, returning the results."""
+    endpoints = _parse_mix(args.endpoints)
+    mix = _parse_mix(args.audio_mix)
+    text = " palabra" * args.text_words
+    results, sent = [], 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def send(client: httpx.AsyncClient, request: int) -> None:
+        endpoint = random.choices(list(endpoints), list(endpoints.values()))[0]
+        length = random.choices(list(mix), list(mix.values()))[0]
+        audio = _tag(audios[length], request)
+        start = time.perf_counter()
+        try:
+            response = await _request(client, endpoint, audio, text)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        results.append((endpoint, status, time.perf_counter() - start))
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    url = f"http://127.0.0.1:{PORT}"
+    async with httpx.AsyncClient(base_url=url, timeout=None, limits=limits) as client:
+        start = time.perf_counter()
+        deadline = start + args.duration
+
+        async def limited(request: int) -> None:
+            async with semaphore:
+                await send(client, request)
+
+        if args.rate:
+            # Open loop: requests arrive at random, whether or not others are done
+            tasks = []
+            while time.perf_counter() < deadline:
+                tasks.append(asyncio.create_task(limited(sent)))
+                sent += 1
+                await asyncio.sleep(random.expovariate(args.rate))
+            await asyncio.gather(*tasks)
+        else:
+            # Closed loop: each client waits for its answer before the next request
+            async def user(index: int) -> None:
+                request = index
+                while time.perf_counter() < deadline:
+                    await send(client, request)
+                    request += args.concurrency
+
+            await asyncio.gather(*(user(i) for i in range(args.concurrency)))
+
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def _report(results: list, elapsed: float) -> None:
+    by_endpoint = collections.defaultdict(list)
+    for endpoint, status, latency in results:
+        by_endpoint[endpoint].append((status, latency))
+        by_endpoint["all"].append((status, latency))
+
+    print(
+        f"{'endpoint':>16} {'requests':>8} {'ok/s':>7} {'errors':>7}"
+        f" {'p50 (s)':>8} {'p95 (s)':>8} {'p99 (s)':>8}  statuses"
+    )
+    for endpoint, requests in sorted(by_endpoint.items(), key=lambda i: i[0] != "all"):
+        latencies = sorted(latency for status, latency in requests if status == 200)
+        errors = len(requests) - len(latencies)
+        statuses = collections.Counter(status for status, _ in requests)
+        print(
+            f"{endpoint:>16} {len(requests):>8} {len(latencies) / elapsed:>7.2f}"
+            f" {errors / len(requests):>7.1%}"
+            f" {_percentile(latencies, 50):>8.2f} {_percentile(latencies, 95):>8.2f}"
+            f" {_percentile(latencies, 99):>8.2f}  {dict(statuses)}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--rate", type=float, help="Requests per second, at random.")
+    parser.add_argument(
+        "--endpoints",
+        default=DEFAULT_ENDPOINTS,
+        help="Weights of transcribe, summarize_text and summarize_audio.",
+    )
+    parser.add_argument(
+        "--audio-mix", default=DEFAULT_AUDIO_MIX, help="Weights of audio seconds."
+    )
+    parser.add_argument("--text-words", type=int, default=DEFAULT_TEXT_WORDS)
+    parser.add_argument("--whisper-rtf", type=float, default=DEFAULT_WHISPER_RTF)
+    parser.add_argument("--gpt-seconds", type=float, default=DEFAULT_GPT_SECONDS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    audios = {
+        length: _make_audio(float(length)) for length in _parse_mix(args.audio_mix)
+    }
+    # Silence the progress messages of the app
+    with contextlib.redirect_stdout(io.StringIO()):
+        server = _start_app(args.whisper_rtf, args.gpt_seconds)
+        try:
+            results, elapsed = asyncio.run(_run(args, audios))
+        finally:
+            server.should_exit = True
+
+    _report(results, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""Module defining the Prometheus metrics of the API."""
+
+__author__ = "Mauricio Vanzulli"
+__email__ = "mcvanzulli@gmail.com"
+
+# Built-in modules
+import time
+import typing
+import contextlib
+
+# Third-party libraries
+from prometheus_client import Counter, Gauge, Histogram
+
+# Global variables
+PREFIX = "meeting_assistant"
+SHORT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LONG_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 3600)
+REAL_TIME_FACTOR_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+REQUESTS = Counter(
+    f"{PREFIX}_requests_total",
+    "HTTP requests, by route and status code.",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    f"{PREFIX}_requests_in_flight", "HTTP requests being served."
+)
+INFERENCES_RUNNING = Gauge(
+    f"{PREFIX}_inferences_running", "Transcriptions running on the executor."
+)
+INFERENCES_WAITING = Gauge(
+    f"{PREFIX}_inferences_waiting", "Transcriptions waiting for the executor."
+)
+JOBS_QUEUED = Gauge(f"{PREFIX}_jobs_queued", "Background jobs waiting for a worker.")
+WINDOWS_QUEUED = Gauge(
+    f"{PREFIX}_windows_queued", "Uploaded and streamed windows waiting for a batch."
+)
+BATCH_SIZE = Histogram(
+    f"{PREFIX}_window_batch_size",
+    "Windows transcribed together in a batch.",
+    buckets=BATCH_SIZE_BUCKETS,
+)
+COALESCED_IN_FLIGHT = Gauge(
+    f"{PREFIX}_coalesced_calls_in_flight",
+    "Distinct transcriptions and summaries shared by identical requests.",
+)
+
+STAGE_LABELS = {"gpt_call": ("model",), "pipeline": ("endpoint",)}
+STAGES = {
+    "upload": Histogram(
+        f"{PREFIX}_upload_seconds",
+        "Time saving an upload to disk.",
+        buckets=SHORT_BUCKETS,
+    ),
+    "decode": Histogram(
+        f"{PREFIX}_decode_seconds",
+        "Time decoding an audio file to samples.",
+        buckets=SHORT_BUCKETS,
+    ),
+    "transcription": Histogram(
+        f"{PREFIX}_transcription_seconds",
+        "Time running Whisper on decoded audio.",
+        buckets=LONG_BUCKETS,
+    ),
+    "gpt_call": Histogram(
+        f"{PREFIX}_gpt_call_seconds",
+        "Time of each GPT request, by model.",
+        STAGE_LABELS["gpt_call"],
+        buckets=LONG_BUCKETS,
+    ),
+    "pipeline": Histogram(
+        f"{PREFIX}_pipeline_seconds",
+        "Total time processing a request, by endpoint.",
+        STAGE_LABELS["pipeline"],
+        buckets=LONG_BUCKETS,
+    ),
+}
+REAL_TIME_FACTOR = Histogram(
+    f"{PREFIX}_transcription_real_time_factor",
+    "Transcription time divided by the duration of the audio.",
+    buckets=REAL_TIME_FACTOR_BUCKETS,
+)
+STAGE_ERRORS = Counter(
+    f"{PREFIX}_stage_errors_total", "Stages that raised, by stage.", ["stage"]
+)
+
+
+def observe(stage: str, seconds: float, labels: dict) -> None:
+    """Record the duration of a stage, as an observer of the library's instruments."""
+    histogram = STAGES.get(stage)
+    if histogram is None:
+        return
+
+    if "error" in labels:
+        STAGE_ERRORS.labels(stage).inc()
+    if stage in STAGE_LABELS:
+        histogram = histogram.labels(
+            *(labels.get(name, "") for name in STAGE_LABELS[stage])
+        )
+    histogram.observe(seconds)
+
+    if stage == "transcription" and labels.get("audio_seconds"):
+        REAL_TIME_FACTOR.observe(seconds / labels["audio_seconds"])
+
+
+@contextlib.contextmanager
+def timed(stage: str, **labels) -> typing.Iterator[dict]:
+    """Time a stage of the API, yielding labels to fill in meanwhile."""
+    start = time.perf_counter()
+    try:
+        yield labels
+    except Exception as e:
+        labels["error"] = type(e).__name__
+        raise
+    finally:
+        observe(stage, time.perf_counter() - start, labels)
@@ -6,21 +6,26 @@ import sys
 import time
 import threading
 import signal
+import queue
+import contextlib
 import subprocess
 import yaml
+import numpy as np
 import ffmpeg
 import openai
 import tiktoken
-import torch
-import whisper
 from dotenv import load_dotenv
 
+import batching
+import metrics
+
 # Set up environment variables
 OS = "linux"
-DEVICE = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
 
 # Whisper
-WHISPER_MODEL = "medium"
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "medium")
+WARM_UP_SECONDS = 1
+SAMPLE_RATE = 16000  # Whisper decodes every audio to 16 kHz mono
 
 # Set the environment variable OPEN_API_KEY to your OpenAI API key
 ENV_OPENAI_KEY = "OPEN_API_KEY"
@@ -36,6 +41,7 @@ with open("language_roles.yaml", "r") as f:
 # Init clock
 stop_timer = False
 
+
 def record_meeting(output_filename):
     """
     Record a meeting using ffmpeg and display a ticker on the console.
@@ -119,10 +125,113 @@ def display_clock():
         time.sleep(1)
 
 
+def load_whisper_model():
+    """Load the pre-trained whisper model."""
+    # Imported on first use, so that processes without models stay light
+    import torch
+    import whisper
+
+    device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+    return whisper.load_model(WHISPER_MODEL, device=device)
+
+
+class ModelPool:
+    """
+    Pool of loaded whisper models, each one used by a single transcription at a time.
+
+    The models are loaded once, either up front with load() or on first use, so
+    that transcriptions do not pay for loading them.
+    """
+
+    def __init__(self, loader=load_whisper_model):
+        self.loader = loader
+        self.models = queue.Queue()
+        self.size = 0
+        self.loading = False
+        self.error = None
+        self.ready = threading.Event()
+        self.lock = threading.Lock()
+
+    def load(self, size=1, warm_up=True):
+        """
+        Load the models and run a first inference with each one.
+
+        The first inference of a model is much slower than the next ones, so
+        the pool is only ready once every model ran one.
+        """
+        with self.lock:
+            if self.loading:
+                return
+            self.loading = True
+
+        try:
+            for _ in range(size):
+                model = self.loader()
+                if warm_up:
+                    silence = np.zeros(WARM_UP_SECONDS * SAMPLE_RATE)
+                    model.transcribe(silence.astype(np.float32), fp16=False)
+                self.models.put(model)
+                self.size += 1
+            self.ready.set()
+        except Exception as e:
+            self.error = e
+            raise
+
+    @contextlib.contextmanager
+    def acquire(self):
+        """Borrow a model, waiting for one to be free."""
+        if not self.loading:
+            self.load(warm_up=False)
+
+        while True:
+            try:
+                model = self.models.get(timeout=1)
+                break
+            except queue.Empty:
+                if self.error is not None:
+                    error = RuntimeError("The whisper models failed to load.")
+                    raise error from self.error
+
+        try:
+            yield model
+        finally:
+            self.models.put(model)
+
+
+# Whisper models shared by the transcriptions
+model_pool = ModelPool()
+
+
+def load_audio(filename):
+    """Decode an audio file to 16 kHz mono float32 samples, as whisper does.
+
+    FFmpeg is called directly, so that the API workers forwarding their
+    transcriptions to an inference server do not import torch.
+
+    Args:
+        filename (str): The name of the audio file to decode.
+
+    Returns:
+        np.ndarray: The samples, between -1 and 1.
+    """
+    with metrics.timed("decode"):
+        try:
+            pcm = subprocess.run(
+                ["ffmpeg", "-nostdin", "-threads", "0", "-i", filename]
+                + ["-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le"]
+                + ["-ar", str(SAMPLE_RATE), "-"],
+                capture_output=True,
+                check=True,
+            ).stdout
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"Failed to load audio: {e.stderr.decode()}") from e
+    return np.frombuffer(pcm, np.int16).astype(np.float32) / 32768.0
+
+
 def transcribe_audio(filename):
     """Transcribe the audio from a file using a pre-trained whisper model.
 
-    This function loads a pre-trained whisper model, loads the audio from a file specified by filename,
+    This function borrows a pre-trained whisper model from the pool, loads the audio from a file specified by filename,
     and transcribes the audio using the model. The function then returns the transcribed text.
 
     Args:
@@ -131,20 +240,36 @@ def transcribe_audio(filename):
     Returns:
         str: The transcribed text as a string.
     """
-    # load model
-    model = whisper.load_model(WHISPER_MODEL, device=DEVICE)
-
-    # load audio and pad/trim it to fit 30 seconds
-    audio = whisper.load_audio(filename)
+    audio = load_audio(filename)
 
     print("Starting Transcribing Process With Automatic Language Detection...")
 
-    result = model.transcribe(audio, verbose=False, fp16=False, task="transcribe")
+    audio_seconds = len(audio) / SAMPLE_RATE
+    with model_pool.acquire() as model:
+        with metrics.timed("transcription", audio_seconds=audio_seconds):
+            result = model.transcribe(
+                audio, verbose=False, fp16=False, task="transcribe"
+            )
 
     return result["text"], result["language"]
 
 
-def summarize_and_translate(transcript, language="en"):
+def transcribe_windows(windows):
+    """Transcribe a batch of audio windows of up to 30 seconds with a single model.
+
+    Args:
+        windows (list): The (samples, language) windows, with None to detect the language.
+
+    Returns:
+        list: The whisper-like result of each window, with the segments and the language.
+    """
+    audio_seconds = sum(len(samples) for samples, _ in windows) / SAMPLE_RATE
+    with model_pool.acquire() as model:
+        with metrics.timed("transcription", audio_seconds=audio_seconds):
+            return batching.decode_windows(model, windows)
+
+
+def summarize_and_translate(transcript, language="en", on_chunk=None):
     """
     Generate a summary of a transcript using OpenAI's GPT-3 language model.
 
@@ -155,6 +280,8 @@ def summarize_and_translate(transcript, language="en"):
     Args:
         transcript (str): The transcript to summarize.
         language (str): The language of the transcript. Defaults to English.
+        on_chunk (callable): Called with the index, the number of chunks and the
+            summary of each chunk as soon as it is generated. Optional.
 
     Returns:
         A string containing the summary of the transcript.
@@ -179,14 +306,15 @@ def summarize_and_translate(transcript, language="en"):
         command_prompt = language_roles[language]["command_prompt"]
 
         # Get command role and prompts from the config file
-        response = openai.ChatCompletion.create(
-            model=GPT_MODEL,
-            messages=[
-                {"role": "system", "content": f"{role}"},
-                {"role": "user", "content": f"{command_prompt}: {prompt}"},
-            ],
-            temperature=TEMPERATURE,
-        )
+        with metrics.timed("gpt_call", model=GPT_MODEL):
+            response = openai.ChatCompletion.create(
+                model=GPT_MODEL,
+                messages=[
+                    {"role": "system", "content": f"{role}"},
+                    {"role": "user", "content": f"{command_prompt}: {prompt}"},
+                ],
+                temperature=TEMPERATURE,
+            )
         return response.choices[0].message["content"].strip()
 
     # Initialize a list to store the smaller chunks of text
@@ -206,7 +334,13 @@ def summarize_and_translate(transcript, language="en"):
         # Move on to the next set of tokens
         tokens = tokens[SIZE_CHUNK:]
 
-    summary = "\n".join([generate_summary(chunk, language) for chunk in chunks])
+    summaries = []
+    for index, chunk in enumerate(chunks):
+        summaries.append(generate_summary(chunk, language))
+        if on_chunk is not None:
+            on_chunk(index, len(chunks), summaries[-1])
+
+    summary = "\n".join(summaries)
 
     return summary
 
@@ -273,7 +407,7 @@ if __name__ == "__main__":
             summary = summarize_and_translate(transcript, language)
 
             print_output(transcript, summary, language)
-            sys.exit(1)
+            sys.exit(0)
         else:
             language = sys.argv[3]
             # Check language is in the keys of the language_roles dictionary
@@ -284,7 +418,7 @@ if __name__ == "__main__":
             summary = summarize_and_translate(transcript, language)
 
             print_output(transcript, summary, language)
-            sys.exit(1)
+            sys.exit(0)
     else:
         print(
             f"Action {action} not supported. Please use one of the following actions: record, summarize"
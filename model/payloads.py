@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""Module defining how the API reads and writes large JSON payloads.
+
+Request bodies may be gzip-compressed, with a Content-Encoding: gzip header,
+and responses are serialized with orjson and gzip-compressed for the clients
+accepting it.
+"""
+
+__author__ = "Mauricio Vanzulli"
+__email__ = "mcvanzulli@gmail.com"
+
+# Built-in modules
+import gzip
+import zlib
+import typing
+
+# Third-party libraries
+import orjson
+import pydantic
+from fastapi import HTTPException, Request, Response
+
+# Global variables
+DEFAULT_MAX_BODY_BYTES = 64 << 20  # 64 MiB once decompressed, days of transcript
+MIN_COMPRESSED_BYTES = 1 << 10  # Smaller responses are not worth compressing
+COMPRESSION_LEVEL = 6
+
+
+class Segment(pydantic.BaseModel):
+    """Segment of a transcript, as returned by the transcriptions."""
+
+    text: str
+    start: typing.Optional[float] = None
+    end: typing.Optional[float] = None
+    speaker: typing.Optional[str] = None
+
+
+class SummaryRequest(pydantic.BaseModel):
+    """Transcript to summarize, as flat text or segments, and the languages."""
+
+    text: typing.Optional[str] = None
+    segments: typing.List[Segment] = []
+    languages: typing.List[str] = pydantic.Field(default=["en"], min_length=1)
+
+    @pydantic.model_validator(mode="after")
+    def _has_transcript(self) -> "SummaryRequest":
+        if self.text is None and not self.segments:
+            raise ValueError("Either text or segments is required.")
+        return self
+
+    def transcript(self) -> str:
+        """Get the transcript, with a line per segment and its speaker if any."""
+        if self.text is not None:
+            return self.text
+        return "\n".join(
+            (
+                f"{segment.speaker}: {segment.text.strip()}"
+                if segment.speaker
+                else segment.text.strip()
+            )
+            for segment in self.segments
+        )
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """Tell whether an Accept-Encoding header allows gzip, e.g. "gzip, br"."""
+    for item in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        if coding.lower() in ("gzip", "*"):
+            weights = [param[2:] for param in params if param.startswith("q=")]
+            try:
+                return not weights or float(weights[0]) > 0
+            except ValueError:
+                return False
+    return False
+
+
+async def read_body(request: Request, max_bytes: int = DEFAULT_MAX_BODY_BYTES) -> bytes:
+    """Read a request body, decompressing it on the way if it is gzipped.
+
+    The body is never held compressed in full, and reading stops with a 413
+    past max_bytes of decompressed data, so small gzip bombs are harmless.
+    Concatenated gzip members are read one after the other, and anything else
+    after a member is rejected with a 400.
+    """
+    encoding = request.headers.get("content-encoding", "identity").lower()
+    if encoding not in ("identity", "gzip"):
+        raise HTTPException(415, f"Unsupported Content-Encoding: {encoding}.")
+    # wbits of 16 + MAX_WBITS expects a gzip header and trailer
+    decompressor = (
+        zlib.decompressobj(16 + zlib.MAX_WBITS) if encoding == "gzip" else None
+    )
+
+    body = bytearray()
+    try:
+        async for chunk in request.stream():
+            if decompressor is None:
+                body += chunk
+                chunk = b""
+            while chunk:
+                if decompressor.eof:
+                    # The data after a member must be another member
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                body += decompressor.decompress(chunk, max_bytes + 1 - len(body))
+                if len(body) > max_bytes:
+                    break
+                chunk = decompressor.unused_data if decompressor.eof else b""
+            if len(body) > max_bytes:
+                raise HTTPException(413, f"Bodies are limited to {max_bytes} bytes.")
+        if decompressor is not None and not decompressor.eof:
+            raise HTTPException(400, "Truncated gzip body.")
+    except zlib.error as e:
+        raise HTTPException(400, f"Invalid gzip body: {e}")
+    return bytes(body)
+
+
+async def read_json(
+    request: Request,
+    model: typing.Type[pydantic.BaseModel],
+    max_bytes: int = DEFAULT_MAX_BODY_BYTES,
+) -> pydantic.BaseModel:
+    """Read and validate a JSON request body, which may be gzipped."""
+    body = await read_body(request, max_bytes)
+    try:
+        return model.model_validate(orjson.loads(body))
+    except orjson.JSONDecodeError as e:
+        raise HTTPException(400, f"Invalid JSON body: {e}")
+    except pydantic.ValidationError as e:
+        raise HTTPException(
+            422, e.errors(include_url=False, include_context=False, include_input=False)
+        )
+
+
+def json_response(request: Request, content: typing.Any) -> Response:
+    """Serialize content with orjson, gzipped if the client accepts it."""
+    body = orjson.dumps(content)
+    headers = {"Vary": "Accept-Encoding"}
+    accepted = request.headers.get("accept-encoding", "")
+    if len(body) >= MIN_COMPRESSED_BYTES and _accepts_gzip(accepted):
+        body = gzip.compress(body, COMPRESSION_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""Module defining the inference server shared by the API workers.
+
+A single process holds the Whisper models, and the API workers forward their
+transcriptions to it over a Unix socket, so the memory grows with the number
+of models instead of the number of workers:
+
+    python serving.py --socket /tmp/inference.sock --models 1 &
+    INFERENCE_SERVER=/tmp/inference.sock uvicorn api:app --workers 4
+"""
+
+__author__ = "Mauricio Vanzulli"
+__email__ = "mcvanzulli@gmail.com"
+
+# Built-in modules
+import os
+import time
+import queue
+import argparse
+import threading
+import contextlib
+import typing
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Client, Listener
+from multiprocessing.shared_memory import SharedMemory
+
+# Third-party libraries
+import numpy as np
+
+# Local modules
+import batching
+import inference
+import model
+
+# Global variables
+DEFAULT_SOCKET = "/tmp/meeting-assistant-inference.sock"
+DEFAULT_MODELS = 1
+STATUS_POLL_SECONDS = 1.0
+_client_buffers = set()  # Names of the buffers created by the clients of this process
+
+
+class InferenceServerError(RuntimeError):
+    """Raised when the inference server fails to run a request."""
+
+
+class InferenceServer:
+    """Server running the transcriptions of the API workers on its model pool.
+
+    Every connection is served by its own thread. Files are passed by path,
+    since the workers share the file system, and audio windows through a
+    shared memory buffer. The windows of all the workers are micro-batched
+    together.
+    """
+
+    def __init__(
+        self,
+        address: str = DEFAULT_SOCKET,
+        models: int = DEFAULT_MODELS,
+        max_batch_size: int = batching.DEFAULT_MAX_BATCH_SIZE,
+        max_wait: float = batching.DEFAULT_MAX_WAIT,
+    ):
+        self.address = address
+        self.models = models
+        self.closed = False
+        self.handlers = {
+            "status": self._status,
+            "transcribe_audio": self._transcribe_audio,
+            "transcribe_windows": self._transcribe_windows,
+        }
+        self.window_batcher = batching.MicroBatcher(
+            model.transcribe_windows,
+            workers=models,
+            max_batch_size=max_batch_size,
+            max_wait=max_wait,
+        )
+
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(address)
+        # Requests are pickled, so only the user running the server may connect.
+        # The socket is created without access for others, never granted it.
+        umask = os.umask(0o177)
+        try:
+            self.listener = Listener(address, family="AF_UNIX")
+        finally:
+            os.umask(umask)
+
+    def serve_forever(self) -> None:
+        """Load the models in the background and serve the connections."""
+        threading.Thread(
+            target=model.model_pool.load, args=(self.models,), daemon=True
+        ).start()
+
+        while True:
+            try:
+                connection = self.listener.accept()
+            except OSError:
+                # close() may shut the listener before the wake-up is accepted
+                if self.closed:
+                    return
+                raise
+            if self.closed:
+                connection.close()
+                return
+            threading.Thread(
+                target=self._serve, args=(connection,), daemon=True
+            ).start()
+
+    def close(self) -> None:
+        """Stop serving new connections."""
+        self.closed = True
+        # Wake up the accept() of serve_forever
+        Client(self.address, family="AF_UNIX").close()
+        self.listener.close()
+
+    def _serve(self, connection) -> None:
+        with connection:
+            while True:
+                try:
+                    method, args = connection.recv()
+                except EOFError:
+                    return
+
+                try:
+                    response = ("ok", self.handlers[method](*args))
+                except inference.OverloadedError as e:
+                    # Sent apart, so that the API still answers with a 429 or 503
+                    response = ("overloaded", (str(e), e.status_code, e.retry_after))
+                except Exception as e:
+                    response = ("error", f"{type(e).__name__}: {e}")
+                connection.send(response)
+
+    def _status(self) -> dict:
+        pool = model.model_pool
+        return {
+            "ready": pool.ready.is_set(),
+            "error": None if pool.error is None else str(pool.error),
+            "models": pool.size,
+        }
+
+    def _transcribe_audio(self, filename: str) -> tuple:
+        return model.transcribe_audio(filename)
+
+    def _transcribe_windows(
+        self, buffer_name: str, lengths: typing.List[int], languages: list
+    ) -> list:
+        buffer = SharedMemory(name=buffer_name)
+        # The client owns the buffer, which must not be unlinked when we exit
+        if buffer_name not in _client_buffers:
+            resource_tracker.unregister(buffer._name, "shared_memory")
+        try:
+            samples = np.ndarray(sum(lengths), dtype=np.float32, buffer=buffer.buf)
+            offsets = np.cumsum([0] + lengths)
+            windows = [
+                (samples[start:end].copy(), language)
+                for start, end, language in zip(offsets, offsets[1:], languages)
+            ]
+            del samples
+        finally:
+            buffer.close()
+
+        futures = [self.window_batcher.submit(window) for window in windows]
+        return [future.result() for future in futures]
+
+
+class InferenceClient:
+    """Client of the inference server, with the interface of model.py.
+
+    Connections are kept open and reused, one per concurrent call.
+    """
+
+    def __init__(self, address: str = DEFAULT_SOCKET):
+        self.address = address
+        self.connections = queue.LifoQueue()
+
+    @contextlib.contextmanager
+    def _connection(self):
+        try:
+            connection = self.connections.get_nowait()
+        except queue.Empty:
+            connection = Client(self.address, family="AF_UNIX")
+
+        try:
+            yield connection
+        except BaseException:
+            # The connection may be halfway through a message
+            connection.close()
+            raise
+        self.connections.put(connection)
+
+    def _call(self, method: str, *args) -> typing.Any:
+        with self._connection() as connection:
+            connection.send((method, args))
+            status, result = connection.recv()
+        if status == "overloaded":
+            raise inference.OverloadedError(*result)
+        if status == "error":
+            raise InferenceServerError(result)
+        return result
+
+    def status(self) -> dict:
+        """Get whether the models of the server are ready, or failed to load."""
+        return self._call("status")
+
+    def transcribe_audio(self, filename: str) -> tuple:
+        """Transcribe an audio file, returning its text and language."""
+        return self._call("transcribe_audio", os.path.abspath(filename))
+
+    def transcribe_windows(self, windows: list) -> list:
+        """Transcribe (samples, language) windows, as model.transcribe_windows."""
+        lengths = [len(samples) for samples, _ in windows]
+        buffer = SharedMemory(create=True, size=max(1, 4 * sum(lengths)))
+        _client_buffers.add(buffer.name)
+        try:
+            samples = np.ndarray(sum(lengths), dtype=np.float32, buffer=buffer.buf)
+            samples[:] = np.concatenate([window for window, _ in windows])
+            del samples
+            return self._call(
+                "transcribe_windows",
+                buffer.name,
+                lengths,
+                [language for _, language in windows],
+            )
+        finally:
+            buffer.close()
+            buffer.unlink()
+            _client_buffers.discard(buffer.name)
+
+
+class RemoteModelPool:
+    """Stand-in for the model pool of an API worker using the inference server.
+
+    load() waits for the server to have loaded its models, so that /readyz
+    reflects the state of the server.
+    """
+
+    def __init__(self, client: InferenceClient):
+        self.client = client
+        self.error = None
+        self.ready = threading.Event()
+
+    def load(self, size: int = 1, warm_up: bool = True) -> None:
+        while True:
+            try:
+                status = self.client.status()
+            except (OSError, EOFError):
+                status = {"ready": False, "error": None}  # Not started yet
+
+            if status["error"] is not None:
+                self.error = InferenceServerError(status["error"])
+                return
+            if status["ready"]:
+                self.ready.set()
+                return
+            time.sleep(STATUS_POLL_SECONDS)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--socket", default=DEFAULT_SOCKET)
+    parser.add_argument("--models", type=int, default=DEFAULT_MODELS)
+    parser.add_argument(
+        "--max-batch-size", type=int, default=batching.DEFAULT_MAX_BATCH_SIZE
+    )
+    parser.add_argument("--max-wait", type=float, default=batching.DEFAULT_MAX_WAIT)
+    parser.add_argument(
+        "--metrics-port", type=int, help="Serve the Prometheus metrics on this port."
+    )
+    args = parser.parse_args()
+
+    if args.metrics_port is not None:
+        from prometheus_client import start_http_server
+
+        start_http_server(args.metrics_port)
+
+    server = InferenceServer(
+        args.socket, args.models, args.max_batch_size, args.max_wait
+    )
+    print(f"Serving {args.models} whisper models on {args.socket}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""Module defining the real-time transcription of streamed audio."""
+
+__author__ = "Mauricio Vanzulli"
+__email__ = "mcvanzulli@gmail.com"
+
+# Built-in modules
+import threading
+import subprocess
+
+# Third-party libraries
+import numpy as np
+
+# Global variables
+SAMPLE_RATE = 16000
+DEFAULT_WINDOW_SECONDS = 30.0  # Whisper's context
+DEFAULT_STEP_SECONDS = 2.0
+PCM_CHUNK_BYTES = 6400  # 0.2 s of 16 kHz mono 16-bit PCM
+
+
+class PcmDecoder:
+    """Decoder of 16 kHz mono 16-bit little-endian PCM chunks."""
+
+    def __init__(self):
+        self.leftover = b""
+
+    def decode(self, data: bytes) -> np.ndarray:
+        """Decode the whole samples of a chunk, keeping a trailing odd byte."""
+        data = self.leftover + data
+        end = len(data) - len(data) % 2
+        self.leftover = data[end:]
+        return np.frombuffer(data[:end], dtype="<i2").astype(np.float32) / 32768.0
+
+    def close(self) -> np.ndarray:
+        return np.zeros(0, dtype=np.float32)
+
+
+class FfmpegDecoder:
+    """Decoder of a compressed audio stream, e.g. Ogg or WebM Opus, using FFmpeg.
+
+    Chunks are written to an FFmpeg process whose 16 kHz mono PCM output is read
+    by a thread, so decode() returns the samples decoded so far.
+    """
+
+    def __init__(self):
+        self.process = subprocess.Popen(
+            ["ffmpeg", "-hide_banner", "-loglevel", "error", "-fflags", "nobuffer"]
+            + ["-i", "pipe:0", "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE)]
+            + ["pipe:1"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        self.pcm = PcmDecoder()
+        self.decoded = []
+        self.lock = threading.Lock()
+        self.reader = threading.Thread(target=self._read, daemon=True)
+        self.reader.start()
+
+    def _read(self) -> None:
+        for chunk in iter(lambda: self.process.stdout.read(PCM_CHUNK_BYTES), b""):
+            samples = self.pcm.decode(chunk)
+            with self.lock:
+                self.decoded.append(samples)
+
+    def _take(self) -> np.ndarray:
+        with self.lock:
+            decoded, self.decoded = self.decoded, []
+        return np.concatenate(decoded) if decoded else np.zeros(0, dtype=np.float32)
+
+    def decode(self, data: bytes) -> np.ndarray:
+        """Feed a chunk of the stream, returning the samples decoded so far."""
+        self.process.stdin.write(data)
+        self.process.stdin.flush()
+        return self._take()
+
+    def close(self) -> np.ndarray:
+        """End the stream, returning the last samples."""
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        self.reader.join()
+        self.process.wait()
+        return self._take()
+
+
+class TranscriptionStream:
+    """Class buffering streamed audio into windows to transcribe incrementally.
+
+    Every step_seconds of new audio, the pending window is transcribed again
+    and its segments are sent as partial. Once the window is full, all its
+    segments but the last one, which may be cut, become final and the window
+    moves past them.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = DEFAULT_WINDOW_SECONDS,
+        step_seconds: float = DEFAULT_STEP_SECONDS,
+        language: str = None,
+    ):
+        self.window = int(window_seconds * SAMPLE_RATE)
+        self.step = int(step_seconds * SAMPLE_RATE)
+        self.language = language
+
+        self.samples = np.zeros(0, dtype=np.float32)
+        self.offset = 0  # Index of the first pending sample in the stream
+        self.new = 0  # Samples received since the last transcription
+
+    def feed(self, samples: np.ndarray) -> bool:
+        """Add samples, telling whether the window should be transcribed again."""
+        self.samples = np.concatenate([self.samples, samples])
+        self.new += len(samples)
+        return self.new >= self.step
+
+    def full(self) -> bool:
+        """Tell whether a whole window is pending."""
+        return len(self.samples) >= self.window
+
+    def pending(self) -> np.ndarray:
+        """Get the pending window to transcribe."""
+        self.new = 0
+        return self.samples[: self.window]
+
+    def update(self, result: dict, final: bool = False) -> list:
+        """Turn the transcription of the pending window into segment messages.
+
+        When final, every segment is final, e.g. at the end of the stream.
+        """
+        self.language = self.language or result["language"]
+        start = self.offset / SAMPLE_RATE
+        segments = [
+            {
+                "start": round(start + segment["start"], 3),
+                "end": round(start + segment["end"], 3),
+                "text": segment["text"].strip(),
+                "language": self.language,
+            }
+            for segment in result["segments"]
+        ]
+
+        if not (final or self.full()):
+            return [dict(segment, type="partial") for segment in segments]
+
+        # Keep the last segment of a full window pending, unless it is the only one
+        finals = segments if final or len(segments) < 2 else segments[:-1]
+        if final:
+            cut = len(self.samples)
+        elif finals:
+            cut = int(finals[-1]["end"] * SAMPLE_RATE) - self.offset
+            cut = min(max(cut, 1), self.window)
+        else:
+            cut = self.window
+
+        self.samples = self.samples[cut:]
+        self.offset += cut
+        messages = [dict(segment, type="final") for segment in finals]
+        if not final and len(finals) < len(segments):
+            messages.append(dict(segments[-1], type="partial"))
+        return messages
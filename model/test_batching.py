@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+import types
+import threading
+import dataclasses
+import numpy as np
+import pytest
+
+import batching
+import inference
+
+
+class FakeTokenizer:
+    timestamp_begin = 100
+
+    def decode(self, tokens):
+        return "".join(f" w{token}" for token in tokens)
+
+
+def test_concurrent_items_share_a_batch():
+    started, release = threading.Event(), threading.Event()
+    batches = []
+
+    def process_batch(items):
+        started.set()
+        release.wait()
+        batches.append(items)
+        return [item * 2 for item in items]
+
+    batcher = batching.MicroBatcher(process_batch, max_batch_size=4, max_wait=0.1)
+    # The first item blocks the worker, so the next ones queue up together
+    first = batcher.submit(0)
+    assert started.wait(timeout=5)
+    futures = [batcher.submit(item) for item in range(1, 6)]
+    release.set()
+
+    assert first.result(timeout=5) == 0
+    assert [future.result(timeout=5) for future in futures] == [2, 4, 6, 8, 10]
+    assert batches == [[0], [1, 2, 3, 4], [5]]
+
+
+def test_batch_errors_reach_every_item():
+    def process_batch(items):
+        raise RuntimeError("CUDA out of memory")
+
+    batcher = batching.MicroBatcher(process_batch, max_wait=0.1)
+    futures = [batcher.submit(item) for item in range(3)]
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="out of memory"):
+            future.result(timeout=5)
+
+
+def test_too_many_queued():
+    started, release = threading.Event(), threading.Event()
+
+    def process_batch(items):
+        started.set()
+        release.wait()
+        return items
+
+    batcher = batching.MicroBatcher(process_batch, max_batch_size=1, max_queued=1)
+    batcher.submit(0)
+    assert started.wait(timeout=5)
+    batcher.submit(1)
+
+    with pytest.raises(inference.OverloadedError) as error:
+        batcher.submit(2)
+    assert error.value.status_code == 429
+    with pytest.raises(inference.OverloadedError) as error:
+        batcher.submit(2, timeout=0.05)
+    assert error.value.status_code == 503, "Waiting for room should time out"
+    release.set()
+
+
+def test_cancelled_item_keeps_the_worker():
+    started, release = threading.Event(), threading.Event()
+    batches = []
+
+    def process_batch(items):
+        started.set()
+        release.wait()
+        batches.append(items)
+        return items
+
+    batcher = batching.MicroBatcher(process_batch, max_wait=0.1)
+    batcher.submit(0)
+    assert started.wait(timeout=5)
+    # Cancelled while queued, e.g. by a closed WebSocket
+    assert batcher.submit(1).cancel()
+    release.set()
+
+    assert batcher.submit(2).result(timeout=5) == 2
+    assert batches == [[0], [2]]
+    assert batcher.workers[0].is_alive()
+
+
+def test_missing_results_fail_the_items():
+    batcher = batching.MicroBatcher(lambda items: items[:1], max_wait=0.1)
+    futures = [batcher.submit(item) for item in range(2)]
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="1 results for 2 items"):
+            future.result(timeout=5)
+    assert batcher.submit(3).result(timeout=5) == 3
+
+
+def test_transcribe_samples_timeout():
+    release = threading.Event()
+
+    def process_batch(windows):
+        release.wait()
+        return [{"text": "", "language": "es", "segments": []} for _ in windows]
+
+    batcher = batching.MicroBatcher(process_batch)
+    samples = np.zeros(batching.SAMPLE_RATE, dtype=np.float32)
+
+    with pytest.raises(inference.OverloadedError) as error:
+        batching.transcribe_samples(batcher, samples, timeout=0.05, decode_timeout=0.05)
+    assert error.value.status_code == 503
+    release.set()
+
+
+@dataclasses.dataclass
+class FakeOptions:
+    temperature: float = 0.0
+
+
+def test_decode_with_fallback():
+    calls = []
+
+    def decode(mels, options):
+        calls.append((list(mels), options.temperature))
+        # Window 1 repeats itself until 0.4, window 2 is silence
+        return [
+            types.SimpleNamespace(
+                window=window,
+                temperature=options.temperature,
+                compression_ratio=(
+                    3.0 if window == 1 and options.temperature < 0.4 else 1.5
+                ),
+                avg_logprob=-2.0 if window == 2 else -0.5,
+                no_speech_prob=0.9 if window == 2 else 0.1,
+            )
+            for window in mels
+        ]
+
+    results = batching._decode_with_fallback(decode, np.arange(3), FakeOptions())
+
+    assert calls == [([0, 1, 2], 0.0), ([1], 0.2), ([1], 0.4)]
+    assert [result.temperature for result in results] == [0.0, 0.4, 0.0]
+
+
+def test_transcribe_samples():
+    batches = []
+
+    def process_batch(windows):
+        batches.append([(len(samples), language) for samples, language in windows])
+        results = []
+        for samples, language in windows:
+            seconds = len(samples) / batching.SAMPLE_RATE
+            segment = {"start": 0.5, "end": seconds, "text": f" {seconds:g} s"}
+            results.append(
+                {
+                    "text": segment["text"].strip(),
+                    "language": language or "es",
+                    "segments": [segment],
+                }
+            )
+        return results
+
+    batcher = batching.MicroBatcher(process_batch, max_batch_size=2, max_wait=0.1)
+    samples = np.zeros(75 * batching.SAMPLE_RATE, dtype=np.float32)
+
+    result = batching.transcribe_samples(batcher, samples, timeout=5)
+
+    window = 30 * batching.SAMPLE_RATE
+    # The language is detected on the first window, then given to the others
+    assert batches == [[(window, None)], [(window, "es"), (window // 2, "es")]]
+    assert result["text"] == "30 s 30 s 15 s"
+    assert result["language"] == "es"
+    assert [(s["start"], s["end"]) for s in result["segments"]] == [
+        (0.5, 30.0),
+        (30.5, 60.0),
+        (60.5, 75.0),
+    ]
+
+
+def test_parse_segments():
+    # <|0.00|> w1 w2 <|1.00|><|1.00|> w3 <|2.00|> w4
+    tokens = [100, 1, 2, 150, 150, 3, 200, 4]
+
+    segments = batching._parse_segments(tokens, FakeTokenizer(), duration=3.0)
+
+    assert segments == [
+        {"start": 0.0, "end": 1.0, "text": " w1 w2"},
+        {"start": 1.0, "end": 2.0, "text": " w3"},
+        {"start": 2.0, "end": 3.0, "text": " w4"},
+    ]
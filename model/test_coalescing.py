@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+import io
+import os
+import asyncio
+import tempfile
+import threading
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+
+import api
+import uploads
+import coalescing
+from conftest import HOLA, silence, wait_for
+
+
+def post(client: TestClient, results: list, url: str, audio: bytes) -> None:
+    results.append(client.post(url, files={"file": ("a.mp3", audio)}).json())
+
+
+def test_identical_requests_share_a_transcription(monkeypatch, release):
+    monkeypatch.setattr(
+        api, "summarize_and_translate", lambda text, language: f"{language} summary"
+    )
+    requests = [
+        ("/transcribe/", b"audio"),
+        ("/transcribe/", b"audio"),
+        ("/translate_summarize_audio/?language=en", b"audio"),
+        ("/translate_summarize_audio/?language=en", b"audio"),
+        ("/translate_summarize_audio/?language=fr", b"audio"),
+        ("/transcribe/", b"other audio"),
+    ]
+
+    with TestClient(api.app) as client:
+        results = []
+        threads = [
+            threading.Thread(target=post, args=(client, results, url, audio))
+            for url, audio in requests
+        ]
+        for thread in threads:
+            thread.start()
+        # Every request but the first of each audio and of each summary joins one
+        wait_for(lambda: api.in_flight.coalesced == 4)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+    assert sorted(release.transcribed) == [b"audio", b"other audio"]
+    assert HOLA in results
+    summaries = sorted(result["summary"] for result in results if "summary" in result)
+    assert summaries == ["en summary", "en summary", "fr summary"]
+    assert not api.in_flight.calls, "Finished calls should be forgotten"
+
+
+def test_errors_are_shared():
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("Whisper failed")
+
+    async def run_twice():
+        in_flight = coalescing.SingleFlight()
+        return await asyncio.gather(
+            in_flight.run("key", fail),
+            in_flight.run("key", fail),
+            return_exceptions=True,
+        )
+
+    errors = asyncio.run(run_twice())
+    assert [str(error) for error in errors] == ["Whisper failed"] * 2
+    assert calls == [1]
+
+
+def test_cancelled_leader_keeps_the_upload(monkeypatch, tmp_path):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    monkeypatch.setattr(api, "in_flight", coalescing.SingleFlight())
+    started, release = threading.Event(), threading.Event()
+
+    transcribed = []
+
+    def fake_load_audio(filename):
+        started.set()
+        release.wait(timeout=5)
+        with open(filename, "rb") as f:
+            transcribed.append(f.read())
+        return silence()
+
+    monkeypatch.setattr(api, "load_audio", fake_load_audio)
+
+    async def handle() -> dict:
+        file = UploadFile(io.BytesIO(b"audio"), filename="a.mp3")
+        async with uploads.temporary_upload(file) as upload:
+            return await api._transcribe_upload(upload)
+
+    async def cancel_leader() -> dict:
+        leader = asyncio.ensure_future(handle())
+        await asyncio.to_thread(started.wait, 5)
+        follower = asyncio.ensure_future(handle())
+        while not api.in_flight.coalesced:
+            await asyncio.sleep(0.01)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        release.set()
+        return await follower
+
+    assert asyncio.run(cancel_leader()) == HOLA
+    assert transcribed == [b"audio"]
+    assert not os.listdir(tmp_path), "The shared upload should be removed at the end"
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+import time
+import statistics
+import threading
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import inference
+from conftest import silence, wait_for
+
+TRANSCRIPTION_SECONDS = 1.0
+
+
+def post_audio(client: TestClient, results: list, name: str = "a.mp3") -> None:
+    # Each name gets its own audio, since identical uploads share a transcription
+    audio = name.encode()
+    results.append(client.post("/transcribe/", files={"file": (name, audio)}))
+
+
+def root_latencies(client: TestClient, requests: int = 20) -> list:
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        assert client.get("/").status_code == 200
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def test_root_latency_stays_flat_while_transcribing(monkeypatch, tmp_path):
+    """Load test: the root endpoint keeps answering while transcriptions run."""
+
+    def slow_load_audio(filename):
+        time.sleep(TRANSCRIPTION_SECONDS)
+        return silence()
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(api, "load_audio", slow_load_audio)
+    monkeypatch.setattr(
+        api, "inference_executor", inference.InferenceExecutor(max_concurrent=2)
+    )
+
+    with TestClient(api.app) as client:
+        idle = root_latencies(client)
+
+        results = []
+        clients = [
+            threading.Thread(target=post_audio, args=(client, results, f"{i}.mp3"))
+            for i in range(4)
+        ]
+        for thread in clients:
+            thread.start()
+        time.sleep(TRANSCRIPTION_SECONDS / 10)
+        loaded = root_latencies(client)
+        for thread in clients:
+            thread.join()
+
+    assert [response.status_code for response in results] == [200] * 4
+    assert max(loaded) < TRANSCRIPTION_SECONDS / 4, "A request waited for a model"
+    assert statistics.median(loaded) < statistics.median(idle) + 0.05
+
+
+def test_too_many_waiting(monkeypatch, release):
+    monkeypatch.setattr(
+        api,
+        "inference_executor",
+        inference.InferenceExecutor(max_concurrent=1, max_waiting=1),
+    )
+
+    with TestClient(api.app) as client:
+        results = []
+        first = threading.Thread(target=post_audio, args=(client, results, "1.mp3"))
+        first.start()
+        wait_for(lambda: api.inference_executor.stats()["running"] == 1)
+        second = threading.Thread(target=post_audio, args=(client, results, "2.mp3"))
+        second.start()
+        wait_for(lambda: api.inference_executor.stats()["waiting"] == 1)
+
+        assert client.get("/readyz").status_code == 503
+        rejected = client.post("/transcribe/", files={"file": ("3.mp3", b"3.mp3")})
+        release.set()
+        first.join()
+        second.join()
+
+        assert client.get("/readyz").status_code == 200
+        assert client.get("/healthz").json() == {"status": "ok"}
+
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) >= 1
+    assert [response.status_code for response in results] == [200, 200]
+
+
+def test_wait_timeout(monkeypatch, release):
+    monkeypatch.setattr(
+        api,
+        "inference_executor",
+        inference.InferenceExecutor(max_concurrent=1, wait_timeout=0.2),
+    )
+
+    with TestClient(api.app) as client:
+        results = []
+        first = threading.Thread(target=post_audio, args=(client, results, "1.mp3"))
+        first.start()
+        wait_for(lambda: api.inference_executor.stats()["running"] == 1)
+
+        timed_out = client.post("/transcribe/", files={"file": ("2.mp3", b"2.mp3")})
+        release.set()
+        first.join()
+
+    assert timed_out.status_code == 503
+    assert "Retry-After" in timed_out.headers
+    assert results[0].status_code == 200, "Running requests should not time out"
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+import time
+import threading
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import jobs
+
+
+@pytest.fixture()
+def client(monkeypatch):
+    def fake_summarize(transcript, language="en", on_chunk=None):
+        for index in range(2):
+            on_chunk(index, 2, f"{language} summary {index}")
+        return f"{language} summary"
+
+    monkeypatch.setattr(api, "transcribe_audio", lambda filename: ("Hola", "es"))
+    monkeypatch.setattr(api, "summarize_and_translate", fake_summarize)
+    monkeypatch.setattr(api, "job_queue", jobs.JobQueue(workers=1, max_queued=2))
+    return TestClient(api.app)
+
+
+def wait_until_finished(client: TestClient, job_id: str) -> dict:
+    for _ in range(100):
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in jobs.FINISHED_STATUSES:
+            return job
+        time.sleep(0.05)
+    raise TimeoutError(f"Job {job_id} did not finish")
+
+
+def test_job_results(client: TestClient):
+    response = client.post("/jobs?language=en", files={"file": ("a.mp3", b"audio")})
+    assert response.status_code == 202
+
+    job = wait_until_finished(client, response.json()["id"])
+    assert job["status"] == "done"
+    assert job["progress"] == 1.0
+    assert job["result"]["transcription"] == "Hola"
+    assert job["result"]["summary_chunks"] == ["en summary 0", "en summary 1"]
+    assert job["result"]["summary"] == "en summary"
+
+
+def test_job_events(client: TestClient):
+    job_id = client.post("/jobs", files={"file": ("a.mp3", b"audio")}).json()["id"]
+
+    with client.websocket_connect(f"/jobs/{job_id}/events") as websocket:
+        events = []
+        while not events or events[-1]["status"] not in jobs.FINISHED_STATUSES:
+            events.append(websocket.receive_json())
+
+    progress = [event["progress"] for event in events]
+    assert progress == sorted(progress), "Progress should never go back"
+    assert events[-1]["result"]["summary"] == "en summary"
+
+
+def test_unknown_job(client: TestClient):
+    assert client.get("/jobs/unknown").status_code == 404
+
+
+def test_full_queue(client: TestClient, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(api, "transcribe_audio", lambda f: release.wait() and ("", ""))
+
+    # One job runs and two wait, so the next one does not fit
+    responses = [
+        client.post("/jobs", files={"file": ("a.mp3", b"audio")}) for _ in range(4)
+    ]
+    release.set()
+
+    assert [response.status_code for response in responses] == [202, 202, 202, 429]
+    # Let the jobs end while transcribe_audio is still patched
+    for response in responses[:3]:
+        wait_until_finished(client, response.json()["id"])
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+import io
+import wave
+import shutil
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client.parser import text_string_to_metric_families
+
+import api
+import model
+from streaming import SAMPLE_RATE
+
+
+def scrape(client: TestClient) -> dict:
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(response.text)
+        for sample in family.samples
+    }
+
+
+def wav(seconds: float) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(np.zeros(int(seconds * SAMPLE_RATE), dtype="<i2").tobytes())
+    return buffer.getvalue()
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="FFmpeg is not installed")
+def test_transcription_metrics(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    route = (("method", "POST"), ("route", "/transcribe/"), ("status", "200"))
+
+    with TestClient(api.app) as client:
+        before = scrape(client)
+        response = client.post("/transcribe/", files={"file": ("a.wav", wav(2.0))})
+        after = scrape(client)
+
+    def increase(name: str, labels: tuple = ()) -> float:
+        return after[(name, labels)] - before.get((name, labels), 0.0)
+
+    assert response.json()["text"] == "Hola"
+    assert increase("meeting_assistant_requests_total", route) == 1
+    for stage in ["upload", "decode", "transcription"]:
+        assert increase(f"meeting_assistant_{stage}_seconds_count") == 1
+    pipeline = (("endpoint", "transcribe"),)
+    assert increase("meeting_assistant_pipeline_seconds_count", pipeline) == 1
+    assert increase("meeting_assistant_transcription_real_time_factor_count") == 1
+    assert after[("meeting_assistant_requests_in_flight", ())] == 1, "The scrape"
+    assert after[("meeting_assistant_inferences_running", ())] == 0
+
+
+class FakeEncoding:
+    def encode(self, text):
+        return list(text)
+
+    def decode(self, tokens):
+        return "".join(tokens)
+
+
+def test_gpt_call_metrics(monkeypatch):
+    def fake_create(**options):
+        choice = SimpleNamespace(message={"content": " Resumen "})
+        return SimpleNamespace(choices=[choice])
+
+    monkeypatch.setattr(model.tiktoken, "get_encoding", lambda name: FakeEncoding())
+    monkeypatch.setattr(model.openai.ChatCompletion, "create", fake_create)
+    monkeypatch.setattr(model, "SIZE_CHUNK", 4)
+    labels = (("model", model.GPT_MODEL),)
+
+    with TestClient(api.app) as client:
+        before = scrape(client)
+        response = client.get("/translate_summarize_text/?text=Hola que tal")
+        after = scrape(client)
+
+    assert response.status_code == 200
+    count = "meeting_assistant_gpt_call_seconds_count"
+    assert after[(count, labels)] - before.get((count, labels), 0.0) == 3
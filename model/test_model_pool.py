@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+import threading
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import model
+from conftest import FakeWhisperModel, wait_for
+
+
+def test_ready_after_warm_up(monkeypatch):
+    loading = threading.Event()
+    models = []
+
+    def slow_loader():
+        loading.wait()
+        models.append(FakeWhisperModel())
+        return models[-1]
+
+    pool = model.ModelPool(loader=slow_loader)
+    monkeypatch.setattr(api, "model_pool", pool)
+    monkeypatch.setattr(api, "MAX_CONCURRENT_INFERENCES", 2)
+
+    with TestClient(api.app) as client:
+        assert client.get("/healthz").status_code == 200
+        response = client.get("/readyz")
+        assert response.status_code == 503
+        assert response.json()["status"] == "loading"
+
+        loading.set()
+        wait_for(pool.ready.is_set)
+        assert client.get("/readyz").json()["status"] == "ready"
+
+    assert pool.size == 2
+    assert [m.calls for m in models] == [1, 1], "Each model should be warmed up"
+
+
+# The loading thread reports the error in the logs too
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_failed_load(monkeypatch):
+    def failing_loader():
+        raise OSError("No model")
+
+    pool = model.ModelPool(loader=failing_loader)
+    monkeypatch.setattr(api, "model_pool", pool)
+
+    with TestClient(api.app) as client:
+        wait_for(lambda: pool.error is not None)
+        response = client.get("/readyz")
+
+    assert response.status_code == 503
+    assert response.json()["status"] == "failed"
+
+
+def test_models_are_reused(model_pool):
+    with model_pool.acquire() as first:
+        pass
+    with model_pool.acquire() as second:
+        pass
+
+    assert first is second
+    assert model_pool.size == 1
+    assert first.calls == 0, "Models loaded on first use are not warmed up"
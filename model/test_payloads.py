@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+import gzip
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+
+# About three hours of transcript, far beyond what fits in a URL
+SEGMENTS = [
+    {"start": 2.0 * i, "end": 2.0 * i + 2.0, "text": f" Frase número {i}."}
+    for i in range(6000)
+]
+
+
+@pytest.fixture()
+def summarized(monkeypatch):
+    transcripts = []
+
+    def fake_summarize(transcript, language="en"):
+        transcripts.append(transcript)
+        return f"{language} summary of {len(transcript.splitlines())} lines"
+
+    monkeypatch.setattr(api, "summarize_and_translate", fake_summarize)
+    return transcripts
+
+
+def test_summarize_gzipped_segments(summarized):
+    body = gzip.compress(
+        orjson.dumps({"segments": SEGMENTS, "languages": ["en", "es"]})
+    )
+
+    with TestClient(api.app) as client:
+        response = client.post(
+            "/translate_summarize_text/",
+            content=body,
+            headers={"Content-Encoding": "gzip", "Content-Type": "application/json"},
+        )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "summaries": {
+            "en": "en summary of 6000 lines",
+            "es": "es summary of 6000 lines",
+        }
+    }
+    assert summarized[0].splitlines()[1] == "Frase número 1."
+
+
+def test_gzipped_response(monkeypatch):
+    monkeypatch.setattr(api, "summarize_and_translate", lambda text, language: text)
+    text = "palabra " * 1000
+
+    with TestClient(api.app) as client:
+        response = client.post(
+            "/translate_summarize_text/",
+            json={"text": text},
+            headers={"Accept-Encoding": "gzip"},
+        )
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < len(text) / 10
+    assert response.json() == {"summaries": {"en": text}}
+
+
+def test_multi_member_gzip(summarized):
+    json = b'{"text": "We migrate", "languages": ["en"]}'
+    body = gzip.compress(json[:12]) + gzip.compress(json[12:])
+
+    with TestClient(api.app) as client:
+        response = client.post(
+            "/translate_summarize_text/",
+            content=body,
+            headers={"Content-Encoding": "gzip"},
+        )
+
+    assert response.json() == {"summaries": {"en": "en summary of 1 lines"}}
+    assert summarized == ["We migrate"]
+
+
+@pytest.mark.parametrize(
+    "body, headers, status",
+    [
+        (b"not json", {}, 400),
+        (b"not gzip", {"Content-Encoding": "gzip"}, 400),
+        (gzip.compress(b'{"text": "a"}')[:-4], {"Content-Encoding": "gzip"}, 400),
+        (b'{"text": "a"}', {"Content-Encoding": "br"}, 415),
+        (b'{"languages": ["en"]}', {}, 422),
+        (b'{"text": "a", "languages": ["xx"]}', {}, 422),
+        (gzip.compress(b" " * (2 << 20)), {"Content-Encoding": "gzip"}, 413),
+        (
+            gzip.compress(b'{"text": "a"}') + b"garbage",
+            {"Content-Encoding": "gzip"},
+            400,
+        ),
+        (gzip.compress(b'{"text": "a"}') + b"\x1f", {"Content-Encoding": "gzip"}, 400),
+    ],
+)
+def test_invalid_bodies(summarized, monkeypatch, body, headers, status):
+    monkeypatch.setattr(api, "MAX_TRANSCRIPT_BYTES", 1 << 20)
+
+    with TestClient(api.app) as client:
+        response = client.post(
+            "/translate_summarize_text/", content=body, headers=headers
+        )
+
+    assert response.status_code == status
+    assert not summarized
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+import os
+import stat
+import threading
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import batching
+import inference
+import model
+import serving
+from streaming import SAMPLE_RATE
+
+
+@pytest.fixture()
+def client(tmp_path):
+    server = serving.InferenceServer(str(tmp_path / "inference.sock"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield serving.InferenceClient(str(tmp_path / "inference.sock"))
+    server.close()
+    thread.join()
+
+
+def test_transcribe_windows(client: serving.InferenceClient):
+    windows = [
+        (np.zeros(2 * SAMPLE_RATE, dtype=np.float32), None),
+        (np.zeros(SAMPLE_RATE, dtype=np.float32), "es"),
+    ]
+
+    results = client.transcribe_windows(windows)
+
+    assert [result["segments"][0]["end"] for result in results] == [2.0, 1.0]
+    assert model.model_pool.size == 1, "Only the server should load models"
+
+
+def test_transcribe_audio(client: serving.InferenceClient, monkeypatch, tmp_path):
+    def fake_transcribe(filename):
+        if not filename.endswith(".mp3"):
+            raise ValueError("Unknown format")
+        return filename, "es"
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(model, "transcribe_audio", fake_transcribe)
+
+    assert client.transcribe_audio("a.mp3") == (str(tmp_path / "a.mp3"), "es")
+    with pytest.raises(serving.InferenceServerError, match="Unknown format"):
+        client.transcribe_audio("a.txt")
+    assert client.connections.qsize() == 1, "The connection should be reused"
+
+
+def test_socket_is_private(client: serving.InferenceClient):
+    assert stat.S_IMODE(os.stat(client.address).st_mode) == 0o600
+
+
+def test_overloaded_server(client: serving.InferenceClient, monkeypatch):
+    def overloaded(filename):
+        raise inference.OverloadedError("Too many requests", 429, 7)
+
+    monkeypatch.setattr(model, "transcribe_audio", overloaded)
+
+    with pytest.raises(inference.OverloadedError) as error:
+        client.transcribe_audio("a.mp3")
+    assert (str(error.value), error.value.status_code) == ("Too many requests", 429)
+    assert error.value.retry_after == 7
+
+
+def test_api_forwards_to_the_server(client: serving.InferenceClient, monkeypatch):
+    monkeypatch.setattr(api, "model_pool", serving.RemoteModelPool(client))
+    monkeypatch.setattr(
+        api, "window_batcher", batching.MicroBatcher(client.transcribe_windows)
+    )
+
+    with TestClient(api.app) as test_client:
+        api.model_pool.ready.wait(timeout=5)
+        assert test_client.get("/readyz").json()["status"] == "ready"
+
+        pcm = np.zeros(3 * SAMPLE_RATE, dtype="<i2").tobytes()
+        with test_client.websocket_connect("/ws/transcribe") as websocket:
+            websocket.send_bytes(pcm)
+            websocket.send_text("end")
+            messages = [websocket.receive_json()]
+            while messages[-1]["type"] != "end":
+                messages.append(websocket.receive_json())
+
+    finals = [message for message in messages if message["type"] == "final"]
+    assert [(m["start"], m["end"], m["text"]) for m in finals] == [(0.0, 3.0, "Hola")]
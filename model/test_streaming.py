@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+import shutil
+import subprocess
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import streaming
+from streaming import SAMPLE_RATE
+
+requires_ffmpeg = pytest.mark.skipif(
+    shutil.which("ffmpeg") is None, reason="FFmpeg is not installed"
+)
+
+
+def result(*segments) -> dict:
+    return {
+        "language": "es",
+        "segments": [
+            {"start": start, "end": end, "text": f" {text}"}
+            for start, end, text in segments
+        ],
+    }
+
+
+def test_pcm_decoder_keeps_odd_bytes():
+    decoder = streaming.PcmDecoder()
+    pcm = np.array([0, 16384, -16384], dtype="<i2").tobytes()
+    first, second = decoder.decode(pcm[:3]), decoder.decode(pcm[3:])
+    assert np.concatenate([first, second]).tolist() == [0.0, 0.5, -0.5]
+
+
+def test_transcription_stream_windows():
+    stream = streaming.TranscriptionStream(window_seconds=4.0, step_seconds=1.0)
+
+    assert not stream.feed(np.zeros(SAMPLE_RATE // 2, dtype=np.float32))
+    assert stream.feed(np.zeros(3 * SAMPLE_RATE, dtype=np.float32))
+    messages = stream.update(result((0.0, 3.5, "Hola")))
+    assert messages == [
+        {"start": 0.0, "end": 3.5, "text": "Hola", "language": "es", "type": "partial"}
+    ]
+
+    # A full window commits every segment but the last one
+    stream.feed(np.zeros(SAMPLE_RATE, dtype=np.float32))
+    assert stream.full()
+    messages = stream.update(result((0.0, 2.0, "Hola"), (2.0, 4.0, "que")))
+    assert [(m["type"], m["text"]) for m in messages] == [
+        ("final", "Hola"),
+        ("partial", "que"),
+    ]
+    assert stream.offset == 2 * SAMPLE_RATE
+
+    # The times of the next windows are relative to the stream
+    messages = stream.update(result((0.0, 2.5, "que tal")), final=True)
+    assert messages[0]["type"] == "final"
+    assert (messages[0]["start"], messages[0]["end"]) == (2.0, 4.5)
+    assert len(stream.samples) == 0
+
+
+@pytest.fixture()
+def client(monkeypatch):
+    monkeypatch.setattr(api, "STREAM_WINDOW_SECONDS", 4.0)
+    monkeypatch.setattr(api, "STREAM_STEP_SECONDS", 1.0)
+    with TestClient(api.app) as client:
+        yield client
+
+
+def stream_audio(client: TestClient, chunks, audio_format: str = "pcm") -> list:
+    url = f"/ws/transcribe?audio_format={audio_format}"
+    with client.websocket_connect(url) as websocket:
+        for chunk in chunks:
+            websocket.send_bytes(chunk)
+        websocket.send_text("end")
+
+        messages = [websocket.receive_json()]
+        while messages[-1]["type"] != "end":
+            messages.append(websocket.receive_json())
+    return messages
+
+
+def test_stream_pcm(client: TestClient):
+    # 10 s of PCM in 0.2 s chunks
+    pcm = np.zeros(10 * SAMPLE_RATE, dtype="<i2").tobytes()
+    chunks = [pcm[i : i + 6400] for i in range(0, len(pcm), 6400)]
+
+    messages = stream_audio(client, chunks)
+
+    finals = [m for m in messages if m["type"] == "final"]
+    assert any(m["type"] == "partial" for m in messages)
+    assert [(m["start"], m["end"]) for m in finals] == [
+        (0.0, 4.0),
+        (4.0, 8.0),
+        (8.0, 10.0),
+    ]
+    assert all(m["text"] == "Hola" and m["language"] == "es" for m in finals)
+
+
+@requires_ffmpeg
+def test_stream_opus(client: TestClient):
+    opus = subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-f", "lavfi"]
+        + ["-i", "sine=frequency=440:duration=3", "-c:a", "libopus", "-f", "ogg", "-"],
+        capture_output=True,
+        check=True,
+    ).stdout
+
+    messages = stream_audio(
+        client, [opus[i : i + 1000] for i in range(0, len(opus), 1000)], "opus"
+    )
+
+    finals = [m for m in messages if m["type"] == "final"]
+    assert finals[0]["start"] == 0.0
+    assert finals[-1]["end"] == pytest.approx(3.0, abs=0.05)
+
+
+def test_unknown_format(client: TestClient):
+    with client.websocket_connect("/ws/transcribe?audio_format=mp3") as websocket:
+        message = websocket.receive()
+    assert message["code"] == 1003
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+import io
+import os
+import asyncio
+import hashlib
+import tempfile
+import pytest
+from fastapi import HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+import api
+import uploads
+from conftest import HOLA, silence
+
+AUDIO = b"audio" * 1000
+
+
+@pytest.fixture()
+def upload_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    return tmp_path
+
+
+def test_save_upload(upload_dir):
+    file = UploadFile(io.BytesIO(AUDIO), filename="../../meeting.mp3")
+    upload = asyncio.run(uploads.save_upload(file, chunk_size=1000))
+
+    assert os.path.dirname(upload.path) == str(upload_dir)
+    assert upload.path.endswith(".mp3")
+    assert upload.size == len(AUDIO)
+    assert upload.sha256 == hashlib.sha256(AUDIO).hexdigest()
+    with open(upload.path, "rb") as f:
+        assert f.read() == AUDIO
+
+    upload.remove()
+    assert not os.listdir(upload_dir)
+
+
+def test_transcribe_removes_upload(monkeypatch, upload_dir):
+    transcribed = []
+
+    def fake_load_audio(filename):
+        with open(filename, "rb") as f:
+            transcribed.append(f.read())
+        return silence()
+
+    monkeypatch.setattr(api, "load_audio", fake_load_audio)
+    with TestClient(api.app) as client:
+        response = client.post("/transcribe/", files={"file": ("a.mp3", AUDIO)})
+
+    assert response.json() == HOLA
+    assert transcribed == [AUDIO]
+    assert not os.listdir(upload_dir), "The upload should be removed"
+
+
+@pytest.mark.parametrize("overhead", [0, api.MULTIPART_OVERHEAD_BYTES])
+def test_upload_too_large(monkeypatch, upload_dir, overhead):
+    monkeypatch.setattr(api, "MAX_UPLOAD_BYTES", len(AUDIO) - 1)
+    monkeypatch.setattr(api, "MULTIPART_OVERHEAD_BYTES", overhead)
+    monkeypatch.setattr(api, "load_audio", pytest.fail)
+
+    with TestClient(api.app) as client:
+        response = client.post("/transcribe/", files={"file": ("a.mp3", AUDIO)})
+
+    assert response.status_code == 413
+    assert not os.listdir(upload_dir), "Partial uploads should be removed"
+
+
+def test_chunked_upload_too_large(monkeypatch, upload_dir):
+    monkeypatch.setattr(api, "MAX_UPLOAD_BYTES", len(AUDIO) - 1)
+    monkeypatch.setattr(api, "load_audio", pytest.fail)
+    body = (
+        b'--boundary\r\nContent-Disposition: form-data; name="file"; filename="a.mp3"'
+        b"\r\n\r\n" + AUDIO * 100 + b"\r\n--boundary--\r\n"
+    )
+
+    def chunks():
+        for start in range(0, len(body), 1000):
+            yield body[start : start + 1000]
+
+    with TestClient(api.app) as client:
+        # A generator is sent chunked, without a Content-Length
+        response = client.post(
+            "/transcribe/",
+            content=chunks(),
+            headers={"Content-Type": "multipart/form-data; boundary=boundary"},
+        )
+
+    assert response.status_code == 413
+    assert not os.listdir(upload_dir)
+
+
+def test_body_stopped_while_received():
+    messages = []
+
+    async def receive() -> dict:
+        messages.append(b"x" * 100)
+        return {"type": "http.request", "body": messages[-1], "more_body": True}
+
+    async def app(scope, receive, send):
+        while (await receive())["more_body"]:
+            pass
+
+    middleware = uploads.UploadSizeLimit(
+        app, max_bytes=lambda: 200, overhead_bytes=lambda: 50
+    )
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(middleware({"type": "http", "headers": []}, receive, None))
+    assert error.value.status_code == 413
+    assert len(messages) == 3, "The body should not be read past the limit"
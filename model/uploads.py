@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""Module defining how the API saves uploaded files."""
+
+__author__ = "Mauricio Vanzulli"
+__email__ = "mcvanzulli@gmail.com"
+
+# Built-in modules
+import os
+import re
+import asyncio
+import hashlib
+import tempfile
+import contextlib
+import typing
+
+# Third-party libraries
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+# Local modules
+import metrics
+
+# Global variables
+DEFAULT_CHUNK_SIZE = 1 << 20  # 1 MiB
+DEFAULT_MAX_UPLOAD_BYTES = 500 << 20  # 500 MiB, about 9 hours of 128 kbps MP3
+DEFAULT_MULTIPART_OVERHEAD_BYTES = 64 << 10  # Boundaries and part headers
+SUFFIX_PATTERN = re.compile(r"^\.[A-Za-z0-9]{1,8}$")
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload is larger than the allowed size."""
+
+
+class Upload:
+    """Class representing an upload saved to a temporary file."""
+
+    def __init__(self, path: str, sha256: str, size: int):
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        self.holders = 0
+
+    def remove(self) -> None:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.path)
+
+    def hold(self) -> None:
+        """Keep the file until a matching release()."""
+        self.holders += 1
+
+    def release(self) -> None:
+        """Release a hold, removing the file once nothing holds it."""
+        self.holders -= 1
+        if self.holders == 0:
+            self.remove()
+
+    def holding(self, func: typing.Callable) -> typing.Callable:
+        """Wrap an async function to run it in a task holding the file.
+
+        Shared in-flight calls can outlive the request whose upload they read,
+        e.g. when that request is cancelled, so their task owns the file too.
+        """
+
+        def start(*args) -> asyncio.Task:
+            self.hold()
+            task = asyncio.ensure_future(func(*args))
+            task.add_done_callback(lambda _: self.release())
+            return task
+
+        return start
+
+
+class UploadSizeLimit:
+    """ASGI middleware rejecting request bodies larger than an upload may be.
+
+    Starlette receives and spools a whole multipart body before the endpoint
+    runs, so the limit has to apply as the body arrives. Bodies declared too
+    large by their Content-Length are rejected before being read, and the
+    others, e.g. chunked ones, are stopped with a 413 once they exceed it.
+    The limits are read on every request, so that they follow the settings.
+    """
+
+    def __init__(
+        self,
+        app,
+        max_bytes: typing.Callable[[], int],
+        overhead_bytes: typing.Callable[[], int],
+    ):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.overhead_bytes = overhead_bytes
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        max_bytes = self.max_bytes()
+        limit = max_bytes + self.overhead_bytes()
+        detail = f"Uploads are limited to {max_bytes} bytes."
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            response = JSONResponse(status_code=413, content={"detail": detail})
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive() -> dict:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(413, detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def _copy(
+    source: typing.BinaryIO, suffix: str, max_bytes: int, chunk_size: int
+) -> Upload:
+    """Copy a file to a new temporary file in chunks, hashing it on the way."""
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=suffix)
+    sha256, size = hashlib.sha256(), 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in iter(lambda: source.read(chunk_size), b""):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(
+                        f"Uploads are limited to {max_bytes} bytes."
+                    )
+                sha256.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+
+    return Upload(path, sha256.hexdigest(), size)
+
+
+async def save_upload(
+    file: UploadFile,
+    max_bytes: int = DEFAULT_MAX_UPLOAD_BYTES,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Upload:
+    """Save an upload to a unique temporary file, which the caller removes.
+
+    The file keeps the extension of the upload, and is never fully held in
+    memory. Raises UploadTooLargeError past max_bytes.
+    """
+    suffix = os.path.splitext(os.path.basename(file.filename or ""))[1]
+    suffix = suffix if SUFFIX_PATTERN.match(suffix) else ""
+
+    # The copy runs on a thread, since the reads and writes block
+    with metrics.timed("upload"):
+        return await run_in_threadpool(_copy, file.file, suffix, max_bytes, chunk_size)
+
+
+@contextlib.asynccontextmanager
+async def temporary_upload(
+    file: UploadFile, max_bytes: int = DEFAULT_MAX_UPLOAD_BYTES
+) -> typing.AsyncIterator[Upload]:
+    """Save an upload to a temporary file, removed when the context ends.
+
+    The file outlives the context while a task started by holding() runs.
+    """
+    upload = await save_upload(file, max_bytes)
+    upload.hold()
+    try:
+        yield upload
+    finally:
+        upload.release()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""Benchmark of the file size, decode time and transcription time of each
+recording profile.
+
+The input audio is re-recorded with every profile, as if it was captured live:
+
+    python benchmarks/recording_profiles.py example/foo.mp3 --whisper-model tiny
+"""
+
+__author__ = "Mauricio Vanzulli"
+__email__ = "mcvanzulli@gmail.com"
+
+# Built-in modules
+import os
+import time
+import argparse
+import tempfile
+
+# Local modules
+from meeting_assistant import recorders
+from meeting_assistant import transcribers
+
+# Global variables
+DEFAULT_REPEATS = 5
+
+
+def _best_time(func, repeats: int) -> float:
+    """Get the best wall time of several runs of a function."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("audio_filename", help="Audio to record with each profile.")
+    parser.add_argument(
+        "--profiles", nargs="+", default=list(recorders.RECORDING_PROFILES)
+    )
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument(
+        "--whisper-model",
+        default=transcribers.DEFAULT_MODEL_SIZE_TRANSCRIBER,
+        help="Whisper size, or none to skip the transcription.",
+    )
+    args = parser.parse_args()
+
+    from whisper.audio import load_audio
+
+    transcriber = None
+    if args.whisper_model != "none":
+        transcriber = transcribers.WhisperTranscriber(model_size=args.whisper_model)
+
+    input_format = args.audio_filename.rsplit(".", 1)[-1]
+    recorder = recorders.FfmpgRecorder(args.audio_filename, input_format=input_format)
+
+    print(
+        f"{'profile':<20} {'size (kB)':>10} {'decode (s)':>11} {'transcribe (s)':>15}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in args.profiles:
+            filename = recorder.record(
+                os.path.join(directory, profile), profile=profile
+            )
+            size = os.path.getsize(filename) / 1000
+
+            # The decoding Whisper does before every transcription
+            decode = _best_time(lambda: load_audio(filename), args.repeats)
+
+            transcribe = float("nan")
+            if transcriber is not None:
+                transcribe = _best_time(lambda: transcriber.transcribe(filename), 1)
+
+            print(f"{profile:<20} {size:>10.1f} {decode:>11.3f} {transcribe:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
 from .meetings import Meeting
+from .stores import MeetingStore
 
-__all__ = ("Meeting",)
+__all__ = ("Meeting", "MeetingStore")
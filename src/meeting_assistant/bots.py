@@ -7,28 +7,48 @@ __author__ = "Mauricio Vanzulli"
 __email__ = "mcvanzulli@gmail.com"
 
 # Built-in modules
+import typing
+import hashlib
 from abc import ABC, abstractmethod
 
-# Third-party libraries
-import yaml
-from langdetect import detect
-from langdetect.lang_detect_exception import LangDetectException
-from googletrans import Translator
-from pkg_resources import resource_string
-
 # Local modules
+from . import configs
 from . import gpt_wrapper
+from . import retrievers
 
 # Import global variables
 from .gpt_wrapper import DEFAULT_GPT_MODEL
+from .retrievers import DEFAULT_TOP_K
 
 # Global variables
 DEFAULT_BOT_TEMPERATURE = 0.5
 DEFAULT_LANGUAGE = "en"
+DEFAULT_DETECTION_SAMPLE = 1000
+
+
+def __getattr__(name: str):
+    # Read the language roles from the config file on first access
+    if name == "bot_roles":
+        return configs.load_config("bot_roles")
+    raise AttributeError(f"module {__name__} has no attribute {name}")
+
+
+def detect(text: str) -> typing.Optional[str]:
+    """Detect the language of a text, or None when it cannot be detected."""
+    from langdetect import detect as detect_language
+    from langdetect.lang_detect_exception import LangDetectException
+
+    try:
+        return detect_language(text)
+    except LangDetectException:
+        return None
 
-# Read the language roles from the config file
-json_data = resource_string(__name__, "config/bot_roles.yaml")
-bot_roles = yaml.safe_load(json_data)
+
+def get_translator():
+    """Get a new googletrans translator."""
+    from googletrans import Translator
+
+    return Translator()
 
 
 class AbstractQABot(ABC):
@@ -45,39 +65,72 @@ class GPTQABot:
         language: str = "en",
         temperature: float = DEFAULT_BOT_TEMPERATURE,
         gpt_model: str = DEFAULT_GPT_MODEL,
+        top_k: int = DEFAULT_TOP_K,
     ) -> None:
+        bot_roles = configs.load_config("bot_roles")
         self.user_role = bot_roles[language]["command_prompt"]
         self.bot_role = bot_roles[language]["command_role"]
         self.temperature = temperature
         self.model = gpt_model
+        self.top_k = top_k
+
+        # Memoized per-context work, keyed by the hash of the context
+        self.translator = None
+        self.context_languages = {}
+        self.translations = {}
+
+    @staticmethod
+    def _hash(context: str) -> str:
+        """Get the hash of a context used as memoization key."""
+        return hashlib.sha1(context.encode("utf-8")).hexdigest()
+
+    def _detect_context_language(self, context: str, context_hash: str) -> str:
+        """Detect the language of a context from a bounded prefix, only once."""
+        if context_hash not in self.context_languages:
+            language = detect(context[:DEFAULT_DETECTION_SAMPLE])
+            self.context_languages[context_hash] = language or DEFAULT_LANGUAGE
+
+        return self.context_languages[context_hash]
+
+    def _translate(self, context: str, context_hash: str, language: str) -> str:
+        """Translate a context to a language, only once per context and language."""
+        key = (context_hash, language)
+        if key not in self.translations:
+            if self.translator is None:
+                self.translator = get_translator()
+            self.translations[key] = self.translator.translate(
+                context, dest=language
+            ).text
+
+        return self.translations[key]
 
     def answer(
         self,
         question: str,
-        context: str,
+        context: typing.Union[str, retrievers.AbstractRetriever],
         temperature: float = DEFAULT_BOT_TEMPERATURE,
+        context_language: str = None,
     ) -> str:
+        # Send only the windows relevant to the question when given a retriever
+        if isinstance(context, retrievers.AbstractRetriever):
+            context = context.get_context(question, top_k=self.top_k)
+
         # Detect language of the question
-        try:
-            question_language = detect(question)
-            context_language = detect(context)
-        except LangDetectException:
-            question_language = DEFAULT_LANGUAGE
+        question_language = detect(question) or DEFAULT_LANGUAGE
+
+        # Reuse the context language when known, e.g. from the transcription
+        context_hash = self._hash(context)
+        if context_language is None:
+            context_language = self._detect_context_language(context, context_hash)
 
         if context_language != question_language:
-            self.translator = Translator()
-            context = self.translator.translate(context, dest=question_language).text
-
-        # Set the bot_role to the detected language
-        if question_language in bot_roles:
-            self.bot_role = bot_roles[question_language]["command_role"]
-            self.user_role = bot_roles[question_language]["command_prompt"]
-        else:
-            self.bot_role = bot_roles[DEFAULT_LANGUAGE][
-                "command_role"
-            ]  # Default to English
-            self.user_role = bot_roles[DEFAULT_LANGUAGE]["command_prompt"]
+            context = self._translate(context, context_hash, question_language)
+
+        # Pick the bot role of the detected language, without mutating the bot
+        # so that concurrent questions can share it. Default to English
+        bot_roles = configs.load_config("bot_roles")
+        roles = bot_roles.get(question_language, bot_roles[DEFAULT_LANGUAGE])
 
         return gpt_wrapper.call_gpt(
-            context, question, self.bot_role, temperature, self.model
+            context, question, roles["command_role"], temperature, self.model
         )
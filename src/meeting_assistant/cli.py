@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""Module defining the command line interface."""
+
+__author__ = "Mauricio Vanzulli"
+__email__ = "mcvanzulli@gmail.com"
+
+# Built-in modules
+import os
+import sys
+import json
+import time
+import typing
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Local modules
+from . import configs
+from . import meetings
+from . import transcribers
+from . import summarizers
+
+# Global variables
+from .gpt_wrapper import DEFAULT_GPT_MODEL
+from .transcribers import DEFAULT_MODEL_SIZE_TRANSCRIBER
+
+DEFAULT_WORKERS = 1
+DEFAULT_AUDIO_EXTENSIONS = ("mp3", "wav", "m4a", "ogg", "opus", "flac", "webm", "mp4")
+MANIFEST_FILENAME = ".meeting_assistant_batch.json"
+CHECKPOINT_SUFFIX = ".meeting.json"
+
+# Components loaded once per worker process
+_worker_components = {}
+
+
+def _init_worker(whisper_model_size: str, gpt_model: str) -> None:
+    """Load the models of a worker process."""
+    _worker_components["transcriber"] = transcribers.WhisperTranscriber(
+        model_size=whisper_model_size
+    )
+    _worker_components["summarizer"] = summarizers.GPTSummarizer(model=gpt_model)
+
+
+def _process_recording(
+    audio_filename: str,
+    languages: typing.List[str],
+    whisper_model_size: str,
+    gpt_model: str,
+) -> dict:
+    """Transcribe and summarize a recording in a worker, resuming its checkpoint."""
+    import ffmpeg
+
+    start = time.perf_counter()
+    checkpoint = audio_filename + CHECKPOINT_SUFFIX
+    if os.path.isfile(checkpoint):
+        meeting = meetings.Meeting.load(checkpoint, **_worker_components)
+        # The outputs of other models are computed again
+        meeting.whisper_model_size = whisper_model_size
+        meeting.gpt_model = gpt_model
+    else:
+        meeting = meetings.Meeting(
+            audio_filename,
+            whisper_model_size=whisper_model_size,
+            gpt_model=gpt_model,
+            **_worker_components,
+        )
+
+    meeting.transcribe()
+    meeting.save(checkpoint)
+    meeting.process(summary_languages=languages or [meeting.audio_language])
+    meeting.save(checkpoint)
+
+    return {
+        "checkpoint": checkpoint,
+        "duration": float(ffmpeg.probe(audio_filename)["format"]["duration"]),
+        "time": time.perf_counter() - start,
+    }
+
+
+def _fingerprint(audio_filename: str) -> dict:
+    """Get a cheap fingerprint telling whether a recording changed."""
+    stat = os.stat(audio_filename)
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def _discover(directory: str, extensions: typing.Sequence[str]) -> typing.List[str]:
+    """Find the recordings of a directory and its subdirectories."""
+    recordings = []
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            if filename.rsplit(".", 1)[-1].lower() in extensions:
+                recordings.append(
+                    os.path.relpath(os.path.join(root, filename), directory)
+                )
+    return sorted(recordings)
+
+
+def _write_manifest(path: str, manifest: dict) -> None:
+    """Write the batch manifest atomically."""
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def batch(args: argparse.Namespace) -> int:
+    """Process every recording of a directory, skipping the ones already done."""
+    manifest_path = os.path.join(args.directory, MANIFEST_FILENAME)
+    manifest = {}
+    if os.path.isfile(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+    recordings = _discover(args.directory, args.extensions)
+    pending = [
+        recording
+        for recording in recordings
+        if manifest.get(recording, {}).get("fingerprint")
+        != _fingerprint(os.path.join(args.directory, recording))
+    ]
+    print(f"Found {len(recordings)} recordings, {len(pending)} to process.")
+    if not pending:
+        return 0
+
+    start = time.perf_counter()
+    audio_seconds, failures = 0.0, 0
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_worker,
+        initargs=(args.whisper_model, args.gpt_model),
+    ) as executor:
+        futures = {
+            executor.submit(
+                _process_recording,
+                os.path.join(args.directory, recording),
+                args.languages,
+                args.whisper_model,
+                args.gpt_model,
+            ): recording
+            for recording in pending
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            recording = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"[{done}/{len(pending)}] {recording} failed: {e}")
+                continue
+
+            # Record progress right away so a rerun skips this recording
+            audio_seconds += result["duration"]
+            manifest[recording] = dict(
+                result,
+                fingerprint=_fingerprint(os.path.join(args.directory, recording)),
+            )
+            _write_manifest(manifest_path, manifest)
+            print(f"[{done}/{len(pending)}] {recording} done in {result['time']:.1f} s")
+
+    wall_seconds = time.perf_counter() - start
+    print(
+        f"Processed {audio_seconds / 3600:.2f} audio hours in {wall_seconds / 3600:.2f}"
+        f" wall hours ({audio_seconds / wall_seconds:.1f} audio hours per wall hour)."
+    )
+    return 1 if failures else 0
+
+
+def languages(args: argparse.Namespace) -> int:
+    """List the supported summary and question answering languages."""
+    print("Summary languages:", ", ".join(configs.load_config("summarizer_roles")))
+    print("Question languages:", ", ".join(configs.load_config("bot_roles")))
+    return 0
+
+
+def look_up(args: argparse.Namespace) -> int:
+    """Look up a word or a time in the transcription of a saved meeting."""
+    meeting = meetings.Meeting.load(args.checkpoint)
+    if args.word is not None:
+        for start, end in meeting.look_up_word(args.word):
+            print(f"{start:.1f} s - {end:.1f} s")
+    if args.time is not None:
+        print(meeting.look_up_time(args.time))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the parser of the command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="meeting-assistant",
+        description="Record, transcribe and summarize meetings.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    batch_parser = subparsers.add_parser(
+        "batch", help="Transcribe and summarize every recording of a directory."
+    )
+    batch_parser.add_argument("directory", help="Directory with the recordings.")
+    batch_parser.add_argument(
+        "--workers", type=int, default=DEFAULT_WORKERS, help="Worker processes."
+    )
+    batch_parser.add_argument(
+        "--language",
+        dest="languages",
+        action="append",
+        default=[],
+        help="Summary language, repeatable. Defaults to the audio language.",
+    )
+    batch_parser.add_argument(
+        "--whisper-model", default=DEFAULT_MODEL_SIZE_TRANSCRIBER, help="Whisper size."
+    )
+    batch_parser.add_argument(
+        "--gpt-model", default=DEFAULT_GPT_MODEL, help="GPT model."
+    )
+    batch_parser.add_argument(
+        "--extensions",
+        nargs="+",
+        default=DEFAULT_AUDIO_EXTENSIONS,
+        help="Extensions of the recordings.",
+    )
+    batch_parser.set_defaults(func=batch)
+
+    languages_parser = subparsers.add_parser(
+        "languages", help="List the supported languages."
+    )
+    languages_parser.set_defaults(func=languages)
+
+    look_up_parser = subparsers.add_parser(
+        "look-up", help="Look up a word or a time in a saved meeting."
+    )
+    look_up_parser.add_argument("checkpoint", help="Checkpoint of the meeting.")
+    look_up_parser.add_argument("--word", help="Word to look up.")
+    look_up_parser.add_argument("--time", type=float, help="Time to look up, in s.")
+    look_up_parser.set_defaults(func=look_up)
+
+    return parser
+
+
+def main(argv: typing.List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""Module defining the access to the config files."""
+
+__author__ = "Mauricio Vanzulli"
+__email__ = "mcvanzulli@gmail.com"
+
+# Built-in modules
+import functools
+from importlib import resources
+
+
+@functools.lru_cache(maxsize=None)
+def load_config(name: str) -> dict:
+    """Load a YAML config file of the package, reading it only once."""
+    import yaml
+
+    config = resources.files(__package__).joinpath("config", f"{name}.yaml")
+    return yaml.safe_load(config.read_text(encoding="utf-8"))
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""Module defining the keyword extractor classes and methods."""
+
+__author__ = "Mauricio Vanzulli"
+__email__ = "mcvanzulli@gmail.com"
+
+# Built-in modules
+import re
+import typing
+from abc import ABC, abstractmethod
+
+# Local modules
+from . import configs
+from . import transcriptions
+
+# Global variables
+DEFAULT_NUM_KEYWORDS = 6
+DEFAULT_MIN_KEYWORD_LENGTH = 3
+
+TOKEN_PATTERN = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+
+def __getattr__(name: str):
+    # Read the stopwords from the config file on first access
+    if name == "stopwords":
+        return configs.load_config("stopwords")
+    raise AttributeError(f"module {__name__} has no attribute {name}")
+
+
+class AbstractKeywordExtractor(ABC):
+    """Abstract base class for a keyword extractor."""
+
+    @abstractmethod
+    def extract(
+        self, transcription: transcriptions.Transcription, num_keywords: int
+    ) -> typing.Dict[str, typing.List[tuple[float, float]]]:
+        """Extract the keywords of a transcription with their start and end times."""
+        pass
+
+
+class TfidfKeywordExtractor(AbstractKeywordExtractor):
+    """Keyword extractor that scores terms by TF-IDF across transcription segments."""
+
+    def __init__(self, min_length: int = DEFAULT_MIN_KEYWORD_LENGTH):
+        self.min_length = min_length
+
+    def _tokenize(self, text: str, ignored: typing.Set[str]) -> typing.List[str]:
+        """Split a text into lowercase candidate terms."""
+        return [
+            term
+            for term in TOKEN_PATTERN.findall(text.lower())
+            if len(term) >= self.min_length and term not in ignored
+        ]
+
+    def extract(
+        self,
+        transcription: transcriptions.Transcription,
+        num_keywords: int = DEFAULT_NUM_KEYWORDS,
+    ) -> typing.Dict[str, typing.List[tuple[float, float]]]:
+        """Extract the keywords of a transcription with their start and end times."""
+        import numpy as np
+
+        stopwords = configs.load_config("stopwords")
+        ignored = set(stopwords.get(transcription.language, []))
+        segments = transcription.transcriptions
+
+        # Flatten the (segment, term) occurrences into integer arrays
+        vocabulary = {}
+        segment_ids, term_ids = [], []
+        for segment_id, segment in enumerate(segments):
+            for term in self._tokenize(segment["text"], ignored):
+                segment_ids.append(segment_id)
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+
+        if not vocabulary:
+            return {}
+
+        num_segments, num_terms = len(segments), len(vocabulary)
+        segment_ids = np.asarray(segment_ids, dtype=np.int64)
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+
+        # Sparse (segment, term) counts without materializing the dense matrix
+        pairs, counts = np.unique(
+            segment_ids * num_terms + term_ids, return_counts=True
+        )
+        pair_segments, pair_terms = np.divmod(pairs, num_terms)
+
+        # Term frequency normalized by segment length, and smoothed inverse
+        # segment frequency
+        lengths = np.bincount(segment_ids, minlength=num_segments)
+        tf = counts / lengths[pair_segments]
+        df = np.bincount(pair_terms, minlength=num_terms)
+        idf = np.log((1 + num_segments) / (1 + df)) + 1
+
+        # Aggregate the TF-IDF weight of each term over all the segments
+        scores = np.bincount(pair_terms, weights=tf * idf[pair_terms])
+        ranking = np.argsort(-scores, kind="stable")[:num_keywords]
+
+        terms = list(vocabulary)
+        keywords = {}
+        for term_id in ranking:
+            occurrences = pair_segments[pair_terms == term_id]
+            keywords[terms[term_id]] = [
+                (segments[i]["start"], segments[i]["end"]) for i in occurrences
+            ]
+
+        return keywords
@@ -9,8 +9,8 @@ __email__ = "mcvanzulli@gmail.com"
 # Built-in modules
 import os
 
-# Third-party libraries
-import openai
+# Local modules
+from . import instruments
 
 DEFAULT_GPT_MODEL = "gpt-3.5-turbo"
 DEFAULT_GPT_ENCODER = "cl100k_base"
@@ -27,13 +27,16 @@ def call_gpt(
     """
     Generate a summary prompt using OpenAI's GPT language model.
     """
+    import openai
+
     # Get command role and prompts from the config file
-    response = openai.ChatCompletion.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": f"{role}"},
-            {"role": "user", "content": f"{command_prompt}: {encoded_prompt}"},
-        ],
-        temperature=temperature,
-    )
+    with instruments.timed("gpt_call", model=model):
+        response = openai.ChatCompletion.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": f"{role}"},
+                {"role": "user", "content": f"{command_prompt}: {encoded_prompt}"},
+            ],
+            temperature=temperature,
+        )
     return response.choices[0].message["content"].strip()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""Module defining the hooks reporting how long each processing stage takes."""
+
+__author__ = "Mauricio Vanzulli"
+__email__ = "mcvanzulli@gmail.com"
+
+# Built-in modules
+import time
+import typing
+import contextlib
+
+# Global variables
+_observers = []
+
+
+def add_observer(observer: typing.Callable[[str, float, dict], None]) -> None:
+    """Call observer(stage, seconds, labels) every time a timed stage ends.
+
+    The stages are "decode", "transcription", with the audio_seconds label,
+    "gpt_call", with the model label, and "pipeline". A stage that raised
+    has an error label with the name of the exception. Observers run on the
+    thread of the stage, so they should be quick and thread-safe.
+    """
+    _observers.append(observer)
+
+
+def remove_observer(observer: typing.Callable[[str, float, dict], None]) -> None:
+    _observers.remove(observer)
+
+
+@contextlib.contextmanager
+def timed(stage: str, **labels) -> typing.Iterator[dict]:
+    """Time a stage for the observers, yielding labels to fill in meanwhile.
+
+    Without observers, nothing is timed.
+    """
+    if not _observers:
+        yield labels
+        return
+
+    start = time.perf_counter()
+    try:
+        yield labels
+    except Exception as e:
+        labels["error"] = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        for observer in list(_observers):
+            observer(stage, seconds, labels)
@@ -8,7 +8,11 @@ __email__ = "mcvanzulli@gmail.com"
 
 # Built-in modules
 import os
+import json
+import time
 import typing
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
 # Third-party libraries
 from datetime import date
@@ -18,16 +22,25 @@ from . import recorders
 from . import transcribers
 from . import summarizers
 from . import bots
+from . import retrievers
+from . import extractors
+from . import transcriptions
+from . import pipelines
+from . import instruments
 
 # Global variables
 from .gpt_wrapper import DEFAULT_GPT_MODEL
-from .recorders import DEFAULT_AUDIO_FORMAT
+from .recorders import DEFAULT_AUDIO_FORMAT, DEFAULT_SEGMENT_SECONDS
 from .transcribers import (
     DEFAULT_TEMPERATURE_TRANSCRIBER,
     DEFAULT_MODEL_SIZE_TRANSCRIBER,
 )
 from .summarizers import DEFAULT_TEMPERATURE_SUMMARIZER
 from .bots import DEFAULT_BOT_TEMPERATURE
+from .extractors import DEFAULT_NUM_KEYWORDS
+
+DEFAULT_MAX_CONCURRENT_QUESTIONS = 4
+CHECKPOINT_VERSION = 1
 
 
 class Meeting:
@@ -42,43 +55,225 @@ class Meeting:
         temperature_transcription: float = DEFAULT_TEMPERATURE_TRANSCRIBER,
         temperature_summarizer=DEFAULT_TEMPERATURE_SUMMARIZER,
         gpt_model: str = DEFAULT_GPT_MODEL,
+        transcription: transcriptions.Transcription = None,
+        transcriber: transcribers.AbstractTranscriber = None,
+        summarizer: summarizers.AbstractSummarizer = None,
+        bot: bots.GPTQABot = None,
+        audio_segments: typing.List[dict] = None,
     ):
         self.audio_filename = audio_filename
 
+        # Segments of a segmented recording, transcribed as one timeline
+        self.audio_segments = audio_segments
+        self.segment_transcriptions = {}
+
         self.participant_names = participant_names or [""]
         self.date = dt or date.today()
 
-        self.transcriber = transcribers.WhisperTranscriber(
-            model_size=whisper_model_size, temperature=temperature_transcription
-        )
+        self.whisper_model_size = whisper_model_size
+        self.temperature_transcription = temperature_transcription
+        self.temperature_summarizer = temperature_summarizer
+        self.gpt_model = gpt_model
 
-        self.summarizer = summarizers.GPTSummarizer(
-            model=gpt_model, temperature=temperature_summarizer
-        )
+        # Components are built on first use unless shared ones are injected
+        self._transcriber = transcriber
+        self._summarizer = summarizer
+        self.bot = bot
+        self.retriever = None
+
+        # Computed artifacts, valid while the inputs they were computed from hold
+        self.transcription_inputs = None
+        self.audio_fingerprint = None
+        self.artifacts = {"inputs": None}
+
+        if transcription is not None:
+            self.attach_transcription(transcription)
+
+    @property
+    def transcriber(self) -> transcribers.AbstractTranscriber:
+        """Get the transcriber, loading the whisper model on first use."""
+        if self._transcriber is None:
+            self._transcriber = transcribers.WhisperTranscriber(
+                model_size=self.whisper_model_size,
+                temperature=self.temperature_transcription,
+            )
+        return self._transcriber
+
+    @transcriber.setter
+    def transcriber(self, transcriber: transcribers.AbstractTranscriber) -> None:
+        self._transcriber = transcriber
+
+    @property
+    def summarizer(self) -> summarizers.AbstractSummarizer:
+        """Get the summarizer, building it on first use."""
+        if self._summarizer is None:
+            self._summarizer = summarizers.GPTSummarizer(
+                model=self.gpt_model, temperature=self.temperature_summarizer
+            )
+        return self._summarizer
+
+    @summarizer.setter
+    def summarizer(self, summarizer: summarizers.AbstractSummarizer) -> None:
+        self._summarizer = summarizer
 
     def record(
-        self, audio_filename: str, audio_format: str = DEFAULT_AUDIO_FORMAT
+        self,
+        audio_filename: str,
+        audio_format: str = DEFAULT_AUDIO_FORMAT,
+        profile: str = None,
     ) -> None:
-        """Record the meeting audio."""
+        """Record the meeting audio, optionally with a recording profile."""
         recorder = recorders.FfmpgRecorder()
-        recorder.record(audio_filename, audio_format)
-        self.audio_filename = audio_filename + "." + audio_format
+        self.audio_filename = recorder.record(audio_filename, audio_format, profile)
+
+    def record_segments(
+        self,
+        audio_prefix: str,
+        audio_format: str = DEFAULT_AUDIO_FORMAT,
+        segment_seconds: float = DEFAULT_SEGMENT_SECONDS,
+        profile: str = None,
+    ) -> None:
+        """Record the meeting audio in rotating segments.
+
+        Each segment is transcribed in the background as soon as it is closed,
+        so the transcription is ready shortly after the recording ends.
+        """
+        self.audio_segments = []
+        pending = {}
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+
+            def _on_segment(segment: dict) -> None:
+                self.audio_segments.append(segment)
+                pending[segment["filename"]] = executor.submit(
+                    self.transcriber.transcribe, segment["filename"]
+                )
+
+            recorder = recorders.FfmpgRecorder()
+            recorder.record_segments(
+                audio_prefix,
+                audio_format,
+                segment_seconds,
+                on_segment=_on_segment,
+                profile=profile,
+            )
+
+        for filename, future in pending.items():
+            self.segment_transcriptions[filename] = future.result()
+        self.transcribe()
+
+    def _transcribe_segments(self) -> str:
+        """Transcribe the new segments and merge all of them into one timeline."""
+        timeline = transcriptions.Transcription()
+        for segment in self.audio_segments:
+            filename = segment["filename"]
+            if filename not in self.segment_transcriptions:
+                self.segment_transcriptions[filename] = self.transcriber.transcribe(
+                    filename
+                )
+
+            transcription = self.segment_transcriptions[filename]
+            timeline.set_language(timeline.language or transcription.language)
+            timeline.extend(transcription, offset=segment["start"])
+
+        self.attach_transcription(timeline)
+        return self.transcription.get_text()
+
+    def _transcription_inputs(self) -> dict:
+        """Get the inputs the transcription is computed from."""
+        audio_hash = hashlib.sha256()
+        with open(self.audio_filename, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                audio_hash.update(chunk)
+
+        return {
+            "audio_sha256": audio_hash.hexdigest(),
+            "whisper_model_size": self.whisper_model_size,
+            "temperature_transcription": self.temperature_transcription,
+        }
 
     def transcribe(self) -> str:
         """Get the transcription of the meeting."""
+        if self.audio_segments:
+            return self._transcribe_segments()
+
         if not os.path.isfile(self.audio_filename):
             raise FileNotFoundError(f"Audio file {self.audio_filename} not found.")
 
-        self.transcription = self.transcriber.transcribe(self.audio_filename)
+        # Skip the transcription when the audio and the settings are unchanged
+        inputs = self._transcription_inputs()
+        if self._has_a_transcription() and self.transcription_inputs == inputs:
+            return self.transcription.get_text()
+
+        # An appended recording only needs its new tail to be transcribed
+        previous, previous_fingerprint = None, None
+        if self._has_a_transcription() and self.transcription_inputs is not None:
+            if all(
+                self.transcription_inputs[name] == value
+                for name, value in inputs.items()
+                if name != "audio_sha256"
+            ):
+                previous, previous_fingerprint = (
+                    self.transcription,
+                    self.audio_fingerprint,
+                )
+
+        transcription, fingerprint = self.transcriber.transcribe_incremental(
+            self.audio_filename, previous, previous_fingerprint
+        )
+        self.attach_transcription(transcription)
+        self.transcription_inputs = inputs
+        self.audio_fingerprint = fingerprint
+
+        return self.transcription.get_text()
+
+    def attach_transcription(self, transcription: transcriptions.Transcription) -> None:
+        """Use an already available transcription for the meeting."""
+        self.transcription = transcription
         self.audio_language = self.transcription.language
         self.transcription_text = self.transcription.get_text()
+        self.transcription_inputs = None
+        self.audio_fingerprint = None
+        self.retriever = None
 
-        return self.transcription.get_text()
+    def _get_artifacts(self) -> dict:
+        """Get the computed artifacts, dropping them when their inputs changed."""
+        inputs = {
+            "transcription_sha1": hashlib.sha1(
+                self.transcription_text.encode("utf-8")
+            ).hexdigest(),
+            "gpt_model": self.gpt_model,
+            "temperature_summarizer": self.temperature_summarizer,
+        }
+        if self.artifacts["inputs"] != inputs:
+            self.artifacts = {
+                "inputs": inputs,
+                "summaries": {},
+                "keywords": {},
+                "answers": {},
+            }
+        return self.artifacts
 
     def _has_a_transcription(self) -> bool:
         """Check if the meeting has a transcription."""
         return hasattr(self, "transcription")
 
+    def _get_retriever(self) -> retrievers.BM25Retriever:
+        """Get the retrieval index of the transcription, building it once."""
+        if self.retriever is None:
+            self.retriever = retrievers.BM25Retriever(self.transcription)
+        return self.retriever
+
+    def _get_bot(self, gpt_model: str, bot_temperature: float) -> bots.GPTQABot:
+        """Get the question answering bot, reusing it while its settings match."""
+        if (
+            self.bot is None
+            or self.bot.model != gpt_model
+            or self.bot.temperature != bot_temperature
+        ):
+            self.bot = bots.GPTQABot(gpt_model=gpt_model, temperature=bot_temperature)
+        return self.bot
+
     def summarize(self, language: str = None) -> str:
         """Get a summary of the meeting."""
 
@@ -86,21 +281,56 @@ class Meeting:
             self.transcribe()
 
         language = self.transcription.language if language is None else language
-        text_summary = self.summarizer.summarize(self.transcription_text, language)
-        self.summary = text_summary
+        summaries = self._get_artifacts()["summaries"]
+        if language not in summaries:
+            summaries[language] = self.summarizer.summarize(
+                self.transcription_text, language
+            )
+
+        self.summary = summaries[language]
         return self.summary
 
-    def keywords(self) -> str:
+    def keywords(
+        self, method: str = "gpt", num_keywords: int = DEFAULT_NUM_KEYWORDS
+    ) -> typing.Union[str, typing.Dict[str, typing.List[tuple[float, float]]]]:
+        """Get the keywords of the meeting.
+
+        The "gpt" method asks the language model for a comma separated list of
+        keywords. The "tfidf" method extracts them locally and offline, returning
+        each keyword with the start and end times of the segments it appears in.
+        """
         if not self._has_a_transcription():
             self.transcribe()
 
-        keywords = self.answer(
-            "Extract a list of 6 keywords with the most important information from the meeting."
-            + "Answer only the with a list of keywords separated by a comma."
-        )
+        cached_keywords = self._get_artifacts()["keywords"]
+        key = f"{method}:{num_keywords}"
+        if method == "gpt":
+            # Key the keywords on the bot that extracts them
+            bot = self._get_bot(self.gpt_model, DEFAULT_BOT_TEMPERATURE)
+            key = json.dumps([method, num_keywords, bot.model, bot.temperature])
+        if key in cached_keywords:
+            self.extracted_keywords = cached_keywords[key]
+            return self.extracted_keywords
+
+        if method == "tfidf":
+            keywords = extractors.TfidfKeywordExtractor().extract(
+                self.transcription, num_keywords
+            )
+        elif method == "gpt":
+            # Keywords cover the whole meeting, so the full transcript is the context
+            keywords = bot.answer(
+                f"Extract a list of {num_keywords} keywords with the most important information from the meeting."
+                + "Answer only the with a list of keywords separated by a comma.",
+                self.transcription_text,
+                context_language=self.transcription.language,
+            )
+        else:
+            raise ValueError(f"Keyword extraction method {method} not supported.")
 
-        self.keywords = keywords
-        return self.keywords
+        # Keep the result apart so that it does not shadow this method
+        cached_keywords[key] = keywords
+        self.extracted_keywords = keywords
+        return self.extracted_keywords
 
     def answer(
         self,
@@ -112,9 +342,97 @@ class Meeting:
         if not hasattr(self, "transcription"):
             self.transcribe()
 
-        self.bot = bots.GPTQABot(gpt_model=gpt_model, temperature=bot_temperature)
+        return self._cached_answer(
+            question, self._get_bot(gpt_model, bot_temperature), self._get_retriever()
+        )
 
-        return self.bot.answer(question, self.transcription_text)
+    def _cached_answer(
+        self, question: str, bot: bots.GPTQABot, retriever: retrievers.AbstractRetriever
+    ) -> str:
+        """Answer a question, unless it was already answered with the same bot settings."""
+        answers = self._get_artifacts()["answers"]
+        key = json.dumps([question, bot.model, bot.temperature])
+        if key not in answers:
+            answers[key] = bot.answer(
+                question, retriever, context_language=self.transcription.language
+            )
+        return answers[key]
+
+    def answer_many(
+        self,
+        questions: typing.List[str],
+        gpt_model=DEFAULT_GPT_MODEL,
+        bot_temperature=DEFAULT_BOT_TEMPERATURE,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT_QUESTIONS,
+    ) -> typing.List[dict]:
+        """Answer several questions concurrently, returning the answers in order."""
+        if not self._has_a_transcription():
+            self.transcribe()
+
+        # Prepare the shared context once, before dispatching the questions
+        bot = self._get_bot(gpt_model, bot_temperature)
+        retriever = self._get_retriever()
+        self._get_artifacts()
+
+        def _answer(question: str) -> dict:
+            start = time.perf_counter()
+            answer = self._cached_answer(question, bot, retriever)
+            return {
+                "question": question,
+                "answer": answer,
+                "time": time.perf_counter() - start,
+            }
+
+        with ThreadPoolExecutor(max_workers=max_concurrent) as executor:
+            return list(executor.map(_answer, questions))
+
+    def process(
+        self,
+        summary_languages: typing.Sequence[str] = (),
+        keywords_method: str = None,
+        questions: typing.Sequence[str] = (),
+        max_workers: int = pipelines.DEFAULT_MAX_WORKERS,
+    ) -> typing.Tuple[dict, dict]:
+        """Compute the requested outputs of the meeting, each one once.
+
+        The transcription runs first, then the summaries, keywords and answers
+        run concurrently. Returns the outputs and the duration of each stage.
+        """
+
+        def _transcript() -> str:
+            if not self._has_a_transcription():
+                self.transcribe()
+            # Set up the shared artifacts before the stages run concurrently
+            self._get_artifacts()
+            return self.transcription_text
+
+        pipeline = pipelines.Pipeline(max_workers=max_workers)
+        pipeline.add_stage("transcript", _transcript)
+        targets = ["transcript"]
+
+        for language in summary_languages:
+            pipeline.add_stage(
+                f"summary:{language}",
+                lambda _, language=language: self.summarize(language),
+                ["transcript"],
+            )
+            targets.append(f"summary:{language}")
+
+        if keywords_method is not None:
+            pipeline.add_stage(
+                "keywords", lambda _: self.keywords(keywords_method), ["transcript"]
+            )
+            targets.append("keywords")
+
+        if questions:
+            pipeline.add_stage(
+                "answers", lambda _: self.answer_many(questions), ["transcript"]
+            )
+            targets.append("answers")
+
+        with instruments.timed("pipeline"):
+            results = pipeline.run(targets)
+        return results, pipeline.timings
 
     def look_up_word(self, word: str) -> typing.List[tuple[float, float]]:
         """Look up the start and end times of a specific word in the transcription."""
@@ -129,3 +447,74 @@ class Meeting:
             self.transcribe()
 
         return self.transcription.look_up_time(time)
+
+    def save(self, path: str) -> None:
+        """Save the meeting and its computed artifacts to a checkpoint file."""
+        checkpoint = {
+            "manifest": {
+                "version": CHECKPOINT_VERSION,
+                "audio_filename": self.audio_filename,
+                "whisper_model_size": self.whisper_model_size,
+                "temperature_transcription": self.temperature_transcription,
+                "temperature_summarizer": self.temperature_summarizer,
+                "gpt_model": self.gpt_model,
+                "transcription_inputs": self.transcription_inputs,
+                "audio_fingerprint": self.audio_fingerprint,
+                "audio_segments": self.audio_segments,
+            },
+            "participant_names": self.participant_names,
+            "date": self.date.isoformat(),
+            "transcription": (
+                self.transcription.to_dict() if self._has_a_transcription() else None
+            ),
+            "segment_transcriptions": {
+                filename: transcription.to_dict()
+                for filename, transcription in self.segment_transcriptions.items()
+            },
+            "artifacts": self.artifacts,
+        }
+
+        # Write to a temporary file first so a crash never leaves a partial checkpoint
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "Meeting":
+        """Load a meeting and its computed artifacts from a checkpoint file.
+
+        Keyword arguments, e.g. shared components, are forwarded to Meeting.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+
+        manifest = checkpoint["manifest"]
+        if manifest["version"] != CHECKPOINT_VERSION:
+            raise ValueError(f"Checkpoint version {manifest['version']} not supported.")
+
+        meeting = cls(
+            manifest["audio_filename"],
+            participant_names=checkpoint["participant_names"],
+            dt=date.fromisoformat(checkpoint["date"]),
+            whisper_model_size=manifest["whisper_model_size"],
+            temperature_transcription=manifest["temperature_transcription"],
+            temperature_summarizer=manifest["temperature_summarizer"],
+            gpt_model=manifest["gpt_model"],
+            audio_segments=manifest.get("audio_segments"),
+            **kwargs,
+        )
+        meeting.segment_transcriptions = {
+            filename: transcriptions.Transcription.from_dict(transcription)
+            for filename, transcription in checkpoint.get(
+                "segment_transcriptions", {}
+            ).items()
+        }
+        if checkpoint["transcription"] is not None:
+            meeting.attach_transcription(
+                transcriptions.Transcription.from_dict(checkpoint["transcription"])
+            )
+            meeting.transcription_inputs = manifest["transcription_inputs"]
+            meeting.audio_fingerprint = manifest.get("audio_fingerprint")
+        meeting.artifacts = checkpoint["artifacts"]
+
+        return meeting
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""Module defining the pipeline class and methods."""
+
+__author__ = "Mauricio Vanzulli"
+__email__ = "mcvanzulli@gmail.com"
+
+# Built-in modules
+import time
+import typing
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Global variables
+DEFAULT_MAX_WORKERS = 4
+
+
+class Pipeline:
+    """Class running a graph of dependent stages, each one once.
+
+    Stages whose dependencies are done run concurrently on a thread pool. Each
+    stage is called with the results of its dependencies, in order.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS):
+        self.max_workers = max_workers
+        self.stages = {}
+        self.timings = {}
+
+    def add_stage(
+        self,
+        name: str,
+        func: typing.Callable,
+        dependencies: typing.Sequence[str] = (),
+    ) -> None:
+        """Add a stage computing an output from the outputs of its dependencies."""
+        if name in self.stages:
+            raise ValueError(f"Stage {name} already exists.")
+        self.stages[name] = (func, tuple(dependencies))
+
+    def _resolve(self, targets: typing.Iterable[str]) -> typing.List[str]:
+        """Get the stages needed for the targets, dependencies first."""
+        order, visiting, visited = [], set(), set()
+
+        def visit(name: str) -> None:
+            if name in visited:
+                return
+            if name not in self.stages:
+                raise ValueError(f"Stage {name} not found.")
+            if name in visiting:
+                raise ValueError(f"Stage {name} depends on itself.")
+            visiting.add(name)
+            for dependency in self.stages[name][1]:
+                visit(dependency)
+            visiting.remove(name)
+            visited.add(name)
+            order.append(name)
+
+        for target in targets:
+            visit(target)
+        return order
+
+    def _run_stage(self, name: str, *args) -> typing.Any:
+        """Run a stage, recording its duration."""
+        start = time.perf_counter()
+        try:
+            return self.stages[name][0](*args)
+        finally:
+            self.timings[name] = time.perf_counter() - start
+
+    def run(self, targets: typing.Iterable[str]) -> dict:
+        """Run the stages needed for the targets, returning the output of each stage."""
+        pending = self._resolve(targets)
+        results, running = {}, {}
+        self.timings = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                # Submit every stage whose dependencies are done
+                for name in list(pending):
+                    dependencies = self.stages[name][1]
+                    if all(dependency in results for dependency in dependencies):
+                        args = [results[dependency] for dependency in dependencies]
+                        future = executor.submit(self._run_stage, name, *args)
+                        running[future] = name
+                        pending.remove(name)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    if future.exception() is not None:
+                        # Do not start anything else, and let the caller know
+                        for other in running:
+                            other.cancel()
+                        raise future.exception()
+                    results[name] = future.result()
+
+        return results
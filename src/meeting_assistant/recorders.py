@@ -12,15 +12,44 @@ import time
 import sys
 import subprocess
 import threading
-import signal
 import os
+import csv
+import typing
 from abc import ABC, abstractmethod
 
-# Third-party libraries
-import ffmpeg
-
 # Constant variables
 DEFAULT_AUDIO_FORMAT = "mp3"
+DEFAULT_SAMPLE_RATE = 16000
+DEFAULT_WINDOW_SECONDS = 10.0
+DEFAULT_BUFFER_SECONDS = 120.0
+DEFAULT_SEGMENT_SECONDS = 300.0
+PCM_CHUNK_BYTES = 6400  # 0.2 s of 16 kHz mono 16-bit PCM
+
+# Output format and FFmpeg encoder options of each recording profile
+RECORDING_PROFILES = {
+    # MP3 at the input sample rate and channels, to keep and listen to
+    "archive": {
+        "format": "mp3",
+        "options": {"acodec": "libmp3lame", "audio_bitrate": "192k"},
+    },
+    # Lossless 16 kHz mono FLAC, which Whisper decodes without resampling
+    "transcription": {
+        "format": "flac",
+        "options": {"acodec": "flac", "ac": 1, "ar": DEFAULT_SAMPLE_RATE},
+    },
+    # 16 kHz mono speech Opus, the smallest files. Note that Opus always
+    # decodes at 48 kHz, so it is resampled again when transcribed.
+    "transcription-opus": {
+        "format": "opus",
+        "options": {
+            "acodec": "libopus",
+            "ac": 1,
+            "ar": DEFAULT_SAMPLE_RATE,
+            "audio_bitrate": "24k",
+            "application": "voip",
+        },
+    },
+}
 
 
 class AbstractRecorder(ABC):
@@ -44,56 +73,306 @@ class AbstractRecorder(ABC):
             time.sleep(1)
 
 
+class RingBuffer:
+    """Preallocated circular buffer of audio samples, written by one thread.
+
+    Samples are addressed by their absolute index since the first write, so a
+    reader can wait for a window to be complete and then read it.
+    """
+
+    def __init__(self, capacity: int):
+        import numpy as np
+
+        self.samples = np.zeros(capacity, dtype=np.float32)
+        self.capacity = capacity
+        self.written = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def write(self, samples) -> None:
+        """Append samples, overwriting the oldest ones when full."""
+        # Only the last samples of a write larger than the buffer are kept
+        skipped = max(0, len(samples) - self.capacity)
+        samples = samples[skipped:]
+        with self.condition:
+            self.written += skipped
+            start = self.written % self.capacity
+            head = min(len(samples), self.capacity - start)
+            self.samples[start : start + head] = samples[:head]
+            self.samples[: len(samples) - head] = samples[head:]
+            self.written += len(samples)
+            self.condition.notify_all()
+
+    def close(self) -> None:
+        """Signal that no more samples will be written."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def wait_for(self, end: int) -> int:
+        """Wait until the samples up to end are written or the buffer is closed."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.written >= end or self.closed)
+            return self.written
+
+    def read(self, start: int, end: int):
+        """Read a copy of the samples between two absolute indexes."""
+        import numpy as np
+
+        with self.condition:
+            if start < self.written - self.capacity or end > self.written:
+                raise IndexError(f"Samples {start}:{end} are not in the buffer.")
+            indexes = np.arange(start, end) % self.capacity
+            return self.samples[indexes]
+
+
 class FfmpgRecorder(AbstractRecorder):
     """Recorder that uses FFmpeg."""
 
-    def __init__(self):
+    def __init__(self, input_source: str = "default", input_format: str = None):
         super().__init__()
         self.acodec = "alsa" if sys.platform == "linux" else "avfoundation"
 
-    def record(
-        self, output_filename: str, output_format: str = DEFAULT_AUDIO_FORMAT
-    ) -> None:
-        self.stop_timer = False
+        # Any FFmpeg input can be recorded, e.g. a lavfi sine source for testing
+        self.input_source = input_source
+        self.input_format = input_format or self.acodec
+        self.process = None
 
-        # Add the extension to the output filename
-        output_filename = f"{output_filename}.{output_format}"
-        try:
-            # Start the moving timer in a different thread
-            timer_thread = threading.Thread(target=self.display_clock)
-            timer_thread.start()
+    def _input(self):
+        """Get the FFmpeg input stream of the recorder."""
+        import ffmpeg
 
-            stream = (
-                ffmpeg.input("default", f=self.acodec, ac=2, video_size=None)
-                .output(
-                    output_filename, acodec="libmp3lame", format=output_format
-                )  # Specify the output format as 'mp3'
-                .overwrite_output()
+        if self.input_format == self.acodec:
+            return ffmpeg.input(
+                self.input_source, f=self.input_format, ac=2, video_size=None
             )
+        return ffmpeg.input(self.input_source, f=self.input_format)
 
-            # Start the process
-            process = ffmpeg.run_async(stream, pipe_stdin=True, pipe_stderr=True)
+    def _output_options(self, output_format: str, profile: str = None) -> tuple:
+        """Get the output format and encoder options of a recording.
 
-            # Wait for the process to finish or be interrupted
-            while process.poll() is None:
-                time.sleep(1)
+        A profile, when given, takes precedence over the output format.
+        """
+        if profile is None:
+            options = {"acodec": "libmp3lame"} if output_format == "mp3" else {}
+            return output_format, options
 
-        except KeyboardInterrupt:
-            self.stop_timer = True
-            timer_thread.join()
+        if profile not in RECORDING_PROFILES:
+            raise ValueError(f"Recording profile {profile} not found.")
+        return (
+            RECORDING_PROFILES[profile]["format"],
+            dict(RECORDING_PROFILES[profile]["options"]),
+        )
+
+    def _wait(self, process: subprocess.Popen) -> None:
+        """Display a clock until FFmpeg ends or the recording is interrupted."""
+        self.stop_timer = False
 
+        # Start the moving timer in a different thread
+        timer_thread = threading.Thread(target=self.display_clock)
+        timer_thread.start()
+
+        try:
+            # Block until FFmpeg exits, instead of polling it
+            process.wait()
+
+        except KeyboardInterrupt:
+            # FFmpeg got the interrupt too, let it finalize the output
             try:
                 process.wait(timeout=5)
             except subprocess.TimeoutExpired:
-                os.killpg(os.getpgid(process.pid), signal.SIGTERM)
+                process.terminate()
                 process.wait()
 
+        finally:
+            self.stop_timer = True
+            timer_thread.join()
+
+    def record(
+        self,
+        output_filename: str,
+        output_format: str = DEFAULT_AUDIO_FORMAT,
+        profile: str = None,
+    ) -> str:
+        """Record to a file, returning its filename with the extension."""
+        import ffmpeg
+
+        # Add the extension to the output filename
+        output_format, file_options = self._output_options(output_format, profile)
+        output_filename = f"{output_filename}.{output_format}"
+        try:
+            stream = (
+                self._input()
+                .output(output_filename, format=output_format, **file_options)
+                .overwrite_output()
+                .global_args("-hide_banner", "-loglevel", "error")
+            )
+
+            # Start the process and wait for it to finish or be interrupted
+            self._wait(ffmpeg.run_async(stream, pipe_stdin=True))
+
             print(f"\n Recording has been saved in: {output_filename}")
+            return output_filename
 
         except Exception as e:
             print(e)
             raise
 
+    def record_segments(
+        self,
+        output_prefix: str,
+        output_format: str = DEFAULT_AUDIO_FORMAT,
+        segment_seconds: float = DEFAULT_SEGMENT_SECONDS,
+        on_segment: typing.Callable[[dict], None] = None,
+        profile: str = None,
+    ) -> typing.List[dict]:
+        """Record into files rotated every segment_seconds.
+
+        Each closed segment is appended to the {output_prefix}.segments.csv
+        manifest and passed to on_segment as a dict with its filename and its
+        start and end times in the recording, as soon as FFmpeg closes it.
+        Returns the list of segments.
+        """
+        import ffmpeg
+
+        directory = os.path.dirname(output_prefix)
+        output_format, file_options = self._output_options(output_format, profile)
+        stream = (
+            self._input()
+            .output(
+                f"{output_prefix}_%05d.{output_format}",
+                f="segment",
+                segment_time=segment_seconds,
+                segment_format=output_format,
+                reset_timestamps=1,
+                # FFmpeg writes a line here whenever it closes a segment
+                segment_list="pipe:1",
+                segment_list_type="csv",
+                **file_options,
+            )
+            .overwrite_output()
+            .global_args("-hide_banner", "-loglevel", "error")
+        )
+        process = ffmpeg.run_async(stream, pipe_stdin=True, pipe_stdout=True)
+
+        segments = []
+
+        def _read_segment_list() -> None:
+            with open(f"{output_prefix}.segments.csv", "w", newline="") as f:
+                writer = csv.writer(f)
+                for line in process.stdout:
+                    filename, start, end = next(csv.reader([line.decode()]))
+                    segment = {
+                        "filename": os.path.join(directory, filename),
+                        "start": float(start),
+                        "end": float(end),
+                    }
+                    writer.writerow([segment["filename"], start, end])
+                    f.flush()
+                    segments.append(segment)
+                    if on_segment is not None:
+                        on_segment(segment)
+
+        reader_thread = threading.Thread(target=_read_segment_list)
+        reader_thread.start()
+        self._wait(process)
+        reader_thread.join()
+
+        print(f"\n Recording has been saved in {len(segments)} segments.")
+        return segments
+
+    def stream(
+        self,
+        output_filename: str,
+        output_format: str = DEFAULT_AUDIO_FORMAT,
+        window_seconds: float = DEFAULT_WINDOW_SECONDS,
+        step_seconds: float = None,
+        buffer_seconds: float = DEFAULT_BUFFER_SECONDS,
+        profile: str = None,
+    ) -> typing.Iterator[tuple]:
+        """Record to a file while yielding (start time, samples) audio windows.
+
+        FFmpeg writes the file and, in parallel, pipes 16 kHz mono PCM into a
+        ring buffer, so the windows can be transcribed while recording. The
+        last window may be shorter. Call stop() to end the recording. A reader
+        falling more than buffer_seconds behind gets an IndexError.
+        """
+        import ffmpeg
+        import numpy as np
+
+        step_seconds = step_seconds or window_seconds
+        window = int(window_seconds * DEFAULT_SAMPLE_RATE)
+        step = int(step_seconds * DEFAULT_SAMPLE_RATE)
+        buffer = RingBuffer(max(int(buffer_seconds * DEFAULT_SAMPLE_RATE), window))
+
+        audio = self._input()
+        output_format, file_options = self._output_options(output_format, profile)
+        stream = ffmpeg.merge_outputs(
+            audio.output(
+                f"{output_filename}.{output_format}",
+                format=output_format,
+                **file_options,
+            ),
+            audio.output(
+                "pipe:1",
+                format="s16le",
+                acodec="pcm_s16le",
+                ac=1,
+                ar=DEFAULT_SAMPLE_RATE,
+            ),
+        ).overwrite_output()
+
+        # Stderr is not piped, since a pipe nobody reads would block FFmpeg
+        stream = stream.global_args("-hide_banner", "-loglevel", "error")
+        self.process = ffmpeg.run_async(stream, pipe_stdin=True, pipe_stdout=True)
+
+        def _read_pcm() -> None:
+            # Chunks hold whole 16-bit samples, since the chunk size is even
+            for chunk in iter(lambda: self.process.stdout.read(PCM_CHUNK_BYTES), b""):
+                samples = np.frombuffer(chunk, dtype=np.int16)
+                buffer.write(samples.astype(np.float32) / 32768.0)
+            buffer.close()
+
+        reader_thread = threading.Thread(target=_read_pcm, daemon=True)
+        reader_thread.start()
+
+        try:
+            start = 0
+            while True:
+                written = buffer.wait_for(start + window)
+                end = min(start + window, written)
+                if end <= start:
+                    break
+                yield start / DEFAULT_SAMPLE_RATE, buffer.read(start, end)
+                if end < start + window:
+                    break
+                start += step
+        finally:
+            self.stop()
+            reader_thread.join()
+
+    def stop(self) -> None:
+        """Stop a streaming recording, letting FFmpeg finalize the file."""
+        if self.process is None or self.process.poll() is not None:
+            return
+
+        try:
+            self.process.stdin.write(b"q")
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (BrokenPipeError, subprocess.TimeoutExpired):
+            self.process.terminate()
+            self.process.wait()
+
+
+def read_segment_list(filename: str) -> typing.List[dict]:
+    """Read the segments of a segmented recording from its manifest."""
+    with open(filename, "r", newline="") as f:
+        return [
+            {"filename": name, "start": float(start), "end": float(end)}
+            for name, start, end in csv.reader(f)
+        ]
+
 
 if __name__ == "__main__":
     FfmpgRecorder().record(output_filename="test", output_format="mp3")
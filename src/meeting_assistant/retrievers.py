@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""Module defining the context retriever classes and methods."""
+
+__author__ = "Mauricio Vanzulli"
+__email__ = "mcvanzulli@gmail.com"
+
+# Built-in modules
+import re
+import math
+import typing
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict
+
+# Local modules
+from . import transcriptions
+
+# Global variables
+from .gpt_wrapper import DEFAULT_GPT_ENCODER
+
+DEFAULT_WINDOW_TOKENS = 300
+DEFAULT_TOP_K = 4
+DEFAULT_BM25_K1 = 1.5
+DEFAULT_BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def _tokenize(text: str) -> typing.List[str]:
+    """Split a text into lowercase word terms."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _format_time(seconds: float) -> str:
+    """Format a time in seconds as hh:mm:ss."""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+class AbstractRetriever(ABC):
+    """Abstract base class for a context retriever."""
+
+    @abstractmethod
+    def search(self, query: str, top_k: int) -> typing.List[dict]:
+        """Get the windows of the transcription most relevant to the query."""
+        pass
+
+    def get_context(self, query: str, top_k: int = DEFAULT_TOP_K) -> str:
+        """Get the relevant windows as a timestamped context, in chronological order."""
+        windows = sorted(self.search(query, top_k), key=lambda w: w["start"])
+        return "\n".join(
+            f"[{_format_time(w['start'])} - {_format_time(w['end'])}] {w['text']}"
+            for w in windows
+        )
+
+
+class BM25Retriever(AbstractRetriever):
+    """Retriever that ranks token-budgeted transcription windows with BM25."""
+
+    def __init__(
+        self,
+        transcription: transcriptions.Transcription,
+        max_tokens: int = DEFAULT_WINDOW_TOKENS,
+        encoder: str = DEFAULT_GPT_ENCODER,
+        count_tokens: typing.Callable[[str], int] = None,
+        k1: float = DEFAULT_BM25_K1,
+        b: float = DEFAULT_BM25_B,
+    ):
+        if count_tokens is None:
+            import tiktoken
+
+            tokenizer = tiktoken.get_encoding(encoder)
+            count_tokens = lambda text: len(tokenizer.encode(text))
+
+        self.max_tokens = max_tokens
+        self.k1 = k1
+        self.b = b
+        self.windows = self._build_windows(transcription, count_tokens)
+        self._build_index()
+
+    def _build_windows(
+        self,
+        transcription: transcriptions.Transcription,
+        count_tokens: typing.Callable[[str], int],
+    ) -> typing.List[dict]:
+        """Group consecutive segments into windows of at most max_tokens tokens."""
+        windows = []
+        current, current_tokens = [], 0
+        for segment in transcription.transcriptions:
+            segment_tokens = count_tokens(segment["text"])
+            if current and current_tokens + segment_tokens > self.max_tokens:
+                windows.append(self._merge_segments(current))
+                current, current_tokens = [], 0
+            current.append(segment)
+            current_tokens += segment_tokens
+
+        if current:
+            windows.append(self._merge_segments(current))
+
+        return windows
+
+    @staticmethod
+    def _merge_segments(segments: typing.List[dict]) -> dict:
+        """Merge consecutive segments into a single window."""
+        return {
+            "start": segments[0]["start"],
+            "end": segments[-1]["end"],
+            "text": " ".join(segment["text"].strip() for segment in segments),
+        }
+
+    def _build_index(self) -> None:
+        """Build the inverted index and the term statistics of the windows."""
+        self.postings = defaultdict(list)
+        self.lengths = []
+        for index, window in enumerate(self.windows):
+            terms = Counter(_tokenize(window["text"]))
+            self.lengths.append(sum(terms.values()))
+            for term, frequency in terms.items():
+                self.postings[term].append((index, frequency))
+
+        num_windows = len(self.windows)
+        self.average_length = sum(self.lengths) / num_windows if num_windows else 0.0
+        self.idf = {
+            term: math.log(1 + (num_windows - len(p) + 0.5) / (len(p) + 0.5))
+            for term, p in self.postings.items()
+        }
+
+    def score(self, query: str) -> typing.List[float]:
+        """Get the BM25 score of every window for the query."""
+        scores = [0.0] * len(self.windows)
+        for term in set(_tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for index, frequency in self.postings[term]:
+                norm = 1 - self.b + self.b * self.lengths[index] / self.average_length
+                scores[index] += (
+                    idf * frequency * (self.k1 + 1) / (frequency + self.k1 * norm)
+                )
+        return scores
+
+    def search(self, query: str, top_k: int = DEFAULT_TOP_K) -> typing.List[dict]:
+        """Get the top_k windows ranked by BM25 score."""
+        scores = self.score(query)
+        ranking = sorted(range(len(self.windows)), key=lambda i: (-scores[i], i))
+        return [dict(self.windows[i], score=scores[i]) for i in ranking[:top_k]]
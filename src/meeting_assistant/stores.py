@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""Module defining the meeting store class and methods."""
+
+__author__ = "Mauricio Vanzulli"
+__email__ = "mcvanzulli@gmail.com"
+
+# Built-in modules
+import re
+import json
+import typing
+import sqlite3
+from datetime import date
+
+# Local modules
+from . import meetings
+from . import transcriptions
+
+# Global variables
+DEFAULT_STORE_PATH = "meetings.sqlite3"
+DEFAULT_SEARCH_LIMIT = 10
+DEFAULT_SNIPPET_TOKENS = 12
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meetings (
+    id INTEGER PRIMARY KEY,
+    audio_filename TEXT,
+    date TEXT,
+    participants TEXT,
+    language TEXT,
+    summary TEXT,
+    keywords TEXT
+);
+
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    meeting_id INTEGER NOT NULL REFERENCES meetings(id) ON DELETE CASCADE,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    text TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS segments_meeting_id ON segments(meeting_id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+    text, content='segments', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS segments_insert AFTER INSERT ON segments BEGIN
+    INSERT INTO segments_fts(rowid, text) VALUES (new.id, new.text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS segments_delete AFTER DELETE ON segments BEGIN
+    INSERT INTO segments_fts(segments_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+
+class MeetingStore:
+    """Class persisting meetings to SQLite with a full-text index over segments."""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self) -> "MeetingStore":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the connection to the database."""
+        self.connection.close()
+
+    def _insert(self, meeting) -> int:
+        """Insert a meeting and its segments, without committing."""
+        transcription = getattr(meeting, "transcription", None)
+        cursor = self.connection.execute(
+            "INSERT INTO meetings"
+            " (audio_filename, date, participants, language, summary, keywords)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                meeting.audio_filename,
+                meeting.date.isoformat(),
+                json.dumps(meeting.participant_names),
+                transcription.language if transcription else None,
+                getattr(meeting, "summary", None),
+                json.dumps(getattr(meeting, "extracted_keywords", None)),
+            ),
+        )
+        meeting_id = cursor.lastrowid
+
+        if transcription:
+            self.connection.executemany(
+                "INSERT INTO segments (meeting_id, start, end, text) VALUES (?, ?, ?, ?)",
+                (
+                    (meeting_id, s["start"], s["end"], s["text"])
+                    for s in transcription.transcriptions
+                ),
+            )
+
+        return meeting_id
+
+    def add(self, meeting) -> int:
+        """Persist a meeting, returning its id in the store."""
+        return self.add_many([meeting])[0]
+
+    def add_many(self, meetings: typing.Iterable) -> typing.List[int]:
+        """Persist several meetings in a single transaction, returning their ids."""
+        with self.connection:
+            return [self._insert(meeting) for meeting in meetings]
+
+    def delete(self, meeting_id: int) -> None:
+        """Remove a meeting and its segments from the store."""
+        with self.connection:
+            self.connection.execute("DELETE FROM meetings WHERE id = ?", (meeting_id,))
+
+    def get_metadata(self, meeting_id: int) -> dict:
+        """Get the metadata, summary and keywords of a stored meeting."""
+        row = self.connection.execute(
+            "SELECT audio_filename, date, participants, language, summary, keywords"
+            " FROM meetings WHERE id = ?",
+            (meeting_id,),
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"Meeting {meeting_id} not found.")
+
+        audio_filename, meeting_date, participants, language, summary, keywords = row
+        return {
+            "id": meeting_id,
+            "audio_filename": audio_filename,
+            "date": meeting_date,
+            "participant_names": json.loads(participants),
+            "language": language,
+            "summary": summary,
+            "keywords": json.loads(keywords),
+        }
+
+    def get_transcription(self, meeting_id: int) -> transcriptions.Transcription:
+        """Get the transcription of a stored meeting."""
+        language = self.get_metadata(meeting_id)["language"]
+        transcription = transcriptions.Transcription(language)
+        for start, end, text in self.connection.execute(
+            "SELECT start, end, text FROM segments WHERE meeting_id = ? ORDER BY id",
+            (meeting_id,),
+        ):
+            transcription.add_transcription(start, end, text)
+
+        return transcription
+
+    def get_meeting(self, meeting_id: int, **kwargs) -> meetings.Meeting:
+        """Get a stored meeting with its transcription attached.
+
+        Keyword arguments, e.g. shared components, are forwarded to Meeting.
+        """
+        metadata = self.get_metadata(meeting_id)
+        meeting = meetings.Meeting(
+            metadata["audio_filename"],
+            participant_names=metadata["participant_names"],
+            dt=date.fromisoformat(metadata["date"]),
+            transcription=self.get_transcription(meeting_id),
+            **kwargs,
+        )
+        if metadata["summary"] is not None:
+            meeting.summary = metadata["summary"]
+        if metadata["keywords"] is not None:
+            meeting.extracted_keywords = metadata["keywords"]
+
+        return meeting
+
+    def search(
+        self, query: str, limit: int = DEFAULT_SEARCH_LIMIT
+    ) -> typing.List[tuple[int, float, str]]:
+        """Search the segments of all meetings, best match first.
+
+        Returns (meeting id, segment start time, snippet) tuples, where the
+        snippet highlights the matched words between brackets.
+        """
+        # Quote every word so that user input is never parsed as FTS syntax
+        terms = " ".join(f'"{term}"' for term in TOKEN_PATTERN.findall(query))
+        if not terms:
+            return []
+
+        return self.connection.execute(
+            "SELECT segments.meeting_id, segments.start,"
+            " snippet(segments_fts, 0, '[', ']', '...', ?)"
+            " FROM segments_fts JOIN segments ON segments.id = segments_fts.rowid"
+            " WHERE segments_fts MATCH ? ORDER BY rank LIMIT ?",
+            (DEFAULT_SNIPPET_TOKENS, terms, limit),
+        ).fetchall()
@@ -9,13 +9,8 @@ __email__ = "mcvanzulli@gmail.com"
 # Built-in modules
 from abc import ABC, abstractmethod
 
-# Third-party libraries
-import tiktoken
-import yaml
-import os
-from pkg_resources import resource_string
-
 # Local modules
+from . import configs
 from . import gpt_wrapper
 
 # Global variables
@@ -23,9 +18,12 @@ from .gpt_wrapper import DEFAULT_GPT_MODEL, DEFAULT_GPT_ENCODER, DEFAULT_MAX_TOK
 
 DEFAULT_TEMPERATURE_SUMMARIZER = 0.75
 
-# Read the language roles from the config file
-json_data = resource_string(__name__, "config/summarizer_roles.yaml")
-summarizer_roles = yaml.safe_load(json_data)
+
+def __getattr__(name: str):
+    # Read the language roles from the config file on first access
+    if name == "summarizer_roles":
+        return configs.load_config("summarizer_roles")
+    raise AttributeError(f"module {__name__} has no attribute {name}")
 
 
 class AbstractSummarizer(ABC):
@@ -55,6 +53,8 @@ class GPTSummarizer(AbstractSummarizer):
     def summarize(self, text: str, language: str) -> str:
         """Generate a summary of the given text using GPT model."""
 
+        import tiktoken
+
         # Encode the text into tokens using the GPT-3 tokenizer
         tokenizer = tiktoken.get_encoding(self.encoder)
         tokens = tokenizer.encode(text)
@@ -71,6 +71,7 @@ class GPTSummarizer(AbstractSummarizer):
             tokens = tokens[self.max_tokens :]
 
         # Call OpenAI's GPT for each chunk and concatenate the results
+        summarizer_roles = configs.load_config("summarizer_roles")
         summary_text = ""
         for chunk in chunks:
             summary_text += gpt_wrapper.call_gpt(
@@ -8,18 +8,42 @@ __email__ = "mcvanzulli@gmail.com"
 
 # Built-in modules
 import os
+import typing
+import hashlib
 from abc import ABC, abstractmethod
 
-# Third-party libraries
-import torch
-import whisper
-
 # Local modules
+from . import instruments
 from . import transcriptions
 
 # Global variables
 DEFAULT_TEMPERATURE_TRANSCRIBER = 0.1
 DEFAULT_MODEL_SIZE_TRANSCRIBER = "small"
+DEFAULT_FINGERPRINT_SECONDS = 30.0
+DEFAULT_OVERLAP_SECONDS = 5.0
+SAMPLE_RATE = 16000  # Whisper decodes every audio to 16 kHz mono
+
+
+def load_audio(audio_filename: str):
+    """Decode an audio file to the 16 kHz mono samples Whisper works with."""
+    from whisper.audio import load_audio as whisper_load_audio
+
+    with instruments.timed("decode"):
+        return whisper_load_audio(audio_filename, sr=SAMPLE_RATE)
+
+
+def fingerprint_audio(
+    samples, chunk_seconds: float = DEFAULT_FINGERPRINT_SECONDS
+) -> typing.List[str]:
+    """Hash decoded audio in fixed chunks, the last one possibly shorter.
+
+    Two recordings share their first n chunks when the first n hashes match.
+    """
+    chunk = int(chunk_seconds * SAMPLE_RATE)
+    return [
+        hashlib.sha1(samples[start : start + chunk].tobytes()).hexdigest()
+        for start in range(0, len(samples), chunk)
+    ]
 
 
 class AbstractTranscriber(ABC):
@@ -30,6 +54,19 @@ class AbstractTranscriber(ABC):
         """Transcribe the audio from a file."""
         pass
 
+    def transcribe_incremental(
+        self,
+        filename: str,
+        previous: transcriptions.Transcription = None,
+        previous_fingerprint: typing.List[str] = None,
+    ) -> tuple:
+        """Transcribe a file that may extend a previously transcribed version.
+
+        Returns the transcription and a fingerprint of the audio to pass with
+        it next time. By default the whole file is transcribed again.
+        """
+        return self.transcribe(filename), None
+
 
 class WhisperTranscriber(AbstractTranscriber):
     """Transcriber that uses whisper model."""
@@ -39,6 +76,10 @@ class WhisperTranscriber(AbstractTranscriber):
         model_size: str = DEFAULT_MODEL_SIZE_TRANSCRIBER,
         temperature: float = DEFAULT_TEMPERATURE_TRANSCRIBER,
     ):
+        # Imported on first use, since loading them takes seconds
+        import torch
+        import whisper
+
         self.device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
         self.temperature = temperature
         self.model = whisper.load_model(model_size, device=self.device)
@@ -51,23 +92,126 @@ class WhisperTranscriber(AbstractTranscriber):
             raise FileNotFoundError(f"Audio file {audio_filename} not found.")
 
         # Call whisper
-        result = self.model.transcribe(
-            audio_filename,
-            verbose=False,
-            fp16=False,
-            task="transcribe",
-            temperature=self.temperature,
-        )
+        samples = load_audio(audio_filename)
+        with instruments.timed(
+            "transcription", audio_seconds=len(samples) / SAMPLE_RATE
+        ):
+            result = self.model.transcribe(
+                samples,
+                verbose=False,
+                fp16=False,
+                task="transcribe",
+                temperature=self.temperature,
+            )
 
         # Retrieve transcription
         transcription = transcriptions.Transcription()
         transcription.set_language(result["language"])
+        self._add_segments(transcription, result)
 
+        return transcription
+
+    def _add_segments(
+        self,
+        transcription: transcriptions.Transcription,
+        result: dict,
+        offset: float = 0.0,
+    ) -> None:
+        """Add the segments of a whisper result starting at an offset."""
         for segment in result["segments"]:
             transcription.add_transcription(
-                start=segment["start"],
-                end=segment["end"],
+                start=offset + segment["start"],
+                end=offset + segment["end"],
                 text=segment["text"],
             )
 
-        return transcription
+    def transcribe_incremental(
+        self,
+        audio_filename: str,
+        previous: transcriptions.Transcription = None,
+        previous_fingerprint: typing.List[str] = None,
+        overlap_seconds: float = DEFAULT_OVERLAP_SECONDS,
+    ) -> tuple:
+        """Transcribe a file that may extend a previously transcribed version.
+
+        The previous segments are kept up to where both versions of the audio
+        are identical, minus an overlap, and only the rest of the file is
+        transcribed. Returns the transcription and the fingerprint of the
+        audio to pass with it next time.
+        """
+        if not os.path.isfile(audio_filename):
+            raise FileNotFoundError(f"Audio file {audio_filename} not found.")
+
+        samples = load_audio(audio_filename)
+        fingerprint = fingerprint_audio(samples)
+
+        shared = 0
+        if previous is not None and previous_fingerprint is not None:
+            if fingerprint == previous_fingerprint:
+                return previous, fingerprint
+            for old_chunk, new_chunk in zip(previous_fingerprint, fingerprint):
+                if old_chunk != new_chunk:
+                    break
+                shared += 1
+
+        # Keep the segments ending before the overlap, and restart right after
+        # the last one so no segment is cut or repeated
+        boundary = shared * DEFAULT_FINGERPRINT_SECONDS - overlap_seconds
+        transcription = transcriptions.Transcription(
+            previous.language if shared else None
+        )
+        for segment in previous.transcriptions if shared else []:
+            if segment["end"] > boundary:
+                break
+            transcription.add_transcription(
+                segment["start"], segment["end"], segment["text"]
+            )
+        kept = transcription.transcriptions
+        start = kept[-1]["end"] if kept else 0.0
+
+        tail = samples[int(start * SAMPLE_RATE) :]
+        with instruments.timed("transcription", audio_seconds=len(tail) / SAMPLE_RATE):
+            result = self.model.transcribe(
+                tail,
+                verbose=False,
+                fp16=False,
+                task="transcribe",
+                temperature=self.temperature,
+                language=transcription.language,
+                # Give the text before the tail as context
+                initial_prompt=kept[-1]["text"] if kept else None,
+            )
+        transcription.set_language(transcription.language or result["language"])
+        self._add_segments(transcription, result, offset=start)
+
+        return transcription, fingerprint
+
+    def transcribe_stream(
+        self, windows: typing.Iterable[tuple], language: str = None
+    ) -> typing.Iterator[dict]:
+        """Transcribe (start time, samples) audio windows as they arrive.
+
+        Yields the segments of each window with times relative to the start of
+        the stream. The language detected on the first window is kept for the
+        following ones, unless a language is given.
+        """
+        for start, samples in windows:
+            audio_seconds = len(samples) / SAMPLE_RATE
+            with instruments.timed("transcription", audio_seconds=audio_seconds):
+                result = self.model.transcribe(
+                    samples,
+                    verbose=None,
+                    fp16=False,
+                    task="transcribe",
+                    temperature=self.temperature,
+                    language=language,
+                )
+            language = language or result["language"]
+
+            for segment in result["segments"]:
+                yield {
+                    "start": start + segment["start"],
+                    "end": start + segment["end"],
+                    "text": segment["text"],
+                    "language": language,
+                }
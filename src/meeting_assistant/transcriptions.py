@@ -72,3 +72,23 @@ class Transcription:
             if word.lower() in transcription["text"].lower():
                 times.append((transcription["start"], transcription["end"]))
         return times
+
+    def extend(self, other: "Transcription", offset: float = 0.0) -> None:
+        for transcription in other.transcriptions:
+            self.add_transcription(
+                transcription["start"] + offset,
+                transcription["end"] + offset,
+                transcription["text"],
+            )
+
+    def to_dict(self) -> dict:
+        return {"language": self.language, "transcriptions": self.transcriptions}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Transcription":
+        transcription = cls(data["language"])
+        for segment in data["transcriptions"]:
+            transcription.add_transcription(
+                segment["start"], segment["end"], segment["text"]
+            )
+        return transcription
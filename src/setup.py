@@ -4,6 +4,7 @@ setup(
     name="meeting_assistant",
     version="0.1",
     packages=find_packages(),
+    package_data={"meeting_assistant": ["config/*.yaml"]},
     install_requires=[
         "openai",
         "torch",
@@ -18,6 +19,9 @@ setup(
         "setuptools",
         "pytest",
     ],
+    entry_points={
+        "console_scripts": ["meeting-assistant=meeting_assistant.cli:main"],
+    },
     author="Mauricio Vanzulli",
     author_email="mcvanzulli@gmail.com",
     description="A package to interact with meetings",
@@ -1,5 +1,9 @@
 from meeting_assistant.bots import GPTQABot
-from meeting_assistant.bots import bot_roles, DEFAULT_BOT_TEMPERATURE
+from meeting_assistant.bots import (
+    bot_roles,
+    DEFAULT_BOT_TEMPERATURE,
+    DEFAULT_DETECTION_SAMPLE,
+)
 from langdetect import detect
 
 
@@ -20,3 +24,50 @@ def test_bot_answer():
     answer = bot.answer(question, context)
 
     assert detect(answer) == "es"
+
+
+class FakeTranslator:
+    calls = 0
+
+    def translate(self, text, dest):
+        FakeTranslator.calls += 1
+        return type("Translated", (), {"text": f"{dest}: {text}"})
+
+
+def test_bot_memoizes_language_and_translation(monkeypatch):
+    detected = []
+
+    def fake_detect(text):
+        detected.append(text)
+        return "es" if text.startswith("En") else "en"
+
+    monkeypatch.setattr("meeting_assistant.bots.detect", fake_detect)
+    monkeypatch.setattr("meeting_assistant.bots.get_translator", FakeTranslator)
+    monkeypatch.setattr(
+        "meeting_assistant.gpt_wrapper.call_gpt", lambda context, *args: context
+    )
+
+    bot = GPTQABot()
+    context = "The team agreed on a performance assessment. " * 100
+    for _ in range(3):
+        answer = bot.answer("En que se pusieron de acuerdo?", context)
+
+    assert answer.startswith("es: The team")
+    assert FakeTranslator.calls == 1
+    # The context is detected once, from a bounded prefix
+    context_samples = [text for text in detected if not text.startswith("En")]
+    assert len(context_samples) == 1
+    assert len(context_samples[0]) == DEFAULT_DETECTION_SAMPLE
+
+
+def test_bot_reuses_known_context_language(monkeypatch):
+    monkeypatch.setattr("meeting_assistant.bots.detect", lambda text: "en")
+    monkeypatch.setattr(
+        "meeting_assistant.gpt_wrapper.call_gpt", lambda context, *args: context
+    )
+
+    bot = GPTQABot()
+    answer = bot.answer("What is next?", "Next is testing", context_language="en")
+
+    assert answer == "Next is testing"
+    assert bot.context_languages == {}
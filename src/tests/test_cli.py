@@ -0,0 +1,70 @@
+import json
+import ffmpeg
+from meeting_assistant import cli
+from meeting_assistant import meetings
+from meeting_assistant.summarizers import AbstractSummarizer
+from meeting_assistant.transcribers import AbstractTranscriber
+from meeting_assistant.transcriptions import Transcription
+
+
+class FakeTranscriber(AbstractTranscriber):
+    def __init__(self):
+        self.calls = 0
+
+    def transcribe(self, audio_file_path: str) -> Transcription:
+        self.calls += 1
+        t = Transcription("en")
+        t.add_transcription(0.0, 1.0, "We migrate the database")
+        return t
+
+
+class FakeSummarizer(AbstractSummarizer):
+    def summarize(self, text: str, language: str) -> str:
+        return f"{language}: {text}"
+
+
+def test_batch_skips_recordings_in_manifest(tmp_path, capsys):
+    (tmp_path / "monday.mp3").write_bytes(b"audio")
+    (tmp_path / "notes.txt").write_text("not a recording")
+    manifest = {
+        "monday.mp3": {"fingerprint": cli._fingerprint(str(tmp_path / "monday.mp3"))}
+    }
+    (tmp_path / cli.MANIFEST_FILENAME).write_text(json.dumps(manifest))
+
+    assert cli.main(["batch", str(tmp_path), "--workers", "2"]) == 0
+    assert "Found 1 recordings, 0 to process." in capsys.readouterr().out
+
+
+def test_discover_recordings(tmp_path):
+    (tmp_path / "team").mkdir()
+    (tmp_path / "team" / "standup.WAV").write_bytes(b"audio")
+    (tmp_path / "standup.mp3.meeting.json").write_text("{}")
+    assert cli._discover(str(tmp_path), cli.DEFAULT_AUDIO_EXTENSIONS) == [
+        "team/standup.WAV"
+    ]
+
+
+def test_process_recording(tmp_path, monkeypatch):
+    transcriber = FakeTranscriber()
+    monkeypatch.setattr(
+        cli,
+        "_worker_components",
+        {"transcriber": transcriber, "summarizer": FakeSummarizer()},
+    )
+    monkeypatch.setattr(ffmpeg, "probe", lambda _: {"format": {"duration": "1.0"}})
+    audio_filename = str(tmp_path / "monday.mp3")
+    with open(audio_filename, "wb") as f:
+        f.write(b"audio")
+
+    result = cli._process_recording(audio_filename, ["es"], "medium", "gpt-4")
+
+    meeting = meetings.Meeting.load(result["checkpoint"])
+    assert meeting.transcription_inputs["whisper_model_size"] == "medium"
+    assert meeting.gpt_model == "gpt-4"
+    assert meeting.artifacts["summaries"] == {"es": "es: We migrate the database "}
+    assert result["duration"] == 1.0
+
+    cli._process_recording(audio_filename, ["es"], "medium", "gpt-4")
+    assert transcriber.calls == 1, "The checkpoint should be resumed"
+    cli._process_recording(audio_filename, ["es"], "small", "gpt-4")
+    assert transcriber.calls == 2, "Another Whisper model should transcribe again"
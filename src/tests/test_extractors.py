@@ -0,0 +1,30 @@
+import pytest
+from meeting_assistant.extractors import TfidfKeywordExtractor
+from meeting_assistant.transcriptions import Transcription
+
+
+@pytest.fixture()
+def transcription():
+    t = Transcription("en")
+    t.add_transcription(0.0, 5.0, "We need to migrate the database")
+    t.add_transcription(5.0, 10.0, "The database migration is planned for Friday")
+    t.add_transcription(10.0, 15.0, "Then we deploy the frontend")
+    return t
+
+
+def test_extract_ranks_repeated_terms_first(transcription: Transcription):
+    keywords = TfidfKeywordExtractor().extract(transcription, num_keywords=3)
+    assert len(keywords) == 3
+    assert list(keywords)[0] == "database"
+    assert keywords["database"] == [(0.0, 5.0), (5.0, 10.0)]
+
+
+def test_extract_ignores_stopwords(transcription: Transcription):
+    keywords = TfidfKeywordExtractor().extract(transcription, num_keywords=20)
+    assert "the" not in keywords
+    assert "need" not in keywords
+    assert "frontend" in keywords
+
+
+def test_extract_empty_transcription():
+    assert TfidfKeywordExtractor().extract(Transcription("en")) == {}
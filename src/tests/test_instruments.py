@@ -0,0 +1,25 @@
+import pytest
+from meeting_assistant import instruments
+
+
+def test_timed_reports_to_observers():
+    stages = []
+    observer = lambda stage, seconds, labels: stages.append((stage, seconds, labels))
+    instruments.add_observer(observer)
+    try:
+        with instruments.timed("transcription") as labels:
+            labels["audio_seconds"] = 30.0
+        with pytest.raises(ValueError):
+            with instruments.timed("gpt_call", model="gpt-3.5-turbo"):
+                raise ValueError("Bad request")
+    finally:
+        instruments.remove_observer(observer)
+
+    with instruments.timed("pipeline"):
+        pass
+
+    assert [(stage, labels) for stage, _, labels in stages] == [
+        ("transcription", {"audio_seconds": 30.0}),
+        ("gpt_call", {"model": "gpt-3.5-turbo", "error": "ValueError"}),
+    ]
+    assert all(seconds >= 0 for _, seconds, _ in stages)
@@ -1,5 +1,14 @@
+import json
+import time
+import threading
 import pytest
 from meeting_assistant import Meeting
+from meeting_assistant import bots
+from meeting_assistant.bots import DEFAULT_BOT_TEMPERATURE
+from meeting_assistant.retrievers import BM25Retriever
+from meeting_assistant.summarizers import AbstractSummarizer
+from meeting_assistant.transcribers import AbstractTranscriber
+from meeting_assistant.transcriptions import Transcription
 
 test_filename = "./../audios/foo.mp3"
 
@@ -30,6 +39,14 @@ def test_answer(meet: Meeting):
     assert isinstance(answer, str), "Answer should not be None"
 
 
+def test_answer_many(meet: Meeting):
+    questions = ["What is the next step?", "Who attended the meeting?"]
+    answers = meet.answer_many(questions)
+    assert [a["question"] for a in answers] == questions, "Answers should keep order"
+    assert all(isinstance(a["answer"], str) for a in answers)
+    assert all(a["time"] > 0 for a in answers), "Each answer should be timed"
+
+
 def test_has_a_transcription(meet: Meeting):
     meet.transcribe()  # make sure a transcription occurs for this test
     assert meet._has_a_transcription() == True, "Transcription should exist."
@@ -43,3 +60,154 @@ def test_look_up_word(meet: Meeting):
 def test_look_up_time(meet: Meeting):
     time_words = meet.look_up_time(0.1)
     assert isinstance(time_words, str), "look_up_time should return a string."
+
+
+def test_keywords(meet: Meeting):
+    keywords = meet.keywords(method="tfidf")
+    assert isinstance(keywords, dict), "Local keywords should map to their times"
+    assert meet.keywords(method="gpt") == meet.extracted_keywords
+
+
+class FakeBot:
+    def __init__(self, gpt_model: str, temperature: float):
+        self.model = gpt_model
+        self.temperature = temperature
+        self.calls = []
+
+    def answer(self, question: str, context, context_language: str = None) -> str:
+        self.calls.append(question)
+        return f"{self.model}: {question}"
+
+
+def test_gpt_keywords_cache(monkeypatch):
+    monkeypatch.setattr(bots, "GPTQABot", FakeBot)
+    t = Transcription("en")
+    t.add_transcription(0.0, 1.0, "We migrate the database")
+    meeting = Meeting(transcription=t, gpt_model="gpt-4")
+
+    assert meeting.keywords(method="gpt", num_keywords=3).startswith("gpt-4: ")
+    assert meeting.keywords(method="gpt", num_keywords=3).startswith("gpt-4: ")
+    assert len(meeting.bot.calls) == 1, "Cached keywords should not be asked again"
+    key = json.loads(next(iter(meeting.artifacts["keywords"])))
+    assert key == ["gpt", 3, "gpt-4", DEFAULT_BOT_TEMPERATURE]
+
+
+class ConcurrentBot(FakeBot):
+    """Bot recording how many questions it answers at once."""
+
+    def __init__(self, gpt_model: str, temperature: float):
+        super().__init__(gpt_model, temperature)
+        self.lock = threading.Lock()
+        self.running = self.peak = 0
+        self.pairs = threading.Barrier(2, timeout=5)
+        self.contexts = []
+
+    def answer(self, question: str, context, context_language: str = None) -> str:
+        # Retrieve the context of the question, as GPTQABot does
+        context = context.get_context(question)
+        with self.lock:
+            self.contexts.append(context)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        # Every question waits for another one, then the first ones finish last
+        self.pairs.wait()
+        time.sleep(0.05 if question.endswith("0") else 0.01)
+        with self.lock:
+            self.running -= 1
+        return super().answer(question, context, context_language)
+
+
+def test_answer_many_offline(monkeypatch):
+    monkeypatch.setattr(bots, "GPTQABot", ConcurrentBot)
+    t = Transcription("en")
+    t.add_transcription(0.0, 1.0, "We migrate the database")
+    meeting = Meeting(transcription=t)
+    # Words stand for tokens, so that no tokenizer is downloaded
+    meeting.retriever = BM25Retriever(t, count_tokens=lambda text: len(text.split()))
+    questions = [f"Which database do we migrate? {i}" for i in range(6)]
+
+    answers = meeting.answer_many(questions, gpt_model="gpt-4", max_concurrent=2)
+
+    assert [a["question"] for a in answers] == questions, "Answers should keep order"
+    assert [a["answer"] for a in answers] == [f"gpt-4: {q}" for q in questions]
+    assert meeting.bot.peak == 2, "Questions should overlap up to max_concurrent"
+    assert meeting.bot.contexts == ["[00:00:00 - 00:00:01] We migrate the database"] * 6
+
+
+def test_lazy_components():
+    t = Transcription("en")
+    t.add_transcription(0.0, 1.0, "Hello there")
+    meeting = Meeting(transcription=t)
+    assert meeting._transcriber is None, "Whisper should not load on construction"
+    assert meeting._summarizer is None, "Summarizer should be built on first use"
+    assert meeting.look_up_time(0.5) == "Hello there"
+
+
+class CountingSummarizer(AbstractSummarizer):
+    def __init__(self):
+        self.calls = 0
+
+    def summarize(self, text: str, language: str) -> str:
+        self.calls += 1
+        return f"{language}: {text}"
+
+
+def test_save_and_load(tmp_path):
+    t = Transcription("en")
+    t.add_transcription(0.0, 1.0, "We migrate the database")
+    summarizer = CountingSummarizer()
+    meeting = Meeting(transcription=t, summarizer=summarizer, gpt_model="gpt-4")
+    meeting.summarize("es")
+    meeting.keywords(method="tfidf")
+    meeting.save(str(tmp_path / "meeting.json"))
+
+    loaded = Meeting.load(str(tmp_path / "meeting.json"), summarizer=summarizer)
+    assert loaded.gpt_model == "gpt-4"
+    assert loaded.look_up_time(0.5) == "We migrate the database"
+    assert loaded.summarize("es") == "es: We migrate the database "
+    assert "database" in loaded.keywords(method="tfidf")
+    assert summarizer.calls == 1, "Unchanged inputs should not be summarized again"
+
+    loaded.gpt_model = "gpt-3.5-turbo"
+    loaded.summarize("es")
+    assert summarizer.calls == 2, "Changed inputs should be summarized again"
+
+
+def test_process():
+    t = Transcription("en")
+    t.add_transcription(0.0, 1.0, "We migrate the database")
+    meeting = Meeting(transcription=t, summarizer=CountingSummarizer())
+    results, timings = meeting.process(
+        summary_languages=["en", "es"], keywords_method="tfidf"
+    )
+    assert results["summary:es"] == "es: We migrate the database "
+    assert "database" in results["keywords"]
+    assert set(timings) == {"transcript", "summary:en", "summary:es", "keywords"}
+
+
+class FakeTranscriber(AbstractTranscriber):
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, audio_file_path: str) -> Transcription:
+        self.calls.append(audio_file_path)
+        t = Transcription("en")
+        t.add_transcription(0.0, 1.0, audio_file_path)
+        return t
+
+
+def test_transcribe_segments():
+    transcriber = FakeTranscriber()
+    segments = [
+        {"filename": "part_00000.mp3", "start": 0.0, "end": 300.0},
+        {"filename": "part_00001.mp3", "start": 300.0, "end": 450.0},
+    ]
+    meeting = Meeting(audio_segments=segments[:1], transcriber=transcriber)
+    meeting.transcribe()
+
+    meeting.audio_segments = segments
+    meeting.transcribe()
+    assert transcriber.calls == ["part_00000.mp3", "part_00001.mp3"]
+    assert meeting.audio_language == "en"
+    assert meeting.look_up_time(300.5) == "part_00001.mp3"
+    assert meeting.look_up_word("part_00000.mp3") == [(0.0, 1.0)]
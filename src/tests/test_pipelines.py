@@ -0,0 +1,59 @@
+import time
+import pytest
+from meeting_assistant.pipelines import Pipeline
+
+
+def test_run_resolves_dependencies_once():
+    calls = []
+
+    def stage(name, value):
+        def run(*args):
+            calls.append(name)
+            return value + sum(args)
+
+        return run
+
+    pipeline = Pipeline()
+    pipeline.add_stage("a", stage("a", 1))
+    pipeline.add_stage("b", stage("b", 10), ["a"])
+    pipeline.add_stage("c", stage("c", 100), ["a", "b"])
+    pipeline.add_stage("unused", stage("unused", 0))
+
+    results = pipeline.run(["c", "b"])
+    assert results == {"a": 1, "b": 11, "c": 112}
+    assert sorted(calls) == ["a", "b", "c"]
+    assert set(pipeline.timings) == {"a", "b", "c"}
+
+
+def test_run_independent_stages_concurrently():
+    pipeline = Pipeline(max_workers=2)
+    pipeline.add_stage("root", lambda: None)
+    pipeline.add_stage("left", lambda _: time.sleep(0.2), ["root"])
+    pipeline.add_stage("right", lambda _: time.sleep(0.2), ["root"])
+
+    start = time.perf_counter()
+    pipeline.run(["left", "right"])
+    assert time.perf_counter() - start < 0.35
+
+
+def test_run_raises_stage_errors():
+    def fail():
+        raise RuntimeError("boom")
+
+    pipeline = Pipeline()
+    pipeline.add_stage("fail", fail)
+    pipeline.add_stage("after", lambda _: 1, ["fail"])
+    with pytest.raises(RuntimeError):
+        pipeline.run(["after"])
+
+
+def test_invalid_graphs():
+    pipeline = Pipeline()
+    pipeline.add_stage("a", lambda _: 1, ["b"])
+    pipeline.add_stage("b", lambda _: 1, ["a"])
+    with pytest.raises(ValueError):
+        pipeline.add_stage("a", lambda: 1)
+    with pytest.raises(ValueError):
+        pipeline.run(["a"])
+    with pytest.raises(ValueError):
+        pipeline.run(["missing"])
@@ -0,0 +1,87 @@
+import os
+import shutil
+import numpy as np
+import pytest
+from meeting_assistant.recorders import (
+    FfmpgRecorder,
+    RingBuffer,
+    DEFAULT_SAMPLE_RATE,
+    read_segment_list,
+)
+
+requires_ffmpeg = pytest.mark.skipif(
+    shutil.which("ffmpeg") is None, reason="FFmpeg is not installed"
+)
+
+
+def test_ring_buffer_wraps_around():
+    buffer = RingBuffer(4)
+    buffer.write(np.array([1, 2, 3], dtype=np.float32))
+    buffer.write(np.array([4, 5], dtype=np.float32))
+    assert buffer.written == 5
+    assert buffer.read(1, 5).tolist() == [2, 3, 4, 5]
+    with pytest.raises(IndexError):
+        buffer.read(0, 2)
+
+
+def test_ring_buffer_oversized_write():
+    buffer = RingBuffer(4)
+    buffer.write(np.array([1], dtype=np.float32))
+    buffer.write(np.arange(2, 8, dtype=np.float32))
+    assert buffer.written == 7
+    assert buffer.read(3, 7).tolist() == [4, 5, 6, 7]
+    with pytest.raises(IndexError):
+        buffer.read(2, 4)
+
+
+def test_ring_buffer_wait_for_closed():
+    buffer = RingBuffer(4)
+    buffer.write(np.array([1], dtype=np.float32))
+    buffer.close()
+    assert buffer.wait_for(3) == 1
+
+
+@requires_ffmpeg
+def test_stream_sine_source(tmp_path):
+    recorder = FfmpgRecorder("sine=frequency=440:duration=3", input_format="lavfi")
+    output_filename = str(tmp_path / "sine")
+
+    windows = list(recorder.stream(output_filename, window_seconds=1.0))
+
+    assert [start for start, _ in windows] == [0.0, 1.0, 2.0]
+    assert all(len(samples) == DEFAULT_SAMPLE_RATE for _, samples in windows)
+    assert np.abs(windows[0][1]).max() > 0.05, "The sine should not be silent"
+    assert os.path.getsize(output_filename + ".mp3") > 0
+
+
+@requires_ffmpeg
+def test_record_segments_sine_source(tmp_path):
+    recorder = FfmpgRecorder("sine=frequency=440:duration=5", input_format="lavfi")
+    output_prefix = str(tmp_path / "sine")
+    closed = []
+
+    segments = recorder.record_segments(
+        output_prefix, "wav", segment_seconds=2, on_segment=closed.append
+    )
+
+    assert closed == segments
+    assert [round(s["start"]) for s in segments] == [0, 2, 4]
+    assert round(segments[-1]["end"]) == 5
+    assert all(os.path.getsize(s["filename"]) > 0 for s in segments)
+    assert read_segment_list(output_prefix + ".segments.csv") == segments
+
+
+@requires_ffmpeg
+@pytest.mark.parametrize(
+    "profile, magic", [("transcription", b"fLaC"), ("transcription-opus", b"OggS")]
+)
+def test_record_profile(tmp_path, profile, magic):
+    recorder = FfmpgRecorder("sine=frequency=440:duration=1", input_format="lavfi")
+    output_filename = recorder.record(str(tmp_path / "sine"), profile=profile)
+    with open(output_filename, "rb") as f:
+        assert f.read(4) == magic, "The profile should set the output format"
+
+
+def test_record_unknown_profile():
+    with pytest.raises(ValueError):
+        FfmpgRecorder().record("meeting", profile="unknown")
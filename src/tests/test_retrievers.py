@@ -0,0 +1,36 @@
+import pytest
+from meeting_assistant.retrievers import BM25Retriever
+from meeting_assistant.transcriptions import Transcription
+
+
+@pytest.fixture()
+def retriever():
+    t = Transcription("en")
+    t.add_transcription(0.0, 5.0, "Welcome everyone to the weekly meeting")
+    t.add_transcription(5.0, 10.0, "The budget for the next quarter is approved")
+    t.add_transcription(10.0, 15.0, "Robert will migrate the database on Friday")
+    t.add_transcription(15.0, 20.0, "The next steps are testing and deployment")
+    return BM25Retriever(t, max_tokens=8, count_tokens=lambda s: len(s.split()))
+
+
+def test_windows_respect_token_budget(retriever: BM25Retriever):
+    assert len(retriever.windows) == 4
+    assert retriever.windows[1] == {
+        "start": 5.0,
+        "end": 10.0,
+        "text": "The budget for the next quarter is approved",
+    }
+
+
+def test_search_ranks_relevant_window_first(retriever: BM25Retriever):
+    windows = retriever.search("Who migrates the database?", top_k=2)
+    assert len(windows) == 2
+    assert windows[0]["start"] == 10.0
+    assert windows[0]["score"] > windows[1]["score"]
+
+
+def test_get_context_is_timestamped_and_chronological(retriever: BM25Retriever):
+    context = retriever.get_context("What are the next steps about the budget?", 2)
+    lines = context.split("\n")
+    assert lines[0].startswith("[00:00:05 - 00:00:10] The budget")
+    assert lines[1].startswith("[00:00:15 - 00:00:20] The next steps")
@@ -0,0 +1,44 @@
+import sys
+import subprocess
+
+HEAVY_MODULES = (
+    "torch",
+    "whisper",
+    "openai",
+    "tiktoken",
+    "langdetect",
+    "googletrans",
+    "ffmpeg",
+    "numpy",
+    "pkg_resources",
+)
+MAX_IMPORT_TIME = 0.5
+
+
+def import_times(statement: str) -> dict:
+    """Get the cumulative import time in seconds of every module imported by a statement."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split("|")
+        times[module.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def test_import_does_not_load_heavy_modules():
+    times = import_times("import meeting_assistant")
+    loaded = [module for module in HEAVY_MODULES if module in times]
+    assert loaded == [], f"Heavy modules imported at startup: {loaded}"
+
+
+def test_import_time():
+    times = import_times("import meeting_assistant, meeting_assistant.cli")
+    assert times["meeting_assistant"] < MAX_IMPORT_TIME
+    assert times["meeting_assistant.cli"] < MAX_IMPORT_TIME
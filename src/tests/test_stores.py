@@ -0,0 +1,71 @@
+import pytest
+from datetime import date
+from meeting_assistant import Meeting
+from meeting_assistant.stores import MeetingStore
+from meeting_assistant.transcriptions import Transcription
+
+
+def make_meeting(audio_filename: str, texts: list[str]) -> Meeting:
+    t = Transcription("en")
+    for i, text in enumerate(texts):
+        t.add_transcription(i * 5.0, (i + 1) * 5.0, text)
+    meeting = Meeting(
+        audio_filename,
+        participant_names=["Mauricio", "Robert"],
+        dt=date(2023, 7, 1),
+        transcription=t,
+    )
+    meeting.summary = "A short summary"
+    meeting.extracted_keywords = {"database": [(0.0, 5.0)]}
+    return meeting
+
+
+@pytest.fixture()
+def store():
+    with MeetingStore(":memory:") as s:
+        s.add_many(
+            [
+                make_meeting("standup.mp3", ["Hello", "We migrate the database"]),
+                make_meeting("planning.mp3", ["The database budget is approved"]),
+            ]
+        )
+        yield s
+
+
+def test_search_across_meetings(store: MeetingStore):
+    results = store.search("database")
+    assert {meeting_id for meeting_id, _, _ in results} == {1, 2}
+
+    meeting_id, start, snippet = store.search("migrate database")[0]
+    assert (meeting_id, start) == (1, 5.0)
+    assert "[migrate]" in snippet
+
+
+def test_search_ignores_fts_syntax(store: MeetingStore):
+    assert store.search('budget" OR NEAR(') == []
+    assert store.search("   ") == []
+
+
+def test_get_metadata_and_transcription(store: MeetingStore):
+    metadata = store.get_metadata(1)
+    assert metadata["participant_names"] == ["Mauricio", "Robert"]
+    assert metadata["keywords"] == {"database": [[0.0, 5.0]]}
+
+    transcription = store.get_transcription(1)
+    assert transcription.language == "en"
+    assert transcription.get_text() == "Hello We migrate the database "
+
+
+def test_get_meeting(store: MeetingStore):
+    meeting = store.get_meeting(2)
+    assert meeting.audio_filename == "planning.mp3"
+    assert meeting.date == date(2023, 7, 1)
+    assert meeting.summary == "A short summary"
+    assert meeting.look_up_time(1.0) == "The database budget is approved"
+
+
+def test_delete(store: MeetingStore):
+    store.delete(1)
+    assert [meeting_id for meeting_id, _, _ in store.search("database")] == [2]
+    with pytest.raises(KeyError):
+        store.get_metadata(1)
@@ -1,5 +1,11 @@
+import os
+import wave
+import shutil
+import numpy as np
 import pytest
-from meeting_assistant.transcribers import WhisperTranscriber
+from meeting_assistant import transcribers
+from meeting_assistant import instruments
+from meeting_assistant.transcribers import WhisperTranscriber, SAMPLE_RATE
 from meeting_assistant.transcriptions import Transcription
 
 
@@ -27,3 +33,72 @@ def test_whisper_transcriber(transcriber: WhisperTranscriber):
     word_to_look_up = "Mauricio"
     word_found = transcriptions.look_up_word(word_to_look_up)
     assert isinstance(word_found, list), f"Word {word_to_look_up}"
+
+
+class FakeWhisperModel:
+    """Whisper model returning a segment every 10 s of audio."""
+
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, audio, **options):
+        self.calls.append((len(audio) / SAMPLE_RATE, options))
+        duration = len(audio) / SAMPLE_RATE
+        return {
+            "language": "en",
+            "segments": [
+                {"start": t, "end": min(t + 10.0, duration), "text": f"at {t}"}
+                for t in range(0, int(duration), 10)
+            ],
+        }
+
+
+def test_transcribe_incremental(tmp_path, monkeypatch):
+    samples = np.random.default_rng(0).random(90 * SAMPLE_RATE, dtype=np.float32)
+    recordings = {"day1.wav": samples[: 60 * SAMPLE_RATE], "day2.wav": samples}
+    monkeypatch.setattr(
+        transcribers, "load_audio", lambda path: recordings[os.path.basename(path)]
+    )
+    for filename in recordings:
+        (tmp_path / filename).touch()
+    transcriber = WhisperTranscriber.__new__(WhisperTranscriber)
+    transcriber.model, transcriber.temperature = FakeWhisperModel(), 0.1
+
+    first, fingerprint = transcriber.transcribe_incremental(str(tmp_path / "day1.wav"))
+    assert transcriber.model.calls[-1][0] == 60.0
+
+    second, _ = transcriber.transcribe_incremental(
+        str(tmp_path / "day2.wav"), first, fingerprint
+    )
+    seconds, options = transcriber.model.calls[-1]
+    assert seconds == 40.0, "Only the tail after the last kept segment is transcribed"
+    assert options["initial_prompt"] == "at 40"
+    assert [s["start"] for s in second.transcriptions] == list(range(0, 90, 10))
+
+    again, _ = transcriber.transcribe_incremental(
+        str(tmp_path / "day1.wav"), first, fingerprint
+    )
+    assert again is first, "Unchanged audio should not be transcribed again"
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="FFmpeg is not installed")
+def test_transcribe_reports_stages(tmp_path):
+    filename = str(tmp_path / "silence.wav")
+    with wave.open(filename, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(np.zeros(20 * SAMPLE_RATE, dtype="<i2").tobytes())
+    transcriber = WhisperTranscriber.__new__(WhisperTranscriber)
+    transcriber.model, transcriber.temperature = FakeWhisperModel(), 0.1
+
+    stages = []
+    observer = lambda stage, seconds, labels: stages.append((stage, labels))
+    instruments.add_observer(observer)
+    try:
+        transcription = transcriber.transcribe(filename)
+    finally:
+        instruments.remove_observer(observer)
+
+    assert len(transcription.transcriptions) == 2
+    assert stages == [("decode", {}), ("transcription", {"audio_seconds": 20.0})]
@@ -34,3 +34,21 @@ def test_look_up_word():
     t.add_transcription(0.0, 1.0, "Hello")
     t.add_transcription(1.0, 2.0, "there")
     assert t.look_up_word("Hello") == [(0.0, 1.0)]
+
+
+def test_to_dict_and_from_dict():
+    t = Transcription("en")
+    t.add_transcription(0.0, 1.0, "Hello")
+    copy = Transcription.from_dict(t.to_dict())
+    assert copy.language == "en"
+    assert copy.transcriptions == t.transcriptions
+
+
+def test_extend():
+    t = Transcription("en")
+    t.add_transcription(0.0, 1.0, "Hello")
+    other = Transcription("en")
+    other.add_transcription(0.0, 2.0, "World")
+    t.extend(other, offset=10.0)
+    assert t.look_up_time(11.0) == "World"
+    assert t.transcriptions[-1] == {"start": 10.0, "end": 12.0, "text": "World"}